@@ -0,0 +1,172 @@
+"""
+timing and memory benchmarks of the HDPS steps and of hdps_implementation on synthetic claims cohorts
+
+run from the repository root, for example:
+
+    python -m benchmarks.run_benchmarks --patients 10000 100000 1000000 --output benchmarks/results/new.json
+    python -m benchmarks.run_benchmarks --patients 10000 --compare benchmarks/results/old.json
+
+every benchmark is timed repeat times (the minimum is reported) and run once more under tracemalloc for the peak of
+the memory allocated during the call, which includes the numpy and pandas buffers.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+import hdps
+from hdps import hdps_implementation
+from hdps.algorithm_steps import get_non_code_cols, input_data_validation, \
+    step_identify_candidate_empirical_covariates, step_assess_recurrence, step_prioritize_select_covariates
+from benchmarks.synthetic_cohort import make_claims_cohort
+
+DIMENSION_PREFIXES = ['ICD', 'OPS', 'ATC']
+
+
+def measure(function, repeat: int = 3):
+    """
+    :param function: Callable
+        function without arguments
+    :param repeat: int
+        number of timed calls
+    :return seconds: float
+        minimum wall time of the calls
+    :return peak_memory_mb: float
+        peak of the memory allocated during one call, in MiB
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(seconds), peak / 2 ** 20
+
+
+def get_benchmarks(input_df: pd.DataFrame, n: int, k: int):
+    """
+    :param input_df: pandas.DataFrame
+        synthetic cohort from make_claims_cohort
+    :param n: int
+        number of prevalent codes per dimension
+    :param k: int
+        number of selected covariates
+    :return benchmarks: dict
+        function without arguments for each step name, every step gets the output of the previous steps
+    """
+    not_code_columns = get_non_code_cols(col_names=list(input_df.columns), dimension_prefixes=DIMENSION_PREFIXES)
+    valid_df = input_data_validation(input_df=input_df, treatment='treatment', outcome='outcome',
+                                     not_code_columns=not_code_columns)
+    selected_columns = step_identify_candidate_empirical_covariates(input_df=valid_df,
+                                                                    dimension_prefixes=DIMENSION_PREFIXES, n=n)
+    dim_covariates = step_assess_recurrence(input_df=valid_df, selected_columns=selected_columns)
+
+    return {
+        'input_data_validation': lambda: input_data_validation(
+            input_df=input_df, treatment='treatment', outcome='outcome', not_code_columns=not_code_columns),
+        'step_identify_candidate_empirical_covariates': lambda: step_identify_candidate_empirical_covariates(
+            input_df=valid_df, dimension_prefixes=DIMENSION_PREFIXES, n=n),
+        'step_assess_recurrence': lambda: step_assess_recurrence(input_df=valid_df,
+                                                                 selected_columns=selected_columns),
+        'step_prioritize_select_covariates': lambda: step_prioritize_select_covariates(
+            dim_covariates=dim_covariates, input_df=valid_df, treatment='treatment', outcome='outcome', k=k,
+            not_code_columns=not_code_columns),
+        'hdps_implementation': lambda: hdps_implementation(
+            input_df=input_df, n=n, k=k, outcome='outcome', treatment='treatment',
+            dimension_prefixes=DIMENSION_PREFIXES),
+    }
+
+
+def get_environment():
+    """
+    :return environment: dict
+        versions of the package, python and libraries, git revision of the repository and machine
+    """
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        revision = ''
+
+    return {'git_revision': revision, 'hdps_path': os.path.dirname(hdps.__file__), 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run_benchmarks(patients: list, n_codes: int, n: int, k: int, repeat: int, seed: int):
+    """
+    :return results: list - list of dict
+        'n_patients', 'step', 'seconds' and 'peak_memory_mb' of every benchmark
+    """
+    results = []
+    for n_patients in patients:
+        input_df = make_claims_cohort(n_patients=n_patients, dimension_prefixes=DIMENSION_PREFIXES, n_codes=n_codes,
+                                      seed=seed)
+        for step, function in get_benchmarks(input_df=input_df, n=n, k=k).items():
+            seconds, peak_memory_mb = measure(function, repeat=repeat)
+            results.append({'n_patients': n_patients, 'step': step, 'seconds': seconds,
+                            'peak_memory_mb': peak_memory_mb})
+            print(f"{n_patients:>9} {step:<46} {seconds:10.3f} s {peak_memory_mb:10.1f} MiB", flush=True)
+        del input_df
+
+    return results
+
+
+def compare_results(results: list, baseline_results: list):
+    """
+    prints the ratio of the time and of the peak memory of every benchmark to the benchmark of the baseline
+    """
+    baseline = {(result['n_patients'], result['step']): result for result in baseline_results}
+    print(f"{'patients':>9} {'step':<46} {'time ratio':>10} {'memory ratio':>12}")
+    for result in results:
+        base = baseline.get((result['n_patients'], result['step']))
+        if base is None:
+            continue
+        print(f"{result['n_patients']:>9} {result['step']:<46} {result['seconds'] / base['seconds']:10.2f} "
+              f"{result['peak_memory_mb'] / max(base['peak_memory_mb'], 1e-9):12.2f}")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--n-codes', type=int, default=500, help='number of codes of each dimension')
+    parser.add_argument('--n', type=int, default=100, help='number of prevalent codes of each dimension')
+    parser.add_argument('--k', type=int, default=200, help='number of selected covariates')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='json file of the results')
+    parser.add_argument('--compare', help='json file of earlier results')
+    args = parser.parse_args(argv)
+
+    # the warnings about invalid code columns of the synthetic cohorts would be repeated for every call
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = run_benchmarks(patients=args.patients, n_codes=args.n_codes, n=args.n, k=args.k, repeat=args.repeat,
+                             seed=args.seed)
+
+    if args.output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump({'environment': get_environment(), 'parameters': vars(args), 'results': results}, file,
+                      indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare_results(results=results, baseline_results=json.load(file)['results'])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
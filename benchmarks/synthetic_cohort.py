@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def make_claims_cohort(n_patients: int, dimension_prefixes: list = ('ICD', 'OPS', 'ATC'), n_codes: int = 500,
+                       max_prevalence: float = 0.3, prevalence_exponent: float = 1.0, mean_count: float = 2.0,
+                       n_confounders: int = 10, dtype=np.uint8, seed: int = 0):
+    """
+    generates a synthetic claims cohort in the wide format of hdps_implementation. the prevalence of the codes of each
+    dimension follows a power law - the code at rank r has prevalence max_prevalence * r ** -prevalence_exponent - and
+    the count of a code of a patient with the code is 1 + a poisson count with a code specific mean. treatment and
+    outcome are binary and depend on the presence of n_confounders codes, outcome also on treatment.
+
+    :param n_patients: int
+        number of patients
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions. Default value: ('ICD', 'OPS', 'ATC')
+    :param n_codes: int
+        number of codes of each dimension. Default value: 500
+    :param max_prevalence: float
+        prevalence of the most prevalent code of each dimension. Default value: 0.3
+    :param prevalence_exponent: float
+        exponent of the power law of the prevalences. Default value: 1.0
+    :param mean_count: float
+        mean count of a code of the patients with the code. Default value: 2.0
+    :param n_confounders: int
+        number of codes which are associated with treatment and outcome. Default value: 10
+    :param dtype: numpy.dtype
+        dtype of the code counts, counts are clipped to its maximum. Default value: numpy.uint8
+    :param seed: int
+        seed of the random generator. Default value: 0
+    :return input_df: pandas.DataFrame
+        DataFrame with columns 'PID', 'treatment', 'outcome', 'age', 'sex' and one column per code, named
+        '<dimension>_<code number>'
+    """
+
+    rng = np.random.default_rng(seed)
+    max_count = np.iinfo(dtype).max
+
+    code_columns = {}
+    for dim_name in dimension_prefixes:
+        # codes in random order, so that the column order is not the prevalence order
+        prevalence = max_prevalence * np.arange(1, n_codes + 1, dtype=np.float64) ** -prevalence_exponent
+        code_mean = rng.gamma(2.0, (mean_count - 1) / 2.0, n_codes) if mean_count > 1 else np.zeros(n_codes)
+        for code, position in enumerate(rng.permutation(n_codes)):
+            has_code = rng.random(n_patients) < prevalence[position]
+            counts = np.zeros(n_patients, dtype=dtype)
+            counts[has_code] = np.minimum(1 + rng.poisson(code_mean[position], has_code.sum()), max_count)
+            code_columns[dim_name + '_' + str(code)] = counts
+    code_df = pd.DataFrame(code_columns, copy=False)
+
+    # treatment and outcome depend on the presence of the confounder codes
+    confounders = rng.choice(code_df.shape[1], size=min(n_confounders, code_df.shape[1]), replace=False)
+    confounder_block = (code_df.iloc[:, confounders].to_numpy() > 0).astype(np.float64)
+    treatment_logit = -1.0 + confounder_block @ rng.normal(0.0, 1.0, confounders.shape[0])
+    treatment = (rng.random(n_patients) < 1 / (1 + np.exp(-treatment_logit))).astype(np.int64)
+    outcome_logit = -2.0 + 0.5 * treatment + confounder_block @ rng.normal(0.0, 1.0, confounders.shape[0])
+    outcome = (rng.random(n_patients) < 1 / (1 + np.exp(-outcome_logit))).astype(np.int64)
+
+    patient_df = pd.DataFrame({'PID': np.arange(n_patients), 'treatment': treatment, 'outcome': outcome,
+                               'age': rng.integers(18, 90, n_patients), 'sex': rng.integers(0, 2, n_patients)})
+
+    return pd.concat([patient_df, code_df], axis=1)
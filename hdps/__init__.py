@@ -1,11 +1,42 @@
 from hdps.algorithm_steps import get_non_code_cols, step_identify_candidate_empirical_covariates, \
-    step_assess_recurrence, step_prioritize_select_covariates, input_data_validation, process_outcome
-from typing import Union
+    step_assess_recurrence, step_prioritize_select_covariates, input_data_validation, process_outcome, \
+    step_prioritize_select_covariates_thresholds, get_recurrence_covariates, select_recurrence_covariates
+from hdps.column_statistics import get_column_statistics
+from hdps.column_index import ColumnIndex
+from hdps.sparse_steps import sparse_input_data_validation, sparse_step_identify_candidate_empirical_covariates, \
+    sparse_step_assess_recurrence, sparse_step_prioritize_select_covariates
+from hdps.long_format_steps import long_input_data_validation, long_step_identify_candidate_empirical_covariates, \
+    long_step_assess_recurrence, long_step_prioritize_select_covariates
+from hdps.chunked_steps import chunked_collect_partial_statistics, get_outcome_threshold_value, \
+    chunked_count_partial_cell_counts, chunked_output_chunks
+from hdps.memmap_steps import CodeMemmap, memmap_input_data_validation, \
+    memmap_step_identify_candidate_empirical_covariates, memmap_step_assess_recurrence, \
+    memmap_step_prioritize_select_covariates
+from hdps.model import HDPSModel
+from hdps.sweep import hdps_sweep
+from hdps.cache import StepCache, fingerprint_dataframe, cached_step_prioritize_select_covariates
+from hdps.bootstrap import bootstrap_covariate_ranks
+from hdps.instrumentation import RunReport, report_step
+from hdps.arrow_steps import to_arrow_table, from_arrow_table, arrow_input_data_validation, \
+    arrow_step_identify_candidate_empirical_covariates, arrow_step_assess_recurrence, \
+    arrow_step_prioritize_select_covariates
+from hdps.partial_statistics import PartialStatistics, PartialCellCounts, compute_partial_statistics, \
+    merge_partial_statistics, partial_input_data_validation, partial_step_identify_candidate_empirical_covariates, \
+    compute_partial_cell_counts, merge_partial_cell_counts, partial_step_prioritize_select_covariates, \
+    create_partial_output, partial_statistics_worker, partial_cell_counts_worker, partial_output_worker
+from hdps.incremental import IncrementalHDPSModel
+from hdps.propensity import PropensityScoreModel
+from hdps.parallel import process_map
+from hdps.exceptions import InvalidThresholdValueError
+from typing import Callable, Union
+import logging
 import pandas as pd
+import scipy.sparse as sp
 
 
 def hdps_implementation(input_df: pd.DataFrame, n: int, k: int, outcome: str, treatment: str, dimension_prefixes: list,
-                        m: int = 1, threshold: Union[str, float] = '75p', outcome_cont: bool = False):
+                        m: int = 1, threshold: Union[str, float] = '75p', outcome_cont: bool = False,
+                        n_jobs: int = 1, cache: StepCache = None, report: RunReport = None, fingerprint: str = None):
     """Performs HDPS implementation for the given data.
 
     :param input_df: pandas.DataFrame
@@ -13,7 +44,8 @@ def hdps_implementation(input_df: pd.DataFrame, n: int, k: int, outcome: str, tr
         dimension name as prefix - examples: 'DimensionName1_ICDcodeName1', 'DimensionName1_ICDcodeName2',
         'DimensionName1_ICDcodeName1', 'DimensionName2_OPScodeName1', 'DimensionName2_OPScodeName1' and
         other optional columns of predefined and demographic columns.
-
+        a pyarrow Table or a polars DataFrame with these columns is processed by hdps_arrow_implementation, output_df
+        is then of the same type and cache and report are not used (a warning is logged if they are given).
 
     :param n: int
         number of prevanlent codes to be retained in each dimension. top n of prevalent codes are selected in each
@@ -51,6 +83,27 @@ def hdps_implementation(input_df: pd.DataFrame, n: int, k: int, outcome: str, tr
         if '75p', 75th percentile value of the outcome column is taken as cut-off threshold
         if 'median', median value of the outcome column is taken as cut-off threshold
         if integer or float value, the given value is taken as cut-off threshold
+        a list of thresholds is compared in one run by hdps_thresholds_implementation
+
+    :param n_jobs: int
+        number of threads which scan the dimensions and blocks of code columns and select the top n codes of the
+        dimensions, and of worker processes which score shards of the covariates in parallel, -1 uses all cores. the
+        results don't depend on n_jobs. Default value: 1
+
+    :param cache: hdps.cache.StepCache
+        cache of intermediate results, keyed by a fingerprint of input_df and the parameters of the steps. with the
+        same input_df the column statistics are reused for any n, m, outcome and treatment, and the cell counts of the
+        covariates are reused for any k. the pickled results of an on-disk cache must come from a trusted directory, see
+        hdps.cache.StepCache. Default value: None - nothing is cached
+
+    :param report: hdps.instrumentation.RunReport
+        report to which the wall time, cpu time, peak memory and input and output sizes of every step are added.
+        Default value: None - the steps are not measured
+
+    :param fingerprint: str
+        fingerprint of input_df for the keys of cache, for example a version of the data which the caller tracks. it
+        must change whenever input_df changes. Default value: None - calculated with hdps.cache.fingerprint_dataframe,
+        which hashes every value of input_df on every call with a cache
 
     :return output_df: pandas.DataFrame
         DataFrame with columns 'PID', outcome, treatment, Demographic and Predefined covariates
@@ -64,25 +117,512 @@ def hdps_implementation(input_df: pd.DataFrame, n: int, k: int, outcome: str, tr
         importance. higher importance for covariates which has higher abs(log(BiasMult)) value.
 
     """
-    not_code_columns = get_non_code_cols(col_names=list(input_df.columns), dimension_prefixes=dimension_prefixes)
+    if isinstance(threshold, (list, tuple)):
+        raise InvalidThresholdValueError(message="A list of thresholds is not supported by hdps_implementation, use "
+                                                 "hdps_thresholds_implementation")
+
+    if not isinstance(input_df, pd.DataFrame):
+        # Arrow tables and Polars DataFrames are processed with the Arrow backend and returned as the same type
+        if cache is not None or report is not None:
+            logging.warning("cache and report are not supported for a pyarrow Table or a polars DataFrame input and "
+                            "are ignored")
+        return hdps_arrow_implementation(data=input_df, n=n, k=k, outcome=outcome, treatment=treatment,
+                                         dimension_prefixes=dimension_prefixes, m=m, threshold=threshold,
+                                         outcome_cont=outcome_cont, n_jobs=n_jobs)
+
+    output_df, rank_df, _ = hdps_fit_implementation(
+        input_df=input_df, n=n, k=k, outcome=outcome, treatment=treatment, dimension_prefixes=dimension_prefixes, m=m,
+        threshold=threshold, outcome_cont=outcome_cont, n_jobs=n_jobs, cache=cache, report=report,
+        fingerprint=fingerprint)
+
+    return output_df, rank_df
+
+
+def hdps_fit_implementation(input_df: pd.DataFrame, n: int, k: int, outcome: str, treatment: str,
+                            dimension_prefixes: list, m: int = 1, threshold: Union[str, float] = '75p',
+                            outcome_cont: bool = False, n_jobs: int = 1, cache: StepCache = None,
+                            report: RunReport = None, fingerprint: str = None):
+    """Performs HDPS implementation for a pandas DataFrame and also gives the recurrence covariates of the selected
+    covariates, which HDPSModel keeps to create the covariates of new patients.
+
+    :param input_df: pandas.DataFrame
+        Data frame with the columns of input_df of hdps_implementation
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold, outcome_cont, n_jobs, cache, report and fingerprint
+    see hdps_implementation
+
+    :return output_df: pandas.DataFrame
+        see hdps_implementation
+    :return rank_df: pandas.DataFrame
+        see hdps_implementation
+    :return sel_recurrence_covariates: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'code', 'recurrence' and 'threshold' of the selected covariates in
+        rank order, see get_recurrence_covariates
+    """
+
+    # the columns are mapped to the dimensions once and the mapping is shared by all steps
+    column_index = ColumnIndex(col_names=input_df.columns, dimension_prefixes=dimension_prefixes)
+    not_code_columns = column_index.not_code_columns
+    if cache is not None and fingerprint is None:
+        fingerprint = fingerprint_dataframe(input_df)
 
     actual_outcome = input_df[outcome]
 
     if outcome_cont:
-        input_df[outcome] = process_outcome(input_df=input_df, outcome=outcome, threshold=threshold)
+        with report_step(report, 'process_outcome', input_rows=input_df.shape[0]):
+            input_df[outcome] = process_outcome(input_df=input_df, outcome=outcome, threshold=threshold)
 
-    input_df = input_data_validation(
-        input_df=input_df, treatment=treatment, outcome=outcome, not_code_columns=not_code_columns)
+    column_statistics, selected_columns = identify_candidates(
+        input_df=input_df, column_index=column_index, n=n, outcome=outcome, treatment=treatment,
+        dimension_prefixes=dimension_prefixes, m=m, n_jobs=n_jobs, cache=cache, report=report, fingerprint=fingerprint)
 
-    selected_columns = step_identify_candidate_empirical_covariates(input_df=input_df,
-                                                                    dimension_prefixes=dimension_prefixes, n=n, m=m)
+    median, p_75, min_value = column_statistics.recurrence_thresholds(selected_columns)
+    recurrence_covariates = get_recurrence_covariates(selected_columns=selected_columns, median=median, p_75=p_75,
+                                                      min_value=min_value)
 
-    dim_covariates = step_assess_recurrence(input_df=input_df, selected_columns=selected_columns)
+    if cache is not None:
+        with report_step(report, 'cached_step_prioritize_select_covariates', input_rows=input_df.shape[0],
+                         candidates=len(selected_columns)) as record:
+            cell_counts_key = StepCache.make_key(fingerprint, 'cell_counts', tuple(dimension_prefixes), n, m,
+                                            outcome, treatment, threshold, outcome_cont)
+            output_df, rank_df = cached_step_prioritize_select_covariates(
+                cache=cache, key=cell_counts_key, input_df=input_df, selected_columns=selected_columns,
+                column_statistics=column_statistics, treatment=treatment, outcome=outcome, k=k,
+                not_code_columns=not_code_columns)
+            record.update(selected_covariates=rank_df.shape[0], output_rows=output_df.shape[0],
+                          output_columns=output_df.shape[1])
+    else:
+        with report_step(report, 'step_assess_recurrence', input_rows=input_df.shape[0],
+                         candidates=len(selected_columns)) as record:
+            dim_covariates = step_assess_recurrence(input_df=input_df, selected_columns=selected_columns,
+                                                    recurrence_covariates=recurrence_covariates)
+            record.update(covariates=dim_covariates.shape[1], output_rows=dim_covariates.shape[0],
+                          output_columns=dim_covariates.shape[1])
 
-    output_df, rank_df = step_prioritize_select_covariates(dim_covariates=dim_covariates, input_df=input_df,
-                                                           treatment=treatment, outcome=outcome, k=k,
-                                                           not_code_columns=not_code_columns)
+        with report_step(report, 'step_prioritize_select_covariates', input_rows=input_df.shape[0],
+                         covariates=dim_covariates.shape[1]) as record:
+            output_df, rank_df = step_prioritize_select_covariates(dim_covariates=dim_covariates, input_df=input_df,
+                                                                   treatment=treatment, outcome=outcome, k=k,
+                                                                   not_code_columns=not_code_columns, n_jobs=n_jobs)
+            record.update(selected_covariates=rank_df.shape[0], output_rows=output_df.shape[0],
+                          output_columns=output_df.shape[1])
+    if outcome_cont:
+        output_df[outcome] = actual_outcome
+
+    sel_recurrence_covariates = select_recurrence_covariates(recurrence_covariates=recurrence_covariates,
+                                                             covariate_names=list(rank_df['Covariates Name']))
+
+    return output_df, rank_df, sel_recurrence_covariates
+
+
+def hdps_thresholds_implementation(input_df: pd.DataFrame, n: int, k: int, outcome: str, treatment: str,
+                                   dimension_prefixes: list, thresholds: list, m: int = 1, n_jobs: int = 1,
+                                   report: RunReport = None):
+    """Performs HDPS implementation for a continuous outcome with several thresholds in one run. The outcome is
+    binarized for all thresholds at once, the candidates and recurrence covariates are shared (the steps before the
+    prioritization use the binary outcome of the first threshold) and the outcome counts of all thresholds come from
+    one pass over the covariates. The results of every threshold are identical to hdps_implementation with
+    outcome_cont=True and this threshold. The cell counts are not cached.
+
+    :param input_df: pandas.DataFrame
+        Data frame with a continuous outcome, see hdps_implementation
+    :param thresholds: list
+        list of thresholds, each '75p', 'median', integer or float value, see hdps_implementation
+
+    for n, k, outcome, treatment, dimension_prefixes, m, n_jobs and report see hdps_implementation
+
+    :return output_dfs: list - list of pandas.DataFrame
+        output_df of every threshold, see hdps_implementation
+    :return rank_dfs: list - list of pandas.DataFrame
+        rank_df of every threshold, see hdps_implementation
+    """
+    column_index = ColumnIndex(col_names=input_df.columns, dimension_prefixes=dimension_prefixes)
+    not_code_columns = column_index.not_code_columns
+
+    actual_outcome = input_df[outcome]
+
+    with report_step(report, 'process_outcome', input_rows=input_df.shape[0]):
+        converted_outcome = process_outcome(input_df=input_df, outcome=outcome, threshold=list(thresholds))
+        input_df[outcome] = converted_outcome[0]
+
+    column_statistics, selected_columns = identify_candidates(
+        input_df=input_df, column_index=column_index, n=n, outcome=outcome, treatment=treatment,
+        dimension_prefixes=dimension_prefixes, m=m, n_jobs=n_jobs, report=report)
+
+    with report_step(report, 'step_assess_recurrence', input_rows=input_df.shape[0],
+                     candidates=len(selected_columns)) as record:
+        dim_covariates = step_assess_recurrence(input_df=input_df, selected_columns=selected_columns,
+                                                column_statistics=column_statistics)
+        record.update(covariates=dim_covariates.shape[1], output_rows=dim_covariates.shape[0],
+                      output_columns=dim_covariates.shape[1])
+
+    with report_step(report, 'step_prioritize_select_covariates_thresholds', input_rows=input_df.shape[0],
+                     covariates=dim_covariates.shape[1]) as record:
+        output_dfs, rank_dfs = step_prioritize_select_covariates_thresholds(
+            dim_covariates=dim_covariates, input_df=input_df, treatment=treatment, outcome_values=converted_outcome,
+            k=k, not_code_columns=not_code_columns)
+        record.update(selected_covariates=sum(rank_df.shape[0] for rank_df in rank_dfs),
+                      output_rows=input_df.shape[0])
+
+    for output_df in output_dfs:
+        output_df[outcome] = actual_outcome
+
+    return output_dfs, rank_dfs
+
+
+def identify_candidates(input_df: pd.DataFrame, column_index: ColumnIndex, n: int, outcome: str, treatment: str,
+                        dimension_prefixes: list, m: int = 1, n_jobs: int = 1, cache: StepCache = None,
+                        report: RunReport = None, fingerprint: str = None):
+    """Performs the steps of hdps_implementation up to the candidate codes - the statistics of the code columns, the
+    validation of input_df and the selection of the top n prevalent codes of every dimension.
+
+    :param input_df: pandas.DataFrame
+        Data frame with a binary outcome, see hdps_implementation
+    :param column_index: hdps.column_index.ColumnIndex
+        mapping of the columns of input_df to the dimensions
+
+    for n, outcome, treatment, dimension_prefixes, m, n_jobs, cache, report and fingerprint see hdps_implementation
+
+    :return column_statistics: hdps.column_statistics.ColumnStatistics
+        statistics of the code columns of input_df
+    :return selected_columns: list - list of strings
+        list of selected code column names. for each dimension top n prevalent codes are selected.
+    """
+    not_code_columns = column_index.not_code_columns
+
+    # statistics of the code columns are calculated in one sweep and shared by all steps
+    code_columns = column_index.code_columns
+    with report_step(report, 'get_column_statistics', input_rows=input_df.shape[0], input_columns=len(code_columns)):
+        if cache is not None:
+            column_statistics = cache.get_or_compute(
+                StepCache.make_key(fingerprint, 'column_statistics', tuple(dimension_prefixes)),
+                lambda: get_column_statistics(input_df=input_df, code_columns=code_columns, n_jobs=n_jobs))
+        else:
+            column_statistics = get_column_statistics(input_df=input_df, code_columns=code_columns, n_jobs=n_jobs)
+
+    # invalid code columns are excluded from the column index instead of being dropped from a copy of input_df
+    with report_step(report, 'input_data_validation', input_rows=input_df.shape[0],
+                     input_columns=len(code_columns)) as record:
+        input_data_validation(input_df=input_df, treatment=treatment, outcome=outcome,
+                              not_code_columns=not_code_columns, column_statistics=column_statistics,
+                              drop_invalid=False)
+        valid = column_statistics.valid
+        if not valid.all():
+            column_index = column_index.restrict(
+                col_names=not_code_columns + [col for col, is_valid in zip(code_columns, valid) if is_valid])
+        record['output_columns'] = int(valid.sum())
+
+    with report_step(report, 'step_identify_candidate_empirical_covariates', input_rows=input_df.shape[0],
+                     input_columns=int(valid.sum())) as record:
+        selected_columns = step_identify_candidate_empirical_covariates(input_df=input_df,
+                                                                        dimension_prefixes=dimension_prefixes, n=n,
+                                                                        m=m, column_statistics=column_statistics,
+                                                                        n_jobs=n_jobs, column_index=column_index)
+        record['candidates'] = len(selected_columns)
+
+    return column_statistics, selected_columns
+
+
+def hdps_arrow_implementation(data, n: int, k: int, outcome: str, treatment: str, dimension_prefixes: list, m: int = 1,
+                              threshold: Union[str, float] = '75p', outcome_cont: bool = False, n_jobs: int = 1):
+    """Performs HDPS implementation with Arrow compute kernels. requires pyarrow (and polars for a polars input).
+    the results are identical to hdps_implementation, which is the reference implementation.
+
+    :param data: pyarrow.Table, polars.DataFrame or pandas.DataFrame
+        data with the columns of input_df of hdps_implementation. data is not changed
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold and outcome_cont see hdps_implementation
+
+    :param n_jobs: int
+        number of threads which run the column kernels in parallel, -1 uses all cores. Default value: 1
+
+    :return output: pyarrow.Table, polars.DataFrame or pandas.DataFrame
+        output_df of hdps_implementation as the type of data
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+    import pyarrow as pa
+
+    if isinstance(threshold, (list, tuple)):
+        raise InvalidThresholdValueError(message="A list of thresholds is not supported by hdps_arrow_implementation, "
+                                                 "use hdps_thresholds_implementation")
+
+    table, kind = to_arrow_table(data)
+    column_index = ColumnIndex(col_names=table.column_names, dimension_prefixes=dimension_prefixes)
+    not_code_columns = column_index.not_code_columns
+
+    # the binary outcome is only used for the steps, the output keeps the actual outcome
+    output_source = table
+    if outcome_cont:
+        binary_outcome = process_outcome(input_df=pd.DataFrame({outcome: table[outcome].to_numpy()}), outcome=outcome,
+                                         threshold=threshold)
+        table = table.set_column(table.column_names.index(outcome), outcome, pa.array(binary_outcome))
+
+    code_columns, prev_count = arrow_input_data_validation(table=table, treatment=treatment, outcome=outcome,
+                                                           code_columns=column_index.code_columns, n_jobs=n_jobs)
+
+    selected_columns = arrow_step_identify_candidate_empirical_covariates(
+        table=table, code_columns=code_columns, prev_count=prev_count, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    dim_covariates = arrow_step_assess_recurrence(table=table, selected_columns=selected_columns, n_jobs=n_jobs)
+
+    output_table, rank_df = arrow_step_prioritize_select_covariates(
+        dim_covariates=dim_covariates, table=table, treatment=treatment, outcome=outcome, k=k,
+        not_code_columns=not_code_columns, n_jobs=n_jobs)
+    if outcome_cont:
+        output_table = output_table.set_column(not_code_columns.index(outcome), outcome, output_source[outcome])
+
+    return from_arrow_table(output_table, kind), rank_df
+
+
+def hdps_sparse_implementation(patient_df: pd.DataFrame, code_matrix: sp.spmatrix, code_names: list, n: int, k: int,
+                               outcome: str, treatment: str, dimension_prefixes: list, m: int = 1,
+                               threshold: Union[str, float] = '75p', outcome_cont: bool = False):
+    """Performs HDPS implementation for the given data with the codes as a sparse count matrix. The code counts are
+    never densified, only the k selected HDPS covariates are materialized in output_df, so the memory scales with the
+    number of non-zero code counts rather than with patients x codes.
+
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of code_matrix
+    :param code_matrix: scipy.sparse matrix
+        sparse matrix (CSC or CSR) of code counts with one row per patient and one column per code
+    :param code_names: list - list of strings
+        list of names of the codes (columns of code_matrix) with corresponding dimension name as prefix - examples:
+        'DimensionName1_ICDcodeName1', 'DimensionName1_ICDcodeName2', 'DimensionName2_OPScodeName1'
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold and outcome_cont see hdps_implementation
+
+    :return output_df: pandas.DataFrame
+        DataFrame with the columns of patient_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+    patient_df = patient_df.copy()
+    not_code_columns = list(patient_df.columns)
+
+    actual_outcome = patient_df[outcome]
+
+    if outcome_cont:
+        patient_df[outcome] = process_outcome(input_df=patient_df, outcome=outcome, threshold=threshold)
+
+    code_matrix, code_names = sparse_input_data_validation(patient_df=patient_df, code_matrix=code_matrix,
+                                                           code_names=code_names, treatment=treatment, outcome=outcome)
+
+    selected_columns = sparse_step_identify_candidate_empirical_covariates(
+        code_matrix=code_matrix, code_names=code_names, pid=patient_df['PID'].to_numpy(),
+        dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    dim_covariates, covariate_names = sparse_step_assess_recurrence(code_matrix=code_matrix, code_names=code_names,
+                                                                    selected_columns=selected_columns)
+
+    output_df, rank_df = sparse_step_prioritize_select_covariates(
+        dim_covariates=dim_covariates, covariate_names=covariate_names, patient_df=patient_df, treatment=treatment,
+        outcome=outcome, k=k, not_code_columns=not_code_columns)
+    if outcome_cont:
+        output_df[outcome] = actual_outcome
+
+    return output_df, rank_df
+
+
+def hdps_long_implementation(long_df: pd.DataFrame, patient_df: pd.DataFrame, n: int, k: int, outcome: str,
+                             treatment: str, dimension_prefixes: list, m: int = 1, threshold: Union[str, float] = '75p',
+                             outcome_cont: bool = False):
+    """Performs HDPS implementation for the given data with the codes as a long table. Prevalence, recurrence
+    thresholds and BiasMult are calculated via group-by aggregation without pivoting the long table to the wide
+    'Dimension_Code' layout, only the k selected HDPS covariates are materialized as columns in output_df.
+
+    :param long_df: pandas.DataFrame
+        Data frame with columns 'PID', 'dimension', 'code' and 'count'. rows with the same 'PID', 'dimension' and
+        'code' are summed up. a code which doesn't have a row for a patient has count 0 for that patient. the covariate
+        names are built as 'dimension_code', examples: 'ICD_01', 'OPS_5-010'
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions. a code belongs to a dimension if its 'dimension' value equals the name
+
+    for n, k, outcome, treatment, m, threshold and outcome_cont see hdps_implementation
+
+    :return output_df: pandas.DataFrame
+        DataFrame with the columns of patient_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+    patient_df = patient_df.copy()
+    not_code_columns = list(patient_df.columns)
+
+    actual_outcome = patient_df[outcome]
+
+    if outcome_cont:
+        patient_df[outcome] = process_outcome(input_df=patient_df, outcome=outcome, threshold=threshold)
+
+    long_df = long_input_data_validation(long_df=long_df, patient_df=patient_df, treatment=treatment, outcome=outcome)
+
+    selected_columns = long_step_identify_candidate_empirical_covariates(
+        long_df=long_df, patient_df=patient_df, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    dim_covariates, covariate_names = long_step_assess_recurrence(long_df=long_df, selected_columns=selected_columns)
+
+    output_df, rank_df = long_step_prioritize_select_covariates(
+        dim_covariates=dim_covariates, covariate_names=covariate_names, patient_df=patient_df, treatment=treatment,
+        outcome=outcome, k=k, not_code_columns=not_code_columns)
     if outcome_cont:
         output_df[outcome] = actual_outcome
 
     return output_df, rank_df
+
+
+def hdps_chunked_implementation(chunk_source: Callable, n: int, k: int, outcome: str, treatment: str,
+                                dimension_prefixes: list, m: int = 1, threshold: Union[str, float] = '75p',
+                                outcome_cont: bool = False, check_duplicates: bool = True):
+    """Performs HDPS implementation out-of-core, for data which doesn't fit into memory. The data is read chunk by
+    chunk of patients in three passes, as a sequence of partitions of hdps_partitioned_implementation - the first pass
+    merges the PartialStatistics of the chunks, the second pass merges the PartialCellCounts of the recurrence
+    covariates for BiasMult and the last pass (lazily, when output_chunks is iterated) creates output_df chunk by
+    chunk. The results are identical to hdps_implementation.
+
+    :param chunk_source: Callable
+        function which takes an optional list of column names and returns an iterator of DataFrame chunks of patients
+        with these columns (all columns if None). each chunk has the columns of input_df of hdps_implementation. see
+        hdps.chunked_steps.read_csv_chunks and hdps.chunked_steps.read_parquet_row_groups
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold and outcome_cont see hdps_implementation
+
+    :param check_duplicates: bool
+        True to check for duplicate PIDs over all chunks with on-disk hash buckets, see
+        hdps.chunked_steps.chunked_collect_partial_statistics. Default value: True
+
+    :return output_chunks: Iterator
+        iterator of DataFrame chunks of output_df, see hdps_implementation. can be written with
+        hdps.chunked_steps.write_output_chunks
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+    partial_statistics = chunked_collect_partial_statistics(chunk_source=chunk_source, treatment=treatment,
+                                                            outcome=outcome, dimension_prefixes=dimension_prefixes,
+                                                            check_duplicates=check_duplicates)
+
+    partial_input_data_validation(partial_statistics=partial_statistics, treatment=treatment, outcome=outcome,
+                                  outcome_cont=outcome_cont)
+
+    outcome_threshold_value = None
+    if outcome_cont:
+        outcome_threshold_value = get_outcome_threshold_value(
+            outcome_value_counts=partial_statistics.outcome_value_counts, threshold=threshold)
+
+    recurrence_covariates = partial_step_identify_candidate_empirical_covariates(
+        partial_statistics=partial_statistics, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    partial_cell_counts = chunked_count_partial_cell_counts(
+        chunk_source=chunk_source, recurrence_covariates=recurrence_covariates, treatment=treatment, outcome=outcome,
+        outcome_threshold_value=outcome_threshold_value)
+
+    rank_df, sel_recurrence_covariates = partial_step_prioritize_select_covariates(
+        partial_cell_counts=partial_cell_counts, recurrence_covariates=recurrence_covariates, k=k)
+
+    output_chunks = chunked_output_chunks(chunk_source=chunk_source,
+                                          sel_recurrence_covariates=sel_recurrence_covariates,
+                                          not_code_columns=partial_statistics.not_code_columns)
+
+    return output_chunks, rank_df
+
+
+def hdps_memmap_implementation(patient_df: pd.DataFrame, code_memmap: CodeMemmap, n: int, k: int, outcome: str,
+                               treatment: str, dimension_prefixes: list, m: int = 1,
+                               threshold: Union[str, float] = '75p', outcome_cont: bool = False):
+    """Performs HDPS implementation for the given data with the codes as an on-disk memory-mapped array, saved once
+    with hdps.memmap_steps.save_code_memmap and opened with hdps.memmap_steps.open_code_memmap. Prevalence and
+    recurrence thresholds come from the column statistics saved with the array, BiasMult is calculated on views of the
+    memory-mapped code columns and only the k selected HDPS covariates are materialized in output_df.
+
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of code_memmap
+    :param code_memmap: hdps.memmap_steps.CodeMemmap
+        memory-mapped code counts
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold and outcome_cont see hdps_implementation
+
+    :return output_df: pandas.DataFrame
+        DataFrame with the columns of patient_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+    patient_df = patient_df.copy()
+    not_code_columns = list(patient_df.columns)
+
+    actual_outcome = patient_df[outcome]
+
+    if outcome_cont:
+        patient_df[outcome] = process_outcome(input_df=patient_df, outcome=outcome, threshold=threshold)
+
+    memmap_input_data_validation(patient_df=patient_df, code_memmap=code_memmap, treatment=treatment, outcome=outcome)
+
+    selected_columns = memmap_step_identify_candidate_empirical_covariates(
+        code_memmap=code_memmap, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    recurrence_covariates = memmap_step_assess_recurrence(code_memmap=code_memmap, selected_columns=selected_columns)
+
+    output_df, rank_df = memmap_step_prioritize_select_covariates(
+        recurrence_covariates=recurrence_covariates, code_memmap=code_memmap, patient_df=patient_df,
+        treatment=treatment, outcome=outcome, k=k, not_code_columns=not_code_columns)
+    if outcome_cont:
+        output_df[outcome] = actual_outcome
+
+    return output_df, rank_df
+
+
+def hdps_partitioned_implementation(partitions: list, n: int, k: int, outcome: str, treatment: str,
+                                    dimension_prefixes: list, m: int = 1, threshold: Union[str, float] = '75p',
+                                    outcome_cont: bool = False, n_jobs: int = 1):
+    """Performs HDPS implementation for data which is partitioned by patients, for example over the nodes of a
+    cluster. Only sufficient statistics are exchanged - every partition computes its PartialStatistics, the merged
+    statistics give the candidate codes and their recurrence thresholds, every partition computes the PartialCellCounts
+    of the candidate covariates and the merged cell counts give BiasMult and the top k covariates, which every
+    partition creates for its own patients. This function is a local stand-in for a cluster, where the partitions are
+    processed in a pool of n_jobs processes. The results are identical to hdps_implementation on the concatenated
+    partitions, except that duplicate PIDs are only detected within a partition.
+
+    :param partitions: list
+        list of DataFrames, or paths of csv or parquet files on a shared filesystem, of disjoint sets of patients. each
+        partition has the columns of input_df of hdps_implementation, code columns which are missing in a partition
+        have count 0 for its patients
+    :param n_jobs: int
+        number of processes which process the partitions. -1 uses all cores. Default value: 1
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold and outcome_cont see hdps_implementation
+
+    :return output_dfs: list
+        output_df of every partition, see hdps_implementation
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+    partial_statistics = merge_partial_statistics(process_map(
+        partial_statistics_worker, [(partition, treatment, outcome, dimension_prefixes) for partition in partitions],
+        n_jobs=n_jobs))
+
+    partial_input_data_validation(partial_statistics=partial_statistics, treatment=treatment, outcome=outcome,
+                                  outcome_cont=outcome_cont)
+
+    outcome_threshold_value = None
+    if outcome_cont:
+        outcome_threshold_value = get_outcome_threshold_value(
+            outcome_value_counts=partial_statistics.outcome_value_counts, threshold=threshold)
+
+    recurrence_covariates = partial_step_identify_candidate_empirical_covariates(
+        partial_statistics=partial_statistics, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    partial_cell_counts = merge_partial_cell_counts(process_map(
+        partial_cell_counts_worker,
+        [(partition, recurrence_covariates, treatment, outcome, outcome_threshold_value) for partition in partitions],
+        n_jobs=n_jobs))
+
+    rank_df, sel_recurrence_covariates = partial_step_prioritize_select_covariates(
+        partial_cell_counts=partial_cell_counts, recurrence_covariates=recurrence_covariates, k=k)
+
+    output_dfs = process_map(partial_output_worker,
+                             [(partition, sel_recurrence_covariates, dimension_prefixes) for partition in partitions],
+                             n_jobs=n_jobs)
+
+    return output_dfs, rank_df
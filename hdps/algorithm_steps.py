@@ -1,10 +1,19 @@
-import math
 import numpy as np
 import pandas as pd
 import logging
 from hdps.exceptions import DuplicateIdError, ColumnNotBinaryError, InvalidThresholdValueError, \
     ConvertedOutcomeNotBinaryError
-from typing import Union
+from hdps.column_statistics import ColumnStatistics, compute_column_statistics, median_p75_at_ranks
+from hdps.column_index import ColumnIndex
+from hdps.parallel import get_n_workers, parallel_map, process_map
+from multiprocessing import shared_memory
+from typing import Callable, Union
+
+# dtype of the 0/1 covariate columns
+COVARIATE_DTYPE = np.uint8
+
+# number of 1 bits of every byte value, for numpy versions without np.bitwise_count
+POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
 
 
 def get_non_code_cols(col_names: list, dimension_prefixes: list):
@@ -21,13 +30,16 @@ def get_non_code_cols(col_names: list, dimension_prefixes: list):
         list of names of columns without dimension names as prefixes
     """
 
-    not_code_columns = [column for column in col_names if
-                        not any(column.startswith(dim_name) for dim_name in dimension_prefixes)]
+    # str.startswith tests all prefixes at once
+    dimension_prefixes = tuple(dimension_prefixes)
+    not_code_columns = [column for column in col_names if not column.startswith(dimension_prefixes)]
 
     return not_code_columns
 
 
-def step_identify_candidate_empirical_covariates(input_df: pd.DataFrame, dimension_prefixes: list, n: int, m: int = 1):
+def step_identify_candidate_empirical_covariates(input_df: pd.DataFrame, dimension_prefixes: list, n: int, m: int = 1,
+                                                 column_statistics: ColumnStatistics = None, n_jobs: int = 1,
+                                                 column_index: ColumnIndex = None):
     """
     performs selection of top n prevalent code column for each dimension
 
@@ -45,12 +57,25 @@ def step_identify_candidate_empirical_covariates(input_df: pd.DataFrame, dimensi
     :param m: int
         if code occur for >= m patients, that particular code is selected else dropped in each dimension. Default value
          for m is 1. note: m =100 as per [1] and m =1 as per [2].
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns of input_df. if given, the prevalence counts are taken from it instead of
+        scanning input_df. Default value: None
+    :param n_jobs: int
+        number of threads, which share the memory of input_df. the prevalence counts of the dimensions (large
+        dimensions split into blocks of columns) and then the symmetric transformation and top n selection of the
+        dimensions run in parallel, and the selections are merged in the order of dimension_prefixes, so the result
+        doesn't depend on n_jobs. -1 uses all cores. Default value: 1
+    :param column_index: ColumnIndex
+        mapping of the columns of input_df to the dimensions, built once and shared by the steps. only the code
+        columns of column_index are considered, for example the valid code columns from code_columns_validation.
+        Default value: None - built from the columns of input_df
     :return selected_columns: list - list of strings
         list of selected column names from input_df. for each dimension top n prevalent codes are selected.
 
     """
 
-    col_names = input_df.columns
+    if column_index is None:
+        column_index = ColumnIndex(col_names=input_df.columns, dimension_prefixes=dimension_prefixes)
 
     # check for duplicates
     if np.unique(input_df['PID']).shape[0] != input_df['PID'].shape[0]:
@@ -59,41 +84,226 @@ def step_identify_candidate_empirical_covariates(input_df: pd.DataFrame, dimensi
     # calculating total study population count
     total_sp_count = input_df.shape[0]
 
-    selected_columns = []
-    for dim_name in dimension_prefixes:
+    # getting column names for each dimension
+    dim_cols_list = [column_index.dimension_columns(dim_name) for dim_name in dimension_prefixes]
+
+    # calculating prevalence count of the code columns of every dimension
+    if column_statistics is not None:
+        dim_prev_counts = [column_statistics.prevalence_count[column_statistics.get_positions(dim_cols)]
+                           for dim_cols in dim_cols_list]
+    else:
+        dim_prev_counts = get_dimension_prevalence_counts(input_df=input_df, dim_cols_list=dim_cols_list,
+                                                          n_jobs=n_jobs)
+
+    return select_dimensions_codes(dimension_prefixes=dimension_prefixes, dim_cols_list=dim_cols_list,
+                                   dim_prev_counts=dim_prev_counts, total_sp_count=total_sp_count, n=n, m=m,
+                                   n_jobs=n_jobs)
+
+
+def get_dimension_prevalence_counts(input_df: pd.DataFrame, dim_cols_list: list, batch_size: int = 256,
+                                    n_jobs: int = 1):
+    """
+    calculates the prevalence count of the code columns of every dimension. the dimensions, and the blocks of
+    batch_size columns of large dimensions, are counted in parallel threads
+
+    :param input_df: pandas.DataFrame
+        Data frame with the code columns
+    :param dim_cols_list: list - list of lists of strings
+        code column names of every dimension
+    :param batch_size: int
+        maximum number of code columns which are counted together. Default value: 256
+    :param n_jobs: int
+        number of threads, -1 uses all cores. Default value: 1
+    :return dim_prev_counts: list - list of numpy.ndarray
+        prevalence count of the code columns of every dimension
+    """
+
+    blocks = [(dim, dim_cols[start:start + batch_size]) for dim, dim_cols in enumerate(dim_cols_list)
+              for start in range(0, len(dim_cols), batch_size)]
+    block_counts = parallel_map(lambda block: np.count_nonzero(input_df[block[1]].to_numpy(), axis=0), blocks,
+                                n_jobs=n_jobs)
+
+    # the blocks of a dimension are merged in column order
+    return [np.concatenate([np.zeros(0, dtype=np.int64)] +
+                           [counts for (block_dim, _), counts in zip(blocks, block_counts) if block_dim == dim])
+            for dim in range(len(dim_cols_list))]
+
+
+def select_dimensions_codes(dimension_prefixes: list, dim_cols_list: list, dim_prev_counts: list, total_sp_count: int,
+                            n: int, m: int = 1, n_jobs: int = 1):
+    """
+    performs the selection of top n prevalent codes of every dimension (see select_dimension_codes) in parallel
+    threads and merges the selections in the order of the dimensions
+
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param dim_cols_list: list - list of lists of strings
+        code column names of every dimension
+    :param dim_prev_counts: list - list of numpy.ndarray
+        prevalence count of the code columns of every dimension
+    :param total_sp_count: int
+        total study population count
+    :param n: int
+        number of prevanlent codes to be retained in each dimension
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped. Default value for m is 1.
+    :param n_jobs: int
+        number of threads, -1 uses all cores. Default value: 1
+    :return selected_columns: list - list of strings
+        list of selected code column names, dimension by dimension
+    """
+
+    dim_selections = parallel_map(
+        lambda task: select_dimension_codes(dim_name=task[0], dim_cols=task[1], prev_count=task[2],
+                                            total_sp_count=total_sp_count, n=n, m=m),
+        list(zip(dimension_prefixes, dim_cols_list, dim_prev_counts)), n_jobs=n_jobs)
+
+    return [col for dim_selection in dim_selections for col in dim_selection]
+
+
+def get_prevalence_count(input_df: pd.DataFrame, code_columns: list, batch_size: int = 256, n_jobs: int = 1):
+    """
+    calculates the prevalence count (number of non-zero entries) of the code columns, batch by batch of columns
+
+    :param input_df: pandas.DataFrame
+        Data frame with the code columns
+    :param code_columns: list - list of strings
+        names of the code columns
+    :param batch_size: int
+        number of code columns which are counted together. Default value: 256
+    :param n_jobs: int
+        number of threads which count batches in parallel, -1 uses all cores. Default value: 1
+    :return prev_count: numpy.ndarray
+        prevalence count of each of code_columns
+    """
+
+    batches = [code_columns[start:start + batch_size] for start in range(0, len(code_columns), batch_size)]
+    batch_counts = parallel_map(lambda batch: np.count_nonzero(input_df[batch].to_numpy(), axis=0), batches,
+                                n_jobs=n_jobs)
+
+    return np.concatenate(batch_counts) if len(batch_counts) > 0 else np.zeros(0, dtype=np.int64)
+
+
+def step_identify_candidate_empirical_covariates_from_statistics(column_statistics: ColumnStatistics,
+                                                                 dimension_prefixes: list, n: int, m: int = 1,
+                                                                 column_index: ColumnIndex = None, n_jobs: int = 1):
+    """
+    performs selection of top n prevalent code column for each dimension from the column statistics only, without
+    reading the data. invalid code columns (without zero or without non-zero value) are ignored.
+
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param n: int
+        number of prevanlent codes to be retained in each dimension. top n of prevalent codes are selected in each
+        dimension and rest are ignored
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped in each dimension. Default value
+         for m is 1. note: m =100 as per [1] and m =1 as per [2].
+    :param column_index: ColumnIndex
+        mapping of the columns to the dimensions. Default value: None - built from the columns of column_statistics
+    :param n_jobs: int
+        number of threads which select the codes of the dimensions in parallel, -1 uses all cores. Default value: 1
+    :return selected_columns: list - list of strings
+        list of selected code column names. for each dimension top n prevalent codes are selected.
+    """
 
-        # getting column names for the particular dimension
-        dim_cols = [col for col in col_names if col.startswith(dim_name)]
+    if column_index is None:
+        column_index = ColumnIndex(col_names=column_statistics.columns, dimension_prefixes=dimension_prefixes)
+    else:
+        column_index = column_index.restrict(col_names=column_statistics.columns)
+    valid = column_statistics.valid
 
-        # calculating prevalence count
-        prev_count = np.count_nonzero(input_df[dim_cols], axis=0)
-        dim_prevalence = pd.DataFrame(data={dim_name: dim_cols, 'prevalence_count': prev_count})
-        # Sorting dim_prevalence w.r.t count in descending order (high count first)
-        dim_prevalence = dim_prevalence.sort_values(by='prevalence_count', ascending=False,
-                                                    ignore_index=True)
-        # after grouping the count column is by default named as PID but it is actually prevalence count at this stage
+    # getting positions of the valid code columns of every dimension
+    dim_positions_list = [column_index.dimension_positions(dim_name) for dim_name in dimension_prefixes]
+    dim_positions_list = [dim_positions[valid[dim_positions]] for dim_positions in dim_positions_list]
 
-        # Selection of codes - codes which have prevalence count >= m is retained others discarded
-        dim_prevalence = dim_prevalence[dim_prevalence['prevalence_count'] >= m]
+    return select_dimensions_codes(
+        dimension_prefixes=dimension_prefixes,
+        dim_cols_list=[[column_statistics.columns[i] for i in dim_positions] for dim_positions in dim_positions_list],
+        dim_prev_counts=[column_statistics.prevalence_count[dim_positions] for dim_positions in dim_positions_list],
+        total_sp_count=column_statistics.n_rows, n=n, m=m, n_jobs=n_jobs)
 
-        # Making prevalence count symmetric -  if less than total_sp_count/2 keep the same value of count,
-        # else total_sp_count - prevalence_count
-        condition = dim_prevalence['prevalence_count'] < (total_sp_count / 2)
-        dim_prevalence['prevalence_count'] = dim_prevalence['prevalence_count'].where(
-            condition, total_sp_count - dim_prevalence['prevalence_count'])
-        # note - tot - dim_prevalence['prevalence_count'] is applied where condition is false
-        dim_prevalence = dim_prevalence.sort_values(by='prevalence_count', ascending=False, ignore_index=True)
 
-        # Further Selection - Among the selected coded - top n codes where selected
-        if dim_prevalence.shape[0] > n:
-            dim_prevalence = dim_prevalence[:n]
+def select_dimension_codes(dim_name: str, dim_cols: list, prev_count: np.ndarray, total_sp_count: int, n: int,
+                           m: int = 1):
+    """
+    performs selection of top n prevalent codes of a single dimension from its prevalence counts
+
+    :param dim_name: str
+        name of the dimension
+    :param dim_cols: list - list of strings
+        list of code column names of the dimension
+    :param prev_count: numpy.ndarray
+        prevalence count (number of patients with non-zero count) of each of dim_cols, in the same order
+    :param total_sp_count: int
+        total study population count
+    :param n: int
+        number of prevanlent codes to be retained in the dimension
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped. Default value for m is 1.
+    :return selected_columns: list - list of strings
+        list of selected code column names of the dimension (top n prevalent codes)
+    """
 
-        selected_columns.extend(dim_prevalence[dim_name])
+    prev_count = np.asarray(prev_count)
 
-    return selected_columns
+    # Selection of codes - codes which have prevalence count >= m is retained others discarded
+    retained = np.flatnonzero(prev_count >= m)
+    retained_count = prev_count[retained]
 
+    # Making prevalence count symmetric -  if less than total_sp_count/2 keep the same value of count,
+    # else total_sp_count - prevalence_count
+    symmetric_count = np.where(retained_count < (total_sp_count / 2), retained_count, total_sp_count - retained_count)
 
-def step_assess_recurrence(input_df: pd.DataFrame, selected_columns: list):
+    # Further Selection - Among the selected coded - top n codes where selected. ties of the symmetric count are
+    # broken by the higher prevalence count, then by the order of dim_cols
+    top_positions = retained[select_top_positions(values=symmetric_count, n=n, tie_values=retained_count)]
+
+    return [dim_cols[position] for position in top_positions]
+
+
+def select_top_positions(values: np.ndarray, n: int, tie_values: np.ndarray = None):
+    """
+    gives the positions of the n largest values in descending order with a partial selection - only the values which
+    can be among the top n are sorted. equal values are ordered by the larger tie_values first (if given) and then by
+    their positions, nan values are last. the result is identical to a stable descending sort followed by the first n.
+
+    :param values: numpy.ndarray
+        values to be selected from
+    :param n: int
+        number of positions to be selected
+    :param tie_values: numpy.ndarray
+        secondary values for equal values, aligned with values. Default value: None
+    :return positions: numpy.ndarray
+        positions of the top n values, from higher to lower value
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    is_nan = np.isnan(values)
+    filled = np.where(is_nan, -np.inf, values)
+    n = min(max(n, 0), values.shape[0])
+
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if n < values.shape[0]:
+        # n-th largest value, all values above it and all values equal to it are the candidates of the top n
+        kth_value = np.partition(filled, values.shape[0] - n)[values.shape[0] - n]
+        candidates = np.flatnonzero(filled >= kth_value)
+    else:
+        candidates = np.arange(values.shape[0])
+
+    keys = [candidates]
+    if tie_values is not None:
+        keys.append(-np.asarray(tie_values, dtype=np.float64)[candidates])
+    keys += [-filled[candidates], is_nan[candidates]]
+
+    return candidates[np.lexsort(keys)][:n]
+
+
+def step_assess_recurrence(input_df: pd.DataFrame, selected_columns: list, batch_size: int = 256,
+                           column_statistics: ColumnStatistics = None, recurrence_covariates: pd.DataFrame = None):
     """
     :param input_df: pandas.DataFrame
         Data frame with mandatory columns - 'PID', outcome, treatment, codes (like ICD, OPS) with corresponding
@@ -102,45 +312,176 @@ def step_assess_recurrence(input_df: pd.DataFrame, selected_columns: list):
         other optional columns of predefined and demographic columns.
     :param selected_columns: list - list of strings
         list of selected column names from input_df. for each dimension top n prevalent codes are selected.
+    :param batch_size: int
+        number of code columns which are processed together. Default value: 256
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns of input_df. if given, the median, third quartile and minimum are taken from it
+        and input_df is only read to create the covariates. Default value: None
+    :param recurrence_covariates: pandas.DataFrame
+        recurrence covariates of selected_columns from get_recurrence_covariates. if given, the thresholds are not
+        calculated again. Default value: None
     :return dim_covariates: pandas.DataFrame
         with columns wih suffixes _ontime, _median, _75p. for each of selected_columns element, three columns with
         mentioned suffixes will be present.
         the columns with _ontime, _median, _75p are similar to _once, _sporadic, _frequent respectively in paper [1]
     """
 
-    dim_sel_covar_counts = input_df[selected_columns]
+    # calculating the median, third quartile and minimum of the selected codes excluding 0s, batch by batch of columns
+    if recurrence_covariates is None:
+        if column_statistics is not None:
+            median, p_75, min_value = column_statistics.recurrence_thresholds(selected_columns)
+        else:
+            thresholds = [compute_recurrence_thresholds(input_df[selected_columns[start:start + batch_size]].to_numpy())
+                          for start in range(0, len(selected_columns), batch_size)]
+            if thresholds:
+                median, p_75, min_value = [np.concatenate(values) for values in zip(*thresholds)]
+            else:
+                median, p_75, min_value = np.zeros(0), np.zeros(0), np.zeros(0)
+
+        recurrence_covariates = get_recurrence_covariates(selected_columns=selected_columns, median=median, p_75=p_75,
+                                                          min_value=min_value)
+
+    # all covariates are written into one preallocated block
+    dim_covariates_values = np.empty((input_df.shape[0], recurrence_covariates.shape[0]), dtype=COVARIATE_DTYPE,
+                                     order='F')
+    for start in range(0, len(selected_columns), batch_size):
+        batch_columns = selected_columns[start:start + batch_size]
+        fill_recurrence_indicators(code_block=input_df[batch_columns].to_numpy(),
+                                   recurrence_covariates=recurrence_covariates, out=dim_covariates_values,
+                                   code_offset=start)
+
+    dim_covariates = pd.DataFrame(dim_covariates_values, columns=list(recurrence_covariates['Covariates Name']),
+                                  index=input_df.index, copy=False)
 
-    cov_dfs = []
+    return dim_covariates
 
-    for cov in dim_sel_covar_counts.columns:
 
-        df = pd.DataFrame(dim_sel_covar_counts[cov])
-        # calculating the median of a covariates excluding 0s - if we include 0s then for most of the covariates median
-        # (or/and 75th percentile) will be 0; then value for for cov_median, cov_75p will be 1 even the code occurred
-        # one time which lead to identical columns (singularity matrix problem)
-        median = np.median(df[df[cov] != 0])
-        # calculating the third quartile of a covariates excluding 0s
-        p_75 = np.percentile(df[df[cov] != 0], 75)
-        # print(cov,p_75)
-        df[cov + '_onetime'] = np.where(df[cov] > 0, 1, 0)
-        min_value = df[df[cov] != 0][cov].min()
-        if median > min_value:
-            # > min_value here because if median = min_value then both covariates cov_onetime and cov_median
-            # will be identical column (and result in Singular matrix)
-            df[cov + '_median'] = np.where(df[cov] >= median, 1, 0)
-        if (p_75 > min_value) and (median != p_75):
-            # here > min_value for above reason, and != median, then cov_median and cov_75p
-            # will be same (and result in Singular matrix)
-            df[cov + '_75p'] = np.where(df[cov] >= p_75, 1, 0)
-        cov_dfs.append(df.iloc[:, 1:])
+def compute_recurrence_thresholds(code_block: np.ndarray):
+    """
+    calculates the median, the third quartile and the minimum of the non-zero values of every column of a block of
+    code counts. the values are identical to np.median, np.percentile(..., 75) and min of the non-zero values of each
+    column.
+
+    the median (or/and 75th percentile) is calculated excluding 0s - if we include 0s then for most of the covariates
+    median will be 0; then value for for cov_median, cov_75p will be 1 even the code occurred one time which lead to
+    identical columns (singularity matrix problem)
+
+    :param code_block: numpy.ndarray
+        2-d array of code counts with one row per patient and one column per code
+    :return median: numpy.ndarray
+        median of the non-zero values of each column, nan for a column without non-zero values
+    :return p_75: numpy.ndarray
+        75th percentile of the non-zero values of each column, nan for a column without non-zero values
+    :return min_value: numpy.ndarray
+        minimum of the non-zero values of each column, nan for a column without non-zero values
+    """
 
-    dim_covariates = pd.concat(cov_dfs, axis=1)
+    return compute_column_statistics(code_block).recurrence_thresholds()
 
-    return dim_covariates
+
+def get_recurrence_covariates(selected_columns: list, median: np.ndarray, p_75: np.ndarray, min_value: np.ndarray):
+    """
+    gives the _onetime, _median and _75p covariates of the selected codes with their thresholds
+
+    :param selected_columns: list - list of strings
+        list of selected code column names
+    :param median: numpy.ndarray
+        median of the non-zero values of each selected code
+    :param p_75: numpy.ndarray
+        75th percentile of the non-zero values of each selected code
+    :param min_value: numpy.ndarray
+        minimum of the non-zero values of each selected code
+    :return recurrence_covariates: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'code', 'code_position' (position in selected_columns), 'recurrence'
+        ('onetime', 'median' or '75p') and 'threshold'. covariate is 1 if code count > 0 for 'onetime' and if
+        code count >= threshold for 'median' and '75p'
+    """
+
+    # > min_value here because if median = min_value then both covariates cov_onetime and cov_median
+    # will be identical column (and result in Singular matrix)
+    has_median = median > min_value
+    # here > min_value for above reason, and != median, then cov_median and cov_75p
+    # will be same (and result in Singular matrix)
+    has_75p = (p_75 > min_value) & (median != p_75)
+
+    rows = []
+    for position, cov in enumerate(selected_columns):
+        rows.append((cov + '_onetime', cov, position, 'onetime', 0.0))
+        if has_median[position]:
+            rows.append((cov + '_median', cov, position, 'median', median[position]))
+        if has_75p[position]:
+            rows.append((cov + '_75p', cov, position, '75p', p_75[position]))
+
+    recurrence_covariates = pd.DataFrame(rows, columns=['Covariates Name', 'code', 'code_position', 'recurrence',
+                                                        'threshold'])
+    recurrence_covariates['code_position'] = recurrence_covariates['code_position'].astype(np.int64)
+    recurrence_covariates['threshold'] = recurrence_covariates['threshold'].astype(np.float64)
+
+    return recurrence_covariates
+
+
+def fill_recurrence_indicators(code_block: np.ndarray, recurrence_covariates: pd.DataFrame, out: np.ndarray,
+                               code_offset: int = 0):
+    """
+    writes the 0/1 values of the recurrence covariates of a block of code columns into the preallocated array out
+
+    :param code_block: numpy.ndarray
+        2-d array of code counts with one row per patient and one column per code. column i is the code at position
+        code_offset + i of recurrence_covariates['code_position']
+    :param recurrence_covariates: pandas.DataFrame
+        DataFrame from get_recurrence_covariates
+    :param out: numpy.ndarray
+        2-d array with one row per patient and one column per row of recurrence_covariates
+    :param code_offset: int
+        position of the first column of code_block. Default value: 0
+    """
+
+    code_position = recurrence_covariates['code_position'].to_numpy()
+    is_onetime = recurrence_covariates['recurrence'].to_numpy() == 'onetime'
+    threshold = recurrence_covariates['threshold'].to_numpy()
+    in_block = (code_position >= code_offset) & (code_position < code_offset + code_block.shape[1])
+
+    # working on the transposed arrays, so that every code and covariate is a contiguous row. the comparisons are
+    # written directly into out without temporary arrays
+    code_block_t = np.asarray(code_block).T
+    out_t = out.T
+
+    for i in np.flatnonzero(in_block):
+        if is_onetime[i]:
+            np.greater(code_block_t[code_position[i] - code_offset], 0, out=out_t[i])
+        else:
+            np.greater_equal(code_block_t[code_position[i] - code_offset], threshold[i], out=out_t[i])
+
+
+def create_recurrence_covariates(input_df: pd.DataFrame, recurrence_covariates: pd.DataFrame):
+    """
+    creates the given recurrence covariates from the code columns of input_df with already known thresholds, for
+    example for a chunk of patients or for new patients
+
+    :param input_df: pandas.DataFrame
+        Data frame with the code columns of recurrence_covariates['code']
+    :param recurrence_covariates: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'code', 'recurrence' and 'threshold', see get_recurrence_covariates
+    :return dim_covariates: pandas.DataFrame
+        DataFrame with one column for each row of recurrence_covariates, rows aligned with input_df
+    """
+
+    codes = list(dict.fromkeys(recurrence_covariates['code']))
+    code_position = pd.Series(np.arange(len(codes)), index=codes)
+    recurrence_covariates = recurrence_covariates.assign(
+        code_position=code_position[recurrence_covariates['code']].to_numpy())
+
+    dim_covariates_values = np.empty((input_df.shape[0], recurrence_covariates.shape[0]), dtype=COVARIATE_DTYPE,
+                                     order='F')
+    fill_recurrence_indicators(code_block=input_df[codes].to_numpy(), recurrence_covariates=recurrence_covariates,
+                               out=dim_covariates_values)
+
+    return pd.DataFrame(dim_covariates_values, columns=list(recurrence_covariates['Covariates Name']),
+                        index=input_df.index, copy=False)
 
 
 def step_prioritize_select_covariates(dim_covariates: pd.DataFrame, input_df: pd.DataFrame, treatment: str,
-                                      outcome: str, k: int, not_code_columns: list):
+                                      outcome: str, k: int, not_code_columns: list, n_jobs: int = 1):
     """
     :param dim_covariates: pandas.DataFrame
         with columns wih suffixes _ontime, _median, _75p. for each of selected_columns element, three columns with
@@ -166,6 +507,10 @@ def step_prioritize_select_covariates(dim_covariates: pd.DataFrame, input_df: pd
     :param outcome: str
         name of the column which have outcome values
 
+    :param n_jobs: int
+        number of worker processes which score shards of the covariates in parallel, -1 uses all cores. the results
+        don't depend on n_jobs. Default value: 1
+
     :return output_df: pandas.DataFrame
         DataFrame with columns 'PID', outcome, treatment, Demographic and Predefined covariates
         (if given in the input_df) and columns with HDPS covariates
@@ -178,63 +523,444 @@ def step_prioritize_select_covariates(dim_covariates: pd.DataFrame, input_df: pd
         importance. higher importance for covariates which has higher abs(log(BiasMult)) value.
     """
 
-    # list of covariates' names (columns)
-    covariates_list = dim_covariates.columns
+    if n_jobs != 1:
+        # Calculation of BiasMult and the top k covariates of shards of the covariates in worker processes
+        sel_covariate_names, rank_df = select_top_k_covariates_shared_memory(
+            dim_covariates=dim_covariates, input_df=input_df, treatment=treatment, outcome=outcome, k=k, n_jobs=n_jobs)
+        log_selected_covariates(sel_covariate_names)
+    else:
+        # Calculation of BiasMult and abs_log_BiasMult for all covariates at once
+        treatment_values = input_df[treatment].to_numpy(dtype=np.int64)
+        outcome_values = input_df[outcome].to_numpy(dtype=np.int64)
+        cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(
+            covariate_block=dim_covariates.to_numpy(), treatment_values=treatment_values,
+            outcome_values=outcome_values)
+
+        sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+            k=k, covariate_names=list(dim_covariates.columns), cov_count=cov_count,
+            cov_treated_count=cov_treated_count, cov_outcome_count=cov_outcome_count,
+            treated_count=treatment_values.sum(), outcome_count=outcome_values.sum(), total_count=input_df.shape[0])
+
+    # filtering those k columns
+    dim_covariates_sel = dim_covariates[sel_covariate_names]
+
+    # output df
+    output_df = pd.concat([input_df[not_code_columns], dim_covariates_sel], axis=1)
 
-    dim_covariates_treat_outcome = pd.concat([input_df[['PID', treatment, outcome]], dim_covariates], axis=1)
-    # Calculation of BiasMult and abs_log_BiasMult
-    cov_bias_mult_list = []
-    for covariate in covariates_list:
-        # creating the contingency table between treatment and a particular covariate in the selected covariates
-        cont_tab = pd.crosstab(dim_covariates_treat_outcome[covariate], dim_covariates_treat_outcome[treatment])
+    return output_df, rank_df
 
-        # calculating PC0 and PC1
-        p_c0 = cont_tab.loc[1, 0] / cont_tab[0].sum()  # for treatment 0
-        p_c1 = cont_tab.loc[1, 1] / cont_tab[1].sum()  # for treatment 1
 
-        # Calculating rrcd
-        cont_tab_co = pd.crosstab(dim_covariates_treat_outcome[covariate], dim_covariates_treat_outcome[outcome])
+def step_prioritize_select_covariates_thresholds(dim_covariates: pd.DataFrame, input_df: pd.DataFrame,
+                                                 treatment: str, outcome_values: np.ndarray, k: int,
+                                                 not_code_columns: list):
+    """
+    calculates BiasMult and selects the top k covariates for several binary outcomes at once, for example for a list
+    of thresholds of a continuous outcome. the covariate block is packed once, the cell counts of the covariates with
+    treatment are shared and the outcome counts of all outcomes come from the same packed block.
+
+    :param dim_covariates: pandas.DataFrame
+        recurrence covariates, see step_prioritize_select_covariates
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', treatment and not_code_columns
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome_values: numpy.ndarray
+        2-d array of binary outcome values with one row per outcome, for example from process_outcome with a list of
+        thresholds
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :param not_code_columns: list - list of strings
+        list of names of columns without dimension names as prefixes
+    :return output_dfs: list - list of pandas.DataFrame
+        output_df of every outcome, see step_prioritize_select_covariates
+    :return rank_dfs: list - list of pandas.DataFrame
+        rank_df of every outcome, see step_prioritize_select_covariates
+    """
+
+    treatment_values = input_df[treatment].to_numpy(dtype=np.int64)
+    outcome_values = np.asarray(outcome_values, dtype=np.int64)
+
+    cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(
+        covariate_block=dim_covariates.to_numpy(), treatment_values=treatment_values, outcome_values=outcome_values)
+
+    output_dfs, rank_dfs = [], []
+    for i in range(outcome_values.shape[0]):
+        sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+            k=k, covariate_names=list(dim_covariates.columns), cov_count=cov_count,
+            cov_treated_count=cov_treated_count, cov_outcome_count=cov_outcome_count[i],
+            treated_count=treatment_values.sum(), outcome_count=outcome_values[i].sum(), total_count=input_df.shape[0])
+
+        output_dfs.append(pd.concat([input_df[not_code_columns], dim_covariates[sel_covariate_names]], axis=1))
+        rank_dfs.append(rank_df)
+
+    return output_dfs, rank_dfs
+
+
+def count_covariate_cells(covariate_block: np.ndarray, treatment_values: np.ndarray, outcome_values: np.ndarray):
+    """
+    calculates the cell counts of the contingency tables of every covariate with treatment and outcome in one pass.
+    the covariate block and the treatment and outcome vectors are packed to bits along the patients, the counts are
+    the numbers of 1 bits of the packed covariates and of their bitwise and with the packed treatment and outcome
+
+    :param covariate_block: numpy.ndarray
+        2-d 0/1 array with one row per patient and one column per covariate
+    :param treatment_values: numpy.ndarray
+        binary treatment values, aligned with the rows of covariate_block
+    :param outcome_values: numpy.ndarray
+        binary outcome values, aligned with the rows of covariate_block. a 2-d array with one row per binary outcome
+        (for example per threshold of a continuous outcome) gives the outcome counts of all outcomes from the same
+        packed covariate block
+    :return cov_count: numpy.ndarray
+        number of patients with covariate = 1, for each covariate
+    :return cov_treated_count: numpy.ndarray
+        number of patients with covariate = 1 and treatment = 1, for each covariate
+    :return cov_outcome_count: numpy.ndarray
+        number of patients with covariate = 1 and outcome = 1, for each covariate. one row per outcome for 2-d
+        outcome_values
+    """
+
+    packed_block = np.packbits(np.asarray(covariate_block), axis=0)
+    packed_treatment = np.packbits(np.asarray(treatment_values))[:, np.newaxis]
+    packed_outcome = np.packbits(np.asarray(outcome_values), axis=-1)
+
+    cov_count = count_bits(packed_block, axis=0)
+    cov_treated_count = count_bits(packed_block & packed_treatment, axis=0)
+    if packed_outcome.ndim == 1:
+        cov_outcome_count = count_bits(packed_block & packed_outcome[:, np.newaxis], axis=0)
+    else:
+        cov_outcome_count = np.array([count_bits(packed_block & packed[:, np.newaxis], axis=0)
+                                      for packed in packed_outcome],
+                                     dtype=np.int64).reshape(packed_outcome.shape[0], packed_block.shape[1])
+
+    return cov_count, cov_treated_count, cov_outcome_count
+
+
+def count_bits(packed: np.ndarray, axis: int):
+    """
+    :param packed: numpy.ndarray
+        uint8 array of bits packed with np.packbits
+    :param axis: int
+        axis along which the bits are counted
+    :return bit_count: numpy.ndarray
+        number of 1 bits along axis
+    """
+    bit_counts = np.bitwise_count(packed) if hasattr(np, 'bitwise_count') else POPCOUNT_TABLE[packed]
+    return bit_counts.sum(axis=axis, dtype=np.int64)
+
+
+def score_covariates(dim_covariates: pd.DataFrame, input_df: pd.DataFrame, treatment: str, outcome: str):
+    """
+    calculates BiasMult and abs(log(BiasMult)) of all covariates
+
+    :param dim_covariates: pandas.DataFrame
+        with columns wih suffixes _ontime, _median, _75p, rows aligned with the rows of input_df
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', outcome, treatment
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :return cov_bias_mult_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'BiasMult', 'abs_log_BiasMult', rows in the order of the columns of
+        dim_covariates
+    """
+
+    treatment_values = input_df[treatment].to_numpy(dtype=np.int64)
+    outcome_values = input_df[outcome].to_numpy(dtype=np.int64)
+
+    cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(
+        covariate_block=dim_covariates.to_numpy(), treatment_values=treatment_values, outcome_values=outcome_values)
+
+    cov_bias_mult_df = compute_bias_mult(covariate_names=list(dim_covariates.columns), cov_count=cov_count,
+                                         cov_treated_count=cov_treated_count, cov_outcome_count=cov_outcome_count,
+                                         treated_count=treatment_values.sum(), outcome_count=outcome_values.sum(),
+                                         total_count=input_df.shape[0])
+
+    return cov_bias_mult_df
 
-        rrcd = (cont_tab_co.loc[1, 1]/cont_tab_co.loc[1, :].sum()) / (cont_tab_co.loc[0, 1]/cont_tab_co.loc[0, :].sum())
+
+def compute_bias_mult(covariate_names: list, cov_count: np.ndarray, cov_treated_count: np.ndarray,
+                      cov_outcome_count: np.ndarray, treated_count: int, outcome_count: int, total_count: int):
+    """
+    calculates BiasMult and abs(log(BiasMult)) of all covariates at once from the cell counts of their contingency
+    tables with treatment and outcome
+
+    :param covariate_names: list - list of strings
+        list of names of the covariates
+    :param cov_count: numpy.ndarray
+        number of patients with covariate = 1, for each covariate
+    :param cov_treated_count: numpy.ndarray
+        number of patients with covariate = 1 and treatment = 1, for each covariate
+    :param cov_outcome_count: numpy.ndarray
+        number of patients with covariate = 1 and outcome = 1, for each covariate
+    :param treated_count: int
+        number of patients with treatment = 1
+    :param outcome_count: int
+        number of patients with outcome = 1
+    :param total_count: int
+        total study population count
+    :return cov_bias_mult_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'BiasMult', 'abs_log_BiasMult', rows in the order of covariate_names
+    """
+
+    cov_count = np.asarray(cov_count, dtype=np.int64)
+    cov_treated_count = np.asarray(cov_treated_count, dtype=np.int64)
+    cov_outcome_count = np.asarray(cov_outcome_count, dtype=np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # calculating PC0 (for treatment 0) and PC1 (for treatment 1)
+        p_c0 = (cov_count - cov_treated_count) / np.int64(total_count - treated_count)
+        p_c1 = cov_treated_count / np.int64(treated_count)
+
+        # Calculating rrcd
+        rrcd = (cov_outcome_count / cov_count) / \
+               ((np.int64(outcome_count) - cov_outcome_count) / (np.int64(total_count) - cov_count))
 
         # calculating absolute value of log of BiasMult
         bias_mult = (p_c1 * (rrcd - 1) + 1) / (p_c0 * (rrcd - 1) + 1)
 
-        abs_log_bias_mult = abs(math.log10(bias_mult))
+        abs_log_bias_mult = np.abs(np.log10(bias_mult))
         # here log is log to base 10 # followed as reference to R implementation of HDPS
 
-        cov_bias_mult_list.append((covariate, bias_mult, abs_log_bias_mult))
+    cov_bias_mult_df = pd.DataFrame(data={'Covariates Name': list(covariate_names), 'BiasMult': bias_mult,
+                                          'abs_log_BiasMult': abs_log_bias_mult})
 
-    # creating a df with columns 'Covariates Name', 'BiasMult', 'abs_log_BiasMult' , rows are the selected covariates
-    cov_bias_mult_df = pd.DataFrame(cov_bias_mult_list, columns=['Covariates Name', 'BiasMult', 'abs_log_BiasMult'])
-    # sorting the df in descending order with respect to abs_log_BiasMult
-    cov_bias_mult_df = cov_bias_mult_df.sort_values(by='abs_log_BiasMult', ascending=False, ignore_index=True)
+    return cov_bias_mult_df
 
-    # selecting the top k  covariates with higher abs_log_BiasMult value
-    if cov_bias_mult_df.shape[0] > k:
-        cov_bias_mult_df = cov_bias_mult_df[:k]
+
+def select_top_k_covariates(cov_bias_mult_df: pd.DataFrame, k: int):
+    """
+    selects the top k covariates with higher abs_log_BiasMult value
+
+    :param cov_bias_mult_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'BiasMult', 'abs_log_BiasMult', one row for each covariate
+    :param k: int
+        number of final HDPS_covariates required
+    :return sel_covariate_names: list - list of strings
+        names of the k selected covariates, from higher to lower abs_log_BiasMult value
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    # selecting the top k covariates with higher abs_log_BiasMult value without sorting all covariates. covariates with
+    # equal values keep the order of cov_bias_mult_df, nan values are last
+    top_positions = select_top_positions(values=cov_bias_mult_df['abs_log_BiasMult'].to_numpy(), n=k)
+    cov_bias_mult_df = cov_bias_mult_df.iloc[top_positions].reset_index(drop=True)
 
     # name of the k selected covariates
     sel_covariate_names = list(cov_bias_mult_df['Covariates Name'])
 
     # df with selected covariates, abs_log_BiasMult and rank
-    rank_df = cov_bias_mult_df[['Covariates Name', 'abs_log_BiasMult']]
+    rank_df = cov_bias_mult_df[['Covariates Name', 'abs_log_BiasMult']].copy()
     rank_df['Rank'] = np.arange(1, (rank_df.shape[0] + 1))
 
-    # filtering those k columns
-    dim_covariates_sel = dim_covariates_treat_outcome[sel_covariate_names]
+    return sel_covariate_names, rank_df
 
-    # output df
-    output_df = pd.concat([input_df[not_code_columns], dim_covariates_sel], axis=1)
 
+def select_top_k_from_cell_counts(k: int, covariate_names: list, cov_count: np.ndarray, cov_treated_count: np.ndarray,
+                                  cov_outcome_count: np.ndarray, treated_count: int, outcome_count: int,
+                                  total_count: int):
+    """
+    calculates BiasMult of the covariates from the cell counts of their contingency tables with treatment and outcome
+    and selects the top k covariates. every backend counts the cells in its own layout and selects the covariates here
+
+    :param k: int
+        number of final HDPS_covariates required
+
+    for covariate_names, cov_count, cov_treated_count, cov_outcome_count, treated_count, outcome_count and total_count
+    see compute_bias_mult
+
+    :return sel_covariate_names: list - list of strings
+        names of the k selected covariates, from higher to lower abs_log_BiasMult value
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    cov_bias_mult_df = compute_bias_mult(covariate_names=covariate_names, cov_count=cov_count,
+                                         cov_treated_count=cov_treated_count, cov_outcome_count=cov_outcome_count,
+                                         treated_count=treated_count, outcome_count=outcome_count,
+                                         total_count=total_count)
+
+    sel_covariate_names, rank_df = select_top_k_covariates(cov_bias_mult_df=cov_bias_mult_df, k=k)
+    log_selected_covariates(sel_covariate_names)
+
+    return sel_covariate_names, rank_df
+
+
+def select_recurrence_covariates(recurrence_covariates: pd.DataFrame, covariate_names: list):
+    """
+    :param recurrence_covariates: pandas.DataFrame
+        DataFrame from get_recurrence_covariates
+    :param covariate_names: list - list of strings
+        names of covariates of recurrence_covariates, for example the selected covariates
+    :return sel_recurrence_covariates: pandas.DataFrame
+        rows of recurrence_covariates of covariate_names, in the order of covariate_names
+    """
+    return recurrence_covariates.set_index('Covariates Name').loc[list(covariate_names)].reset_index()
+
+
+def log_selected_covariates(sel_covariate_names: list):
+    """
+    :param sel_covariate_names: list - list of strings
+        names of the selected covariates, from higher to lower abs_log_BiasMult value
+    """
     logging.info('List of selected HDPS covarities (with higher to lower values of absolute log BiasMult): ' +
                  str(sel_covariate_names))
 
-    return output_df, rank_df
+
+def log_invalid_code_columns(invalid_code_columns: list):
+    """
+    reports the invalid code columns, which are ignored by the next steps
+
+    :param invalid_code_columns: list - list of strings
+        names of the code columns without a zero value or without a non-zero value
+    """
+    if len(invalid_code_columns) > 0:
+        logging.warning("Some code column(s) is/are invalid. The invalid code columns are ignored. The code column is "
+                        "expected to have at least one zero value and one non-zero value")
+        logging.warning("List of ignored invalid code columns: " + str(invalid_code_columns))
+
+
+def score_covariate_shard(task: tuple):
+    """
+    calculates BiasMult of a shard of the covariates in shared memory and selects the top k covariates of the shard.
+    runs in a worker process of select_top_k_covariates_shared_memory
+
+    :param task: tuple
+        (shm_name, shape, start, stop, packed_treatment, packed_outcome, total_count, k) - name of the shared memory
+        block with the covariates packed to bits along the patients (one row per covariate) of the given shape, first
+        and last + 1 covariate position of the shard, treatment and outcome values of the patients packed to bits,
+        number of patients and number of covariates to be selected
+    :return shard_top_k: pandas.DataFrame
+        DataFrame with columns 'Covariates Name' (position of the covariate), 'BiasMult' and 'abs_log_BiasMult' of the
+        top k covariates of the shard, in the order of their positions
+    """
+
+    shm_name, shape, start, stop, packed_treatment, packed_outcome, total_count, k = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        packed_block_t = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)[start:stop]
+
+        cov_count = count_bits(packed_block_t, axis=1)
+        cov_treated_count = count_bits(packed_block_t & packed_treatment, axis=1)
+        cov_outcome_count = count_bits(packed_block_t & packed_outcome, axis=1)
+        del packed_block_t
+    finally:
+        shm.close()
+
+    cov_bias_mult_df = compute_bias_mult(covariate_names=np.arange(start, stop), cov_count=cov_count,
+                                         cov_treated_count=cov_treated_count, cov_outcome_count=cov_outcome_count,
+                                         treated_count=count_bits(packed_treatment, axis=0),
+                                         outcome_count=count_bits(packed_outcome, axis=0), total_count=total_count)
+
+    sel_positions, _ = select_top_k_covariates(cov_bias_mult_df=cov_bias_mult_df, k=k)
+
+    return cov_bias_mult_df.set_index('Covariates Name').loc[np.sort(sel_positions)].reset_index()
+
+
+def select_top_k_covariates_shared_memory(dim_covariates: pd.DataFrame, input_df: pd.DataFrame, treatment: str,
+                                          outcome: str, k: int, n_jobs: int = -1):
+    """
+    calculates BiasMult of all covariates in worker processes and selects the top k covariates. the covariates are
+    packed once to bits into shared memory and split into one shard per worker, each worker returns the top k
+    covariates of its shard. the merge of the shards gives the same covariates and ranks as select_top_k_covariates.
+
+    :param dim_covariates: pandas.DataFrame
+        with columns wih suffixes _ontime, _median, _75p, rows aligned with the rows of input_df
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', outcome, treatment
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param k: int
+        number of final HDPS_covariates required
+    :param n_jobs: int
+        number of worker processes, -1 uses all cores. Default value: -1
+    :return sel_covariate_names: list - list of strings
+        names of the k selected covariates, from higher to lower abs_log_BiasMult value
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    packed_treatment = np.packbits(input_df[treatment].to_numpy())
+    packed_outcome = np.packbits(input_df[outcome].to_numpy())
+    covariate_names = list(dim_covariates.columns)
+    shape = (len(covariate_names), packed_treatment.shape[0])
+
+    shm = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1], 1))
+    try:
+        # one row of bits per covariate, so that the covariates of a shard are contiguous
+        packed_block_t = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        packed_block_t[:] = np.packbits(dim_covariates.to_numpy(), axis=0).T
+        del packed_block_t
+
+        n_shards = min(get_n_workers(n_jobs), max(shape[0], 1))
+        bounds = np.linspace(0, shape[0], n_shards + 1).astype(np.int64)
+        tasks = [(shm.name, shape, bounds[i], bounds[i + 1], packed_treatment, packed_outcome, input_df.shape[0], k)
+                 for i in range(n_shards)]
+        shard_top_k = process_map(score_covariate_shard, tasks, n_jobs=n_shards)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # the candidates are in the order of their positions, so that the stable sort breaks ties as the serial path
+    candidates = pd.concat(shard_top_k, ignore_index=True)
+    candidates['Covariates Name'] = [covariate_names[position] for position in candidates['Covariates Name']]
+
+    return select_top_k_covariates(cov_bias_mult_df=candidates, k=k)
+
+
+def validate_binary_columns(input_df: pd.DataFrame, columns: list):
+    """
+    checks that the given columns are binary and contain both 0 and 1
+
+    :param input_df: pandas.DataFrame
+        Data frame which contains the columns
+    :param columns: list - list of strings
+        list of names of columns to be checked, for example treatment and outcome
+    """
+
+    for column in columns:
+        if set(input_df[column].unique()) != {0, 1}:
+            message = f"Treatment column and outcome column must be binary and contain both 0 and 1. Column {column} " \
+                      f"contains {list(input_df[column].unique())}"
+            raise ColumnNotBinaryError(message=message)
+
+
+def get_valid_code_column_mask(input_df: pd.DataFrame, code_columns: list, column_statistics: ColumnStatistics = None,
+                               batch_size: int = 256, n_jobs: int = 1):
+    """
+    checks the code columns for at least one zero value and one non-zero value with a non-zero count reduction over
+    blocks of code columns, without copying input_df
+
+    :param input_df: pandas.DataFrame
+        Data frame with the code columns
+    :param code_columns: list - list of strings
+        names of the code columns
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns of input_df. if given, the validity of the code columns is taken from it instead
+        of scanning input_df. Default value: None
+    :param batch_size: int
+        number of code columns which are checked together. Default value: 256
+    :param n_jobs: int
+        number of threads which check batches in parallel, -1 uses all cores. Default value: 1
+    :return valid: numpy.ndarray
+        boolean mask, True for each of code_columns which has at least one zero value and one non-zero value
+    """
+
+    if column_statistics is not None:
+        return column_statistics.valid[column_statistics.get_positions(code_columns)]
+
+    prev_count = get_prevalence_count(input_df=input_df, code_columns=list(code_columns), batch_size=batch_size,
+                                      n_jobs=n_jobs)
+
+    return (prev_count > 0) & (prev_count < input_df.shape[0])
 
 
 def input_data_validation(input_df: pd.DataFrame, treatment: str, outcome: str,
-                          not_code_columns: list):
+                          not_code_columns: list, column_statistics: ColumnStatistics = None,
+                          drop_invalid: bool = True):
     """
     performs validation of input_df columns. Removes invalid code columns.
 
@@ -253,35 +979,34 @@ def input_data_validation(input_df: pd.DataFrame, treatment: str, outcome: str,
     :param not_code_columns: list - list of strings
         list of names of columns without dimension names as prefixes
 
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns of input_df. if given, the validity of the code columns is taken from it instead
+        of scanning input_df. Default value: None
+
+    :param drop_invalid: bool
+        if False, the invalid code columns are only reported and input_df is returned without copying it, the valid
+        code columns are given by get_valid_code_column_mask. Default value: True
+
     :return: input_df: pandas.DataFrame
         Data frame with mandatory columns - 'PID', outcome, treatment, codes (like ICD, OPS) with corresponding
         dimension name as prefix - examples: 'DimensionName1_ICDcodeName1', 'DimensionName1_ICDcodeName2',
         'DimensionName1_ICDcodeName1', 'DimensionName2_OPScodeName1', 'DimensionName2_OPScodeName1' and
         other optional columns of predefined and demographic columns. This is an updated input_df where invalid code
-        columns are removed.
+        columns are removed (if drop_invalid).
     """
 
-    for column in [treatment, outcome]:
-        if set(input_df[column].unique()) != {0, 1}:
-            message = f"Treatment column and outcome column must be binary and contain both 0 and 1. Column {column} " \
-                      f"contains {list(input_df[column].unique())}"
-            raise ColumnNotBinaryError(message=message)
-
-    code_column_df = input_df.drop(columns=not_code_columns)
-    invalid_code_columns = []
+    validate_binary_columns(input_df=input_df, columns=[treatment, outcome])
 
-    for col in code_column_df.columns:
-        code_unique_value = input_df[col].unique()
+    not_code_columns = set(not_code_columns)
+    code_columns = [col for col in input_df.columns if col not in not_code_columns]
 
-        # check for zero entry presence and at least one non-zero entry presence
-        if (code_unique_value.all()) or (not code_unique_value.any()):
-            invalid_code_columns.append(col)
-
-    if len(invalid_code_columns) > 0:
-        logging.warning("Some code column(s) is/are invalid. The invalid code columns are ignored. The code column is "
-                        "expected to have at least one zero value and one non-zero value")
-        logging.warning("List of ignored invalid code columns: " + str(invalid_code_columns))
+    # reductions over blocks of code columns instead of the unique values of every column
+    valid = get_valid_code_column_mask(input_df=input_df, code_columns=code_columns,
+                                       column_statistics=column_statistics)
+    invalid_code_columns = [col for col, is_valid in zip(code_columns, valid) if not is_valid]
+    log_invalid_code_columns(invalid_code_columns)
 
+    if drop_invalid and len(invalid_code_columns) > 0:
         input_df = input_df.drop(columns=invalid_code_columns)
 
     return input_df
@@ -300,24 +1025,92 @@ def process_outcome(input_df: pd.DataFrame, outcome: str, threshold: Union[str,
     :param outcome: str
         name of the column which have outcome values
 
-    :param threshold: Union[str, float]
+    :param threshold: Union[str, float, list]
         applicable only if outcome_cont == True.
         a cut-off threshold to make a continous outcome to binary outcome.
         possible values for threshold are '75p', 'median', integer or float value given by the user.
         if '75p', 75th percentile value of the outcome column is taken as cut-off threshold
         if 'median', median value of the outcome column is taken as cut-off threshold
         if integer or float value, the given value is taken as cut-off threshold
+        a list of thresholds gives the binary outcome of every threshold, the outcome is sorted once for all
+        thresholds
 
     :return: ndarray
-        converted outcome column in binary form
+        converted outcome column in binary form, a 2-d array with one row per threshold for a list of thresholds
     """
 
     logging.info('Processing Outcome')
+    if isinstance(threshold, (list, tuple)):
+        if len(threshold) == 0:
+            raise InvalidThresholdValueError(message="Provided list of thresholds is empty")
+        outcome_values = input_df[outcome].to_numpy()
+        threshold_values = get_outcome_threshold_values(outcome_values=outcome_values, thresholds=threshold)
+        converted_outcome = (outcome_values[np.newaxis] > threshold_values[:, np.newaxis]).astype(np.int64)
+
+        outcome_count = converted_outcome.sum(axis=1)
+        for i in np.flatnonzero((outcome_count == 0) | (outcome_count == outcome_values.shape[0])):
+            message = f"Threshold value {threshold_values[i]} of threshold {threshold[i]} is too small and causes " \
+                      f"all converted outcome values to be {np.unique(converted_outcome[i])}"
+            raise ConvertedOutcomeNotBinaryError(message=message)
+
+        return converted_outcome
+
+    outcome_values = input_df[outcome].to_numpy()
+    # the values at the ranks of the median and the 75th percentile are selected without sorting the outcome
+    threshold_value = get_threshold_value(threshold=threshold,
+                                          value_at_rank=lambda ranks: np.partition(outcome_values, ranks)[ranks],
+                                          count=outcome_values.shape[0])
+
+    # converting continuous outcome column to binary
+    converted_outcome = np.where(outcome_values > threshold_value, 1, 0)
+    if len(set(np.unique(converted_outcome))) == 1:
+        message = f"Threshold value {threshold_value} of threshold {threshold} is too small and causes all converted " \
+                  f"outcome values to be {np.unique(converted_outcome)}"
+        raise ConvertedOutcomeNotBinaryError(message=message)
+
+    return converted_outcome
+
+
+def get_outcome_threshold_values(outcome_values: np.ndarray, thresholds: list):
+    """
+    calculates the cut-off thresholds of a continuous outcome for a list of thresholds. the outcome values are sorted
+    once for all thresholds. the values are identical to the threshold values of process_outcome.
+
+    :param outcome_values: numpy.ndarray
+        1-d array of outcome values
+    :param thresholds: list
+        list of '75p', 'median', integer or float values, see process_outcome
+    :return threshold_values: numpy.ndarray
+        the cut-off threshold of every threshold
+    """
+
+    sorted_values = np.sort(outcome_values)
+
+    return np.array([get_threshold_value(threshold=threshold, value_at_rank=lambda ranks: sorted_values[ranks],
+                                         count=sorted_values.shape[0]) for threshold in thresholds], dtype=np.float64)
+
+
+def get_threshold_value(threshold: Union[str, float], value_at_rank: Callable, count: int):
+    """
+    calculates the cut-off threshold of a continuous outcome from its sorted values, which are accessed by rank. the
+    75th percentile and the median are identical to np.percentile(..., 75) and np.median of the outcome values.
+
+    :param threshold: Union[str, float]
+        '75p', 'median', integer or float value, see process_outcome
+    :param value_at_rank: Callable
+        function which takes an array of 0-based ranks and returns the values at these ranks of the sorted outcome
+        values, see hdps.column_statistics.median_p75_at_ranks
+    :param count: int
+        number of outcome values
+    :return threshold_value: float
+        the cut-off threshold, outcome > threshold_value is converted to 1 else 0
+    """
+
     if threshold == '75p':
-        threshold_value = np.percentile(input_df[outcome], 75)
+        threshold_value = float(median_p75_at_ranks(value_at_rank=value_at_rank, count=count)[1])
         logging.info('Threshold is 75 percentile: ' + str(threshold_value))
     elif threshold == 'median':
-        threshold_value = np.median(input_df[outcome])
+        threshold_value = float(median_p75_at_ranks(value_at_rank=value_at_rank, count=count)[0])
         logging.info('Threshold is median: ' + str(threshold_value))
     elif isinstance(threshold, (int, float)):
         threshold_value = threshold
@@ -327,11 +1120,4 @@ def process_outcome(input_df: pd.DataFrame, outcome: str, threshold: Union[str,
                   f"Provided value: {threshold}"
         raise InvalidThresholdValueError(message=message)
 
-    # converting continuous outcome column to binary
-    converted_outcome = np.where(input_df[outcome] > threshold_value, 1, 0)
-    if len(set(np.unique(converted_outcome))) == 1:
-        message = f"Threshold value {threshold_value} of threshold {threshold} is too small and causes all converted " \
-                  f"outcome values to be {np.unique(converted_outcome)}"
-        raise ConvertedOutcomeNotBinaryError(message=message)
-
-    return converted_outcome
\ No newline at end of file
+    return threshold_value
@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+from hdps.algorithm_steps import select_dimension_codes, get_recurrence_covariates, select_top_k_from_cell_counts, \
+    validate_binary_columns, log_invalid_code_columns, COVARIATE_DTYPE
+from hdps.column_index import ColumnIndex
+from hdps.exceptions import DuplicateIdError
+from hdps.parallel import parallel_map
+
+
+def to_arrow_table(data):
+    """
+    converts the input of hdps_arrow_implementation to a pyarrow Table. requires pyarrow.
+
+    :param data: pyarrow.Table, polars.DataFrame or pandas.DataFrame
+        data in the wide format of hdps_implementation
+    :return table: pyarrow.Table
+        data as Arrow table, without copying the columns of a pyarrow or polars input
+    :return kind: str
+        'arrow', 'polars' or 'pandas' - the type of data, see from_arrow_table
+    """
+
+    import pyarrow as pa
+
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False), 'pandas'
+    if type(data).__module__.split('.')[0] == 'polars':
+        return data.to_arrow(), 'polars'
+    if isinstance(data, pa.Table):
+        return data, 'arrow'
+
+    raise TypeError(f"Expected a pyarrow Table, a polars DataFrame or a pandas DataFrame, got {type(data)}")
+
+
+def from_arrow_table(table, kind: str):
+    """
+    converts an Arrow table back to the type of the input of hdps_arrow_implementation
+
+    :param table: pyarrow.Table
+        Arrow table
+    :param kind: str
+        'arrow', 'polars' or 'pandas', see to_arrow_table
+    :return data: pyarrow.Table, polars.DataFrame or pandas.DataFrame
+        table as the given kind
+    """
+
+    if kind == 'pandas':
+        return table.to_pandas()
+    if kind == 'polars':
+        import polars as pl
+        return pl.from_arrow(table)
+
+    return table
+
+
+def arrow_get_prevalence_count(table, code_columns: list, n_jobs: int = 1):
+    """
+    calculates the prevalence count (number of non-zero values) of code columns with Arrow compute kernels, column by
+    column in n_jobs threads
+
+    :param table: pyarrow.Table
+        Arrow table with the code columns
+    :param code_columns: list - list of strings
+        names of the code columns
+    :param n_jobs: int
+        number of threads, -1 uses all cores. Default value: 1
+    :return prev_count: numpy.ndarray
+        number of non-zero values of each of code_columns
+    """
+
+    import pyarrow.compute as pc
+
+    prev_count = parallel_map(lambda col: pc.sum(pc.not_equal(table[col], 0)).as_py() or 0, list(code_columns),
+                              n_jobs=n_jobs)
+
+    return np.array(prev_count, dtype=np.int64)
+
+
+def arrow_input_data_validation(table, treatment: str, outcome: str, code_columns: list, n_jobs: int = 1):
+    """
+    performs validation of the Arrow input. Ignores invalid code columns.
+
+    :param table: pyarrow.Table
+        Arrow table with mandatory columns - 'PID', outcome, treatment and the code columns
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values, binary
+    :param code_columns: list - list of strings
+        names of the code columns
+    :param n_jobs: int
+        number of threads which scan the code columns, -1 uses all cores. Default value: 1
+    :return code_columns: list - list of strings
+        names of the valid code columns, with at least one zero value and one non-zero value
+    :return prev_count: numpy.ndarray
+        prevalence count of each valid code column
+    """
+
+    import pyarrow.compute as pc
+
+    for column in [treatment, outcome]:
+        validate_binary_columns(input_df=pd.DataFrame({column: pc.unique(table[column]).to_numpy()}),
+                                columns=[column])
+
+    prev_count = arrow_get_prevalence_count(table=table, code_columns=code_columns, n_jobs=n_jobs)
+    valid = (prev_count > 0) & (prev_count < table.num_rows)
+
+    code_columns = list(code_columns)
+    log_invalid_code_columns([col for col, is_valid in zip(code_columns, valid) if not is_valid])
+
+    return [col for col, is_valid in zip(code_columns, valid) if is_valid], prev_count[valid]
+
+
+def arrow_step_identify_candidate_empirical_covariates(table, code_columns: list, prev_count: np.ndarray,
+                                                       dimension_prefixes: list, n: int, m: int = 1):
+    """
+    performs selection of top n prevalent codes in each dimension from the prevalence counts of the Arrow input
+
+    :param table: pyarrow.Table
+        Arrow table with mandatory column 'PID'
+    :param code_columns: list - list of strings
+        names of the valid code columns, see arrow_input_data_validation
+    :param prev_count: numpy.ndarray
+        prevalence count of each of code_columns
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param n: int
+        number of prevanlent codes to be retained in each dimension
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped. Default value for m is 1.
+    :return selected_columns: list - list of strings
+        list of selected code column names. for each dimension top n prevalent codes are selected.
+    """
+
+    import pyarrow.compute as pc
+
+    # check for duplicates
+    if pc.count_distinct(table['PID']).as_py() != table.num_rows:
+        raise DuplicateIdError('Duplicates in PID column')
+
+    column_index = ColumnIndex(col_names=code_columns, dimension_prefixes=dimension_prefixes)
+
+    selected_columns = []
+    for dim_name in dimension_prefixes:
+        dim_positions = column_index.dimension_positions(dim_name)
+        selected_columns.extend(select_dimension_codes(
+            dim_name=dim_name, dim_cols=[code_columns[i] for i in dim_positions], prev_count=prev_count[dim_positions],
+            total_sp_count=table.num_rows, n=n, m=m))
+
+    return selected_columns
+
+
+def arrow_compute_recurrence_thresholds(table, selected_columns: list, n_jobs: int = 1):
+    """
+    calculates the median, the third quartile and the minimum of the non-zero values of code columns with Arrow compute
+    kernels, column by column in n_jobs threads. the quantiles are linearly interpolated as np.median and
+    np.percentile.
+
+    :param table: pyarrow.Table
+        Arrow table with the code columns
+    :param selected_columns: list - list of strings
+        names of the code columns
+    :param n_jobs: int
+        number of threads, -1 uses all cores. Default value: 1
+    :return median: numpy.ndarray
+        median of the non-zero values of each column, nan for a column without non-zero values
+    :return p_75: numpy.ndarray
+        75th percentile of the non-zero values of each column, nan for a column without non-zero values
+    :return min_value: numpy.ndarray
+        minimum of the non-zero values of each column, nan for a column without non-zero values
+    """
+
+    import pyarrow.compute as pc
+
+    def column_thresholds(col):
+        values = table[col]
+        non_zero = pc.filter(values, pc.not_equal(values, 0))
+        if len(non_zero) == 0:
+            return np.nan, np.nan, np.nan
+        median, p_75 = pc.quantile(non_zero, q=[0.5, 0.75], interpolation='linear').to_pylist()
+        return median, p_75, pc.min(non_zero).as_py()
+
+    thresholds = parallel_map(column_thresholds, list(selected_columns), n_jobs=n_jobs)
+
+    return tuple(np.array([values[i] for values in thresholds], dtype=np.float64) for i in range(3))
+
+
+def arrow_step_assess_recurrence(table, selected_columns: list, n_jobs: int = 1):
+    """
+    creates the recurrence covariates of the selected codes as boolean Arrow columns
+
+    :param table: pyarrow.Table
+        Arrow table with the code columns of selected_columns
+    :param selected_columns: list - list of strings
+        list of selected code column names. for each dimension top n prevalent codes are selected.
+    :param n_jobs: int
+        number of threads, -1 uses all cores. Default value: 1
+    :return dim_covariates: pyarrow.Table
+        boolean columns with suffixes _onetime, _median, _75p, see step_assess_recurrence
+    """
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    median, p_75, min_value = arrow_compute_recurrence_thresholds(table=table, selected_columns=selected_columns,
+                                                                  n_jobs=n_jobs)
+    recurrence_covariates = get_recurrence_covariates(selected_columns=selected_columns, median=median, p_75=p_75,
+                                                      min_value=min_value)
+
+    def indicator(row):
+        if row.recurrence == 'onetime':
+            return pc.greater(table[row.code], 0)
+        return pc.greater_equal(table[row.code], row.threshold)
+
+    columns = parallel_map(indicator, list(recurrence_covariates.itertuples(index=False)), n_jobs=n_jobs)
+
+    return pa.table(columns, names=list(recurrence_covariates['Covariates Name']))
+
+
+def arrow_step_prioritize_select_covariates(dim_covariates, table, treatment: str, outcome: str, k: int,
+                                            not_code_columns: list, n_jobs: int = 1):
+    """
+    calculates BiasMult of the boolean covariates with Arrow compute kernels and selects the top k covariates
+
+    :param dim_covariates: pyarrow.Table
+        boolean recurrence covariates, see arrow_step_assess_recurrence
+    :param table: pyarrow.Table
+        Arrow table with mandatory columns - 'PID', outcome, treatment
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values, binary
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :param not_code_columns: list - list of strings
+        list of names of columns without dimension names as prefixes
+    :param n_jobs: int
+        number of threads, -1 uses all cores. Default value: 1
+    :return output_table: pyarrow.Table
+        Arrow table with not_code_columns of table and columns with HDPS covariates of COVARIATE_DTYPE
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    is_treated = pc.not_equal(table[treatment], 0)
+    has_outcome = pc.not_equal(table[outcome], 0)
+
+    def cell_counts(name):
+        covariate = dim_covariates[name]
+        return [pc.sum(values).as_py() or 0
+                for values in [covariate, pc.and_(covariate, is_treated), pc.and_(covariate, has_outcome)]]
+
+    covariate_names = list(dim_covariates.column_names)
+    counts = np.array(parallel_map(cell_counts, covariate_names, n_jobs=n_jobs), dtype=np.int64).reshape(-1, 3)
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+        k=k, covariate_names=covariate_names, cov_count=counts[:, 0], cov_treated_count=counts[:, 1],
+        cov_outcome_count=counts[:, 2], treated_count=pc.sum(is_treated).as_py() or 0,
+        outcome_count=pc.sum(has_outcome).as_py() or 0, total_count=table.num_rows)
+
+    covariate_type = pa.from_numpy_dtype(COVARIATE_DTYPE)
+    output_table = table.select(not_code_columns)
+    for name in sel_covariate_names:
+        output_table = output_table.append_column(name, pc.cast(dim_covariates[name], covariate_type))
+
+    return output_table, rank_df
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from hdps.algorithm_steps import compute_bias_mult, select_top_positions
+from hdps.parallel import get_n_workers, process_map
+
+# maximum number of elements of the bootstrap weight matrices of one batch of replicates
+MAX_WEIGHT_ELEMENTS = 2 ** 24
+
+
+def get_block_dtype(n_patients: int):
+    """
+    :param n_patients: int
+        number of patients
+    :return dtype: numpy.dtype
+        float type of the covariate block and the weights - float32, which holds every integer below 2 ** 24 exactly,
+        so the weighted cell counts (at most n_patients) are exact, and float64 for more patients
+    """
+    return np.dtype(np.float32) if n_patients < 2 ** 24 else np.dtype(np.float64)
+
+
+def rank_covariates(abs_log_bias_mult: np.ndarray):
+    """
+    ranks the covariates by abs_log_BiasMult as select_top_k_covariates - higher values first, equal values in the
+    order of the covariates and nan values last
+
+    :param abs_log_bias_mult: numpy.ndarray
+        abs_log_BiasMult of each covariate
+    :return ranks: numpy.ndarray
+        rank of each covariate, starting at 1
+    """
+
+    order = select_top_positions(values=abs_log_bias_mult, n=abs_log_bias_mult.shape[0])
+    ranks = np.empty(abs_log_bias_mult.shape[0], dtype=np.int64)
+    ranks[order] = np.arange(1, abs_log_bias_mult.shape[0] + 1)
+
+    return ranks
+
+
+def bootstrap_ranks_block(covariate_block_t: np.ndarray, treatment_values: np.ndarray, outcome_values: np.ndarray,
+                          seeds: list):
+    """
+    calculates the ranks of the covariates in bootstrap replicates. a replicate is not a physical resample of the
+    patients but a multinomial count (weight) of every patient, the cell counts of the replicate are weighted sums -
+    matrix products of the covariate block with the weights of a batch of replicates.
+
+    :param covariate_block_t: numpy.ndarray
+        transposed 0/1 covariate block with one row per covariate and one column per patient, of the dtype of
+        get_block_dtype
+    :param treatment_values: numpy.ndarray
+        binary treatment values of the patients
+    :param outcome_values: numpy.ndarray
+        binary outcome values of the patients
+    :param seeds: list - list of numpy.random.SeedSequence
+        one seed for each replicate
+    :return ranks: numpy.ndarray
+        rank of each covariate (columns) in each replicate (rows)
+    """
+
+    n_patients = covariate_block_t.shape[1]
+    batch_size = int(max(1, min(len(seeds), MAX_WEIGHT_ELEMENTS // max(3 * n_patients, 1))))
+    probabilities = np.full(n_patients, 1 / n_patients)
+
+    ranks = np.empty((len(seeds), covariate_block_t.shape[0]), dtype=np.int64)
+    for start in range(0, len(seeds), batch_size):
+        batch_seeds = seeds[start:start + batch_size]
+        weights = np.vstack([np.random.default_rng(seed).multinomial(n_patients, probabilities)
+                             for seed in batch_seeds]).astype(np.float64)
+
+        # weighted cell counts of all covariates and replicates of the batch in one matrix product, in the dtype of
+        # the block - exact, as every partial sum is an integer of at most n_patients
+        counts = covariate_block_t @ np.vstack([weights, weights * treatment_values,
+                                                weights * outcome_values]).T.astype(covariate_block_t.dtype)
+        counts = np.rint(counts).astype(np.int64)
+        batch = len(batch_seeds)
+
+        for i in range(batch):
+            cov_bias_mult_df = compute_bias_mult(
+                covariate_names=np.arange(covariate_block_t.shape[0]), cov_count=counts[:, i],
+                cov_treated_count=counts[:, batch + i], cov_outcome_count=counts[:, 2 * batch + i],
+                treated_count=int(round(weights[i] @ treatment_values)),
+                outcome_count=int(round(weights[i] @ outcome_values)), total_count=n_patients)
+            ranks[start + i] = rank_covariates(cov_bias_mult_df['abs_log_BiasMult'].to_numpy())
+
+    return ranks
+
+
+def bootstrap_ranks_worker(task: tuple):
+    """
+    calculates the ranks of the covariates in a part of the bootstrap replicates in a worker process, with the
+    covariate block in shared memory
+
+    :param task: tuple
+        (shm_name, shape, dtype, treatment_values, outcome_values, seeds), see bootstrap_ranks_block
+    :return ranks: numpy.ndarray
+        rank of each covariate (columns) in each replicate (rows)
+    """
+
+    shm_name, shape, dtype, treatment_values, outcome_values, seeds = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        covariate_block_t = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        ranks = bootstrap_ranks_block(covariate_block_t=covariate_block_t, treatment_values=treatment_values,
+                                      outcome_values=outcome_values, seeds=seeds)
+        del covariate_block_t
+    finally:
+        shm.close()
+
+    return ranks
+
+
+def bootstrap_covariate_ranks(dim_covariates: pd.DataFrame, input_df: pd.DataFrame, treatment: str, outcome: str,
+                              k: int, n_bootstrap: int = 200, seed: int = None, n_jobs: int = 1):
+    """
+    assesses the stability of the top k selection of step_prioritize_select_covariates with bootstrap replicates of the
+    patients. the covariate block is prepared once (in shared memory for n_jobs != 1) and every replicate is a
+    multinomial weighting of the patients. the replicates are seeded from seed, so the results are reproducible and
+    don't depend on n_jobs.
+
+    :param dim_covariates: pandas.DataFrame
+        with columns wih suffixes _ontime, _median, _75p, rows aligned with the rows of input_df, see
+        step_assess_recurrence
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', outcome, treatment
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values, binary
+    :param k: int
+        number of final HDPS_covariates required
+    :param n_bootstrap: int
+        number of bootstrap replicates. Default value: 200
+    :param seed: int
+        seed of the replicates. Default value: None - not reproducible
+    :param n_jobs: int
+        number of worker processes, -1 uses all cores. Default value: 1
+    :return stability_df: pandas.DataFrame
+        DataFrame with one row per covariate, in the order of the columns of dim_covariates, with columns
+        'Covariates Name', 'Rank' (rank on all patients), 'selection_frequency' (fraction of replicates with rank <= k),
+        'mean_rank', 'median_rank', 'rank_2.5p' and 'rank_97.5p'
+    :return rank_samples: pandas.DataFrame
+        rank of each covariate (columns) in each replicate (rows)
+    """
+
+    covariate_names = list(dim_covariates.columns)
+    treatment_values = input_df[treatment].to_numpy(dtype=np.float64)
+    outcome_values = input_df[outcome].to_numpy(dtype=np.float64)
+    seeds = np.random.SeedSequence(seed).spawn(n_bootstrap)
+    shape = (len(covariate_names), dim_covariates.shape[0])
+    dtype = get_block_dtype(dim_covariates.shape[0])
+
+    n_workers = min(get_n_workers(n_jobs), n_bootstrap)
+    if n_workers <= 1:
+        ranks = bootstrap_ranks_block(covariate_block_t=np.ascontiguousarray(dim_covariates.to_numpy(dtype).T),
+                                      treatment_values=treatment_values, outcome_values=outcome_values, seeds=seeds)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1] * dtype.itemsize, 1))
+        try:
+            covariate_block_t = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            covariate_block_t[:] = dim_covariates.to_numpy().T
+            del covariate_block_t
+
+            bounds = np.linspace(0, n_bootstrap, n_workers + 1).astype(np.int64)
+            tasks = [(shm.name, shape, dtype, treatment_values, outcome_values, seeds[bounds[i]:bounds[i + 1]])
+                     for i in range(n_workers)]
+            ranks = np.vstack(process_map(bootstrap_ranks_worker, tasks, n_jobs=n_workers))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    full_cov_count = dim_covariates.sum(axis=0).to_numpy()
+    full_bias_mult_df = compute_bias_mult(
+        covariate_names=covariate_names, cov_count=full_cov_count,
+        cov_treated_count=treatment_values.astype(np.int64) @ dim_covariates.to_numpy(),
+        cov_outcome_count=outcome_values.astype(np.int64) @ dim_covariates.to_numpy(),
+        treated_count=int(treatment_values.sum()), outcome_count=int(outcome_values.sum()),
+        total_count=input_df.shape[0])
+
+    stability_df = pd.DataFrame({'Covariates Name': covariate_names,
+                                 'Rank': rank_covariates(full_bias_mult_df['abs_log_BiasMult'].to_numpy()),
+                                 'selection_frequency': (ranks <= k).mean(axis=0),
+                                 'mean_rank': ranks.mean(axis=0),
+                                 'median_rank': np.median(ranks, axis=0),
+                                 'rank_2.5p': np.percentile(ranks, 2.5, axis=0),
+                                 'rank_97.5p': np.percentile(ranks, 97.5, axis=0)})
+
+    return stability_df, pd.DataFrame(ranks, columns=covariate_names)
@@ -0,0 +1,238 @@
+import os
+import sys
+import pickle
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from hdps.algorithm_steps import step_assess_recurrence, count_covariate_cells, get_recurrence_covariates, \
+    create_recurrence_covariates, select_top_k_from_cell_counts, select_recurrence_covariates
+from hdps.column_statistics import ColumnStatistics
+
+# marks a key which is not cached, a cached value may be None
+_MISSING = object()
+
+
+def fingerprint_dataframe(input_df: pd.DataFrame):
+    """
+    calculates a fingerprint of the column names, dtypes, index and values of a data frame. every value is hashed, so
+    the cost is one pass over the data frame on every call
+
+    :param input_df: pandas.DataFrame
+        Data frame
+    :return fingerprint: str
+        hex digest which changes if any column name, dtype, index label or value changes
+    """
+
+    digest = hashlib.sha1()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in input_df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(input_df, index=True).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def get_size(value):
+    """
+    estimates the memory size of a cached value
+
+    :param value:
+        DataFrame, Series, numpy array, ColumnStatistics, or a list, tuple or dict of them
+    :return size: int
+        estimated size in bytes
+    """
+
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, ColumnStatistics):
+        return value.value_indptr.nbytes + value.values.nbytes + 3 * value.value_counts.nbytes + \
+            sys.getsizeof(value.columns)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(get_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(get_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class StepCache:
+    """
+    cache of intermediate results of the HDPS steps, keyed by the fingerprint of the input data and the parameters of
+    the steps. the results are kept in memory with least recently used eviction when max_size is exceeded and, if path
+    is given, also pickled to disk so that they are reused across sessions.
+
+    the results on disk are loaded with pickle, which can execute arbitrary code. path must be a directory which only
+    trusted users can write to - never use a cache directory from an untrusted source.
+
+    :param max_size: int
+        maximum estimated size of the results in memory in bytes. Default value: 2 GiB
+    :param path: str
+        directory of the on-disk store, created if it doesn't exist. Default value: None - memory only
+    """
+
+    def __init__(self, max_size: int = 2 ** 31, path: str = None):
+        self.max_size = max_size
+        self.path = path
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_size = 0
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        :param parts:
+            fingerprint and parameters of a step, with a stable repr
+        :return key: str
+            hex digest of the parts
+        """
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def _file(self, key: str):
+        return os.path.join(self.path, key + '.pkl')
+
+    def get(self, key: str, default=None):
+        """
+        :param key: str
+            key from make_key
+        :param default:
+            value which is returned if the key is not cached. Default value: None
+        :return value:
+            the cached value, default if the key is not cached
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.path is not None and os.path.exists(self._file(key)):
+            with open(self._file(key), 'rb') as file:
+                value = pickle.load(file)
+            self._put(key, value)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value):
+        """
+        :param key: str
+            key from make_key
+        :param value:
+            value to be cached
+        """
+        self._put(key, value)
+        if self.path is not None:
+            with open(self._file(key), 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _put(self, key: str, value):
+        size = get_size(value)
+        if key in self._entries:
+            del self._entries[key]
+            self._total_size -= self._sizes.pop(key)
+        if size > self.max_size:
+            logging.info('Result of size ' + str(size) + ' exceeds the cache size and is not kept in memory')
+            return
+
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._total_size += size
+        while self._total_size > self.max_size:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._total_size -= self._sizes.pop(evicted_key)
+
+    def get_or_compute(self, key: str, compute):
+        """
+        :param key: str
+            key from make_key
+        :param compute: Callable
+            function without arguments which calculates the value if it is not cached
+        :return value:
+            the cached or calculated value
+        """
+        value = self.get(key, default=_MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """
+        removes all results from memory and from the on-disk store
+        """
+        self._entries.clear()
+        self._sizes.clear()
+        self._total_size = 0
+        if self.path is not None:
+            for file_name in os.listdir(self.path):
+                if file_name.endswith('.pkl'):
+                    os.remove(os.path.join(self.path, file_name))
+
+
+def cached_step_prioritize_select_covariates(cache: StepCache, key: str, input_df: pd.DataFrame,
+                                             selected_columns: list, column_statistics: ColumnStatistics,
+                                             treatment: str, outcome: str, k: int, not_code_columns: list):
+    """
+    step_assess_recurrence and step_prioritize_select_covariates with the cell counts cached - the recurrence
+    covariates and their cell counts are calculated once per key, the scoring and selection of the top k covariates
+    and the creation of their columns are done for every k.
+
+    :param cache: StepCache
+        cache of the step results
+    :param key: str
+        key of the cell counts, from the fingerprint of input_df and all parameters except k
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', outcome, treatment and the code columns of selected_columns
+    :param selected_columns: list - list of strings
+        list of selected code column names. for each dimension top n prevalent codes are selected.
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns of input_df
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :param not_code_columns: list - list of strings
+        list of names of columns without dimension names as prefixes
+    :return output_df: pandas.DataFrame
+        DataFrame with not_code_columns of input_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    def score():
+        median, p_75, min_value = column_statistics.recurrence_thresholds(selected_columns)
+        recurrence_covariates = get_recurrence_covariates(selected_columns=selected_columns, median=median, p_75=p_75,
+                                                          min_value=min_value)
+        dim_covariates = step_assess_recurrence(input_df=input_df, selected_columns=selected_columns,
+                                                column_statistics=column_statistics)
+        treatment_values = input_df[treatment].to_numpy(dtype=np.int64)
+        outcome_values = input_df[outcome].to_numpy(dtype=np.int64)
+        cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(
+            covariate_block=dim_covariates.to_numpy(), treatment_values=treatment_values, outcome_values=outcome_values)
+        cell_counts = {'covariate_names': list(dim_covariates.columns), 'cov_count': cov_count,
+                       'cov_treated_count': cov_treated_count, 'cov_outcome_count': cov_outcome_count,
+                       'treated_count': treatment_values.sum(), 'outcome_count': outcome_values.sum(),
+                       'total_count': input_df.shape[0]}
+        return recurrence_covariates, cell_counts
+
+    recurrence_covariates, cell_counts = cache.get_or_compute(key, score)
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(k=k, **cell_counts)
+
+    # creating only the k selected columns
+    sel_recurrence_covariates = select_recurrence_covariates(recurrence_covariates=recurrence_covariates,
+                                                             covariate_names=sel_covariate_names)
+    dim_covariates_sel = create_recurrence_covariates(input_df=input_df,
+                                                      recurrence_covariates=sel_recurrence_covariates)
+
+    output_df = pd.concat([input_df[not_code_columns], dim_covariates_sel], axis=1)
+
+    return output_df, rank_df
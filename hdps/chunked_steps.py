@@ -0,0 +1,278 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Callable, Iterator, Union
+from hdps.algorithm_steps import get_threshold_value
+from hdps.partial_statistics import compute_partial_statistics, merge_partial_statistics, compute_partial_cell_counts, \
+    merge_partial_cell_counts, create_partial_output
+from hdps.exceptions import DuplicateIdError, ConvertedOutcomeNotBinaryError
+
+
+def read_csv_chunks(path: str, chunksize: int = 100000, **read_csv_kwargs):
+    """
+    gives a chunk source which reads a csv file in chunks of patients
+
+    :param path: str
+        path of the csv file, with one row per patient and the columns of input_df of hdps_implementation
+    :param chunksize: int
+        number of patients (rows) per chunk. Default value: 100000
+    :param read_csv_kwargs:
+        further keyword arguments of pandas.read_csv
+    :return chunk_source: Callable
+        function which takes an optional list of column names and returns an iterator of DataFrame chunks with these
+        columns (all columns if None)
+    """
+
+    def chunk_source(columns: list = None):
+        return pd.read_csv(path, chunksize=chunksize, usecols=columns, **read_csv_kwargs)
+
+    return chunk_source
+
+
+def read_parquet_row_groups(path: str):
+    """
+    gives a chunk source which reads a parquet file row group by row group. requires pyarrow.
+
+    :param path: str
+        path of the parquet file, with one row per patient and the columns of input_df of hdps_implementation
+    :return chunk_source: Callable
+        function which takes an optional list of column names and returns an iterator of DataFrame chunks with these
+        columns (all columns if None)
+    """
+
+    import pyarrow.parquet as pq
+
+    def chunk_source(columns: list = None):
+        parquet_file = pq.ParquetFile(path)
+        for row_group in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(row_group, columns=columns).to_pandas()
+
+    return chunk_source
+
+
+def chunked_collect_partial_statistics(chunk_source: Callable, treatment: str, outcome: str, dimension_prefixes: list,
+                                       check_duplicates: bool = True, n_buckets: int = 64, temp_dir: str = None):
+    """
+    first pass over the chunks - calculates the PartialStatistics of every chunk (see compute_partial_statistics) and
+    merges them, and checks for duplicate PIDs over all chunks.
+
+    the memory doesn't grow with the number of patients, except for the distribution of the outcome values - a
+    continuous outcome needs memory for all its distinct values (O(distinct values)), a binary outcome two entries.
+    the duplicate check writes a 64-bit hash of every PID to n_buckets files on disk and checks one bucket at a time,
+    which needs O(number of patients / n_buckets) memory and O(number of patients) disk space. only if hashes collide,
+    the PIDs with these hashes are compared in an additional pass over the chunks.
+
+    :param chunk_source: Callable
+        function which takes an optional list of column names and returns an iterator of DataFrame chunks of patients
+        with the columns of input_df of hdps_implementation, see read_csv_chunks and read_parquet_row_groups
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param check_duplicates: bool
+        True to check for duplicate PIDs over all chunks, duplicates within a chunk are always detected. Default value:
+        True
+    :param n_buckets: int
+        number of on-disk buckets of the duplicate check. Default value: 64
+    :param temp_dir: str
+        directory of the temporary bucket files. Default value: None - the default temporary directory
+    :return partial_statistics: PartialStatistics
+        statistics of all chunks
+    """
+
+    partial_statistics = []
+    pending_statistics = []
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as bucket_dir:
+        for chunk in chunk_source():
+            if check_duplicates:
+                append_pid_hashes(pids=chunk['PID'].to_numpy(), bucket_dir=bucket_dir, n_buckets=n_buckets)
+
+            # the statistics of the chunks are merged in batches, not into the running total chunk by chunk
+            pending_statistics.append(compute_partial_statistics(input_df=chunk, treatment=treatment, outcome=outcome,
+                                                                 dimension_prefixes=dimension_prefixes))
+            if len(pending_statistics) >= 32:
+                partial_statistics = [merge_partial_statistics(partial_statistics + pending_statistics)]
+                pending_statistics = []
+
+        duplicate_hashes = find_duplicate_hashes(bucket_dir=bucket_dir, n_buckets=n_buckets) if check_duplicates \
+            else np.zeros(0, dtype=np.uint64)
+
+    # check for duplicates over all chunks, the PIDs of colliding hashes are compared exactly
+    if duplicate_hashes.shape[0] > 0 and has_duplicate_pids(chunk_source=chunk_source,
+                                                            duplicate_hashes=duplicate_hashes):
+        raise DuplicateIdError('Duplicates in PID column')
+
+    return merge_partial_statistics(partial_statistics + pending_statistics)
+
+
+def append_pid_hashes(pids: np.ndarray, bucket_dir: str, n_buckets: int):
+    """
+    appends the 64-bit hashes of PIDs to the bucket files of their hash
+
+    :param pids: numpy.ndarray
+        PIDs of a chunk of patients
+    :param bucket_dir: str
+        directory of the bucket files
+    :param n_buckets: int
+        number of buckets
+    """
+    hashes = pd.util.hash_array(pids)
+    bucket = hashes % np.uint64(n_buckets)
+    order = np.argsort(bucket, kind='stable')
+    hashes = hashes[order]
+    bounds = np.searchsorted(bucket[order], np.arange(n_buckets + 1))
+    for i in np.flatnonzero(np.diff(bounds)):
+        with open(os.path.join(bucket_dir, f'bucket_{i}.bin'), 'ab') as file:
+            hashes[bounds[i]:bounds[i + 1]].tofile(file)
+
+
+def find_duplicate_hashes(bucket_dir: str, n_buckets: int):
+    """
+    :param bucket_dir: str
+        directory of the bucket files, see append_pid_hashes
+    :param n_buckets: int
+        number of buckets
+    :return duplicate_hashes: numpy.ndarray
+        hashes which occur more than once, read one bucket at a time
+    """
+    duplicate_hashes = [np.zeros(0, dtype=np.uint64)]
+    for i in range(n_buckets):
+        path = os.path.join(bucket_dir, f'bucket_{i}.bin')
+        if os.path.exists(path):
+            hashes, counts = np.unique(np.fromfile(path, dtype=np.uint64), return_counts=True)
+            duplicate_hashes.append(hashes[counts > 1])
+    return np.concatenate(duplicate_hashes)
+
+
+def has_duplicate_pids(chunk_source: Callable, duplicate_hashes: np.ndarray):
+    """
+    compares the PIDs with colliding hashes exactly, in a pass over the PID column of the chunks
+
+    :param chunk_source: Callable
+        chunk source, see chunked_collect_partial_statistics
+    :param duplicate_hashes: numpy.ndarray
+        hashes which occur more than once, see find_duplicate_hashes
+    :return has_duplicates: bool
+        True if a PID occurs more than once
+    """
+    pids = [chunk['PID'][np.isin(pd.util.hash_array(chunk['PID'].to_numpy()), duplicate_hashes)]
+            for chunk in chunk_source(['PID'])]
+    return bool(pd.concat(pids).duplicated().any())
+
+
+def get_outcome_threshold_value(outcome_value_counts: pd.Series, threshold: Union[str, float] = '75p'):
+    """
+    calculates the cut-off threshold of a continuous outcome from the distribution of the outcome values, identical to
+    the threshold of process_outcome
+
+    :param outcome_value_counts: pandas.Series
+        number of patients for each distinct outcome value
+    :param threshold: Union[str, float]
+        '75p', 'median', integer or float value, see process_outcome
+    :return threshold_value: float
+        the cut-off threshold, outcome > threshold_value is converted to 1 else 0
+    """
+
+    outcome_value_counts = outcome_value_counts.sort_index()
+    values = outcome_value_counts.index.to_numpy(dtype=np.float64)
+    cumulative_counts = np.cumsum(outcome_value_counts.to_numpy())
+    count = cumulative_counts[-1]
+
+    def value_at_rank(ranks):
+        return values[np.searchsorted(cumulative_counts, ranks, side='right')]
+
+    threshold_value = get_threshold_value(threshold=threshold, value_at_rank=value_at_rank, count=count)
+
+    if (values > threshold_value).all() or not (values > threshold_value).any():
+        message = f"Threshold value {threshold_value} of threshold {threshold} is too small and causes all converted " \
+                  f"outcome values to be {np.unique(values > threshold_value).astype(int)}"
+        raise ConvertedOutcomeNotBinaryError(message=message)
+
+    return threshold_value
+
+
+def chunked_count_partial_cell_counts(chunk_source: Callable, recurrence_covariates: pd.DataFrame, treatment: str,
+                                      outcome: str, outcome_threshold_value: float = None):
+    """
+    second pass over the chunks - calculates the PartialCellCounts of the recurrence covariates of every chunk (see
+    compute_partial_cell_counts) and merges them
+
+    :param chunk_source: Callable
+        function which takes an optional list of column names and returns an iterator of DataFrame chunks of patients
+    :param recurrence_covariates: pandas.DataFrame
+        recurrence covariates from partial_step_identify_candidate_empirical_covariates
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param outcome_threshold_value: float
+        cut-off threshold for a continuous outcome, None for a binary outcome. Default value: None
+    :return partial_cell_counts: PartialCellCounts
+        cell counts of all chunks
+    """
+
+    codes = list(dict.fromkeys(recurrence_covariates['code']))
+    partial_cell_counts = None
+    for chunk in chunk_source([treatment, outcome, *codes]):
+        chunk_cell_counts = compute_partial_cell_counts(input_df=chunk, recurrence_covariates=recurrence_covariates,
+                                                        treatment=treatment, outcome=outcome,
+                                                        outcome_threshold_value=outcome_threshold_value)
+        partial_cell_counts = chunk_cell_counts if partial_cell_counts is None \
+            else merge_partial_cell_counts([partial_cell_counts, chunk_cell_counts])
+
+    return partial_cell_counts
+
+
+def chunked_output_chunks(chunk_source: Callable, sel_recurrence_covariates: pd.DataFrame, not_code_columns: list):
+    """
+    last pass over the chunks - creates output_df chunk by chunk (see create_partial_output)
+
+    :param chunk_source: Callable
+        function which takes an optional list of column names and returns an iterator of DataFrame chunks of patients
+    :param sel_recurrence_covariates: pandas.DataFrame
+        recurrence covariates of the selected covariates from partial_step_prioritize_select_covariates
+    :param not_code_columns: list - list of strings
+        list of names of columns without dimension names as prefixes, kept in output_df
+    :return output_chunks: Iterator
+        iterator of DataFrame chunks of output_df with columns not_code_columns and columns with HDPS covariates
+    """
+
+    codes = list(dict.fromkeys(sel_recurrence_covariates['code']))
+    for chunk in chunk_source([*not_code_columns, *codes]):
+        yield create_partial_output(input_df=chunk, sel_recurrence_covariates=sel_recurrence_covariates,
+                                    not_code_columns=not_code_columns)
+
+
+def write_output_chunks(output_chunks: Iterator, path: str):
+    """
+    writes the chunks of output_df one after the other to a csv file or, if path ends with '.parquet', to a parquet
+    file with one row group per chunk (requires pyarrow)
+
+    :param output_chunks: Iterator
+        iterator of DataFrame chunks of output_df, see chunked_output_chunks
+    :param path: str
+        path of the output file
+    """
+
+    if path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in output_chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            # the file is also closed if reading a chunk fails
+            if writer is not None:
+                writer.close()
+    else:
+        for i, chunk in enumerate(output_chunks):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+class ColumnIndex:
+    """
+    one-time mapping of the column names to the dimensions, shared by the steps of the HDPS algorithm instead of
+    testing every column name against every dimension prefix in every step.
+
+    a column belongs to the dimension with the longest prefix of the column name, so that overlapping prefixes are
+    resolved deterministically - with the dimensions 'ICD' and 'ICD10' the column 'ICD10_A01' belongs to 'ICD10' only
+    and the column 'ICD_A01' to 'ICD'. columns without a dimension prefix are not code columns.
+
+    :param col_names: list - list of strings
+        list of all column names of the data frame
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    """
+
+    def __init__(self, col_names: list, dimension_prefixes: list):
+        self.columns = list(col_names)
+        self.dimension_prefixes = list(dimension_prefixes)
+
+        # position of the dimension of each column in dimension_prefixes, -1 for columns without dimension. one dict
+        # lookup per column and distinct prefix length, longest prefixes first
+        prefix_position = {}
+        for position, dim_name in enumerate(self.dimension_prefixes):
+            prefix_position.setdefault(dim_name, position)
+        prefix_lengths = sorted({len(dim_name) for dim_name in prefix_position}, reverse=True)
+
+        dimension = np.full(len(self.columns), -1, dtype=np.int64)
+        for i, col in enumerate(self.columns):
+            for length in prefix_lengths:
+                position = prefix_position.get(col[:length])
+                if position is not None:
+                    dimension[i] = position
+                    break
+        self._set_dimension(dimension)
+
+    def _set_dimension(self, dimension: np.ndarray):
+        self.dimension = dimension
+
+        # positions of the columns of each dimension, in the order of the columns
+        order = np.argsort(dimension, kind='stable')
+        bounds = np.searchsorted(dimension[order], np.arange(-1, len(self.dimension_prefixes) + 1))
+        self._dimension_positions = [order[bounds[i + 1]:bounds[i + 2]] for i in range(len(self.dimension_prefixes))]
+
+    @property
+    def not_code_columns(self):
+        """
+        :return not_code_columns: list - list of strings
+            list of names of columns without dimension names as prefixes
+        """
+        return [self.columns[i] for i in np.flatnonzero(self.dimension < 0)]
+
+    @property
+    def code_columns(self):
+        """
+        :return code_columns: list - list of strings
+            list of names of columns with a dimension name as prefix
+        """
+        return [self.columns[i] for i in np.flatnonzero(self.dimension >= 0)]
+
+    def dimension_positions(self, dim_name: str):
+        """
+        :param dim_name: str
+            name of the dimension
+        :return positions: numpy.ndarray
+            positions of the columns of the dimension in self.columns
+        """
+        return self._dimension_positions[self.dimension_prefixes.index(dim_name)]
+
+    def dimension_columns(self, dim_name: str):
+        """
+        :param dim_name: str
+            name of the dimension
+        :return dim_cols: list - list of strings
+            names of the columns of the dimension, in the order of self.columns
+        """
+        return [self.columns[i] for i in self.dimension_positions(dim_name)]
+
+    def restrict(self, col_names: list):
+        """
+        gives the ColumnIndex of other columns, for example after invalid columns are removed, without resolving the
+        prefixes of the known columns again
+
+        :param col_names: list - list of strings
+            list of column names
+        :return column_index: ColumnIndex
+            ColumnIndex of col_names
+        """
+        col_names = list(col_names)
+        if col_names == self.columns:
+            return self
+
+        known_columns = pd.Index(self.columns)
+        if not known_columns.is_unique:
+            return ColumnIndex(col_names, self.dimension_prefixes)
+
+        positions = known_columns.get_indexer(col_names)
+        dimension = self.dimension[positions]
+        unknown = np.flatnonzero(positions < 0)
+        if unknown.shape[0] > 0:
+            dimension[unknown] = ColumnIndex([col_names[i] for i in unknown], self.dimension_prefixes).dimension
+
+        column_index = ColumnIndex([], self.dimension_prefixes)
+        column_index.columns = col_names
+        column_index._set_dimension(dimension)
+        return column_index
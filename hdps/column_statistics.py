@@ -0,0 +1,417 @@
+import numpy as np
+import pandas as pd
+from hdps.exceptions import InputShapeMismatchError
+from hdps.parallel import parallel_map
+
+# code counts below HISTOGRAM_BINS are counted in bins, larger counts are sorted
+HISTOGRAM_BINS = 64
+
+
+class ColumnStatistics:
+    """
+    statistics of the code columns, calculated in one sweep over the code block and shared by the steps of the HDPS
+    algorithm - prevalence count, validity, minimum non-zero value and the distribution of the non-zero values.
+
+    the distribution of the non-zero values is stored compressed per column, as the sorted distinct non-zero values
+    with their number of occurrences. for column i these are values[value_indptr[i]:value_indptr[i + 1]] and
+    value_counts[value_indptr[i]:value_indptr[i + 1]].
+
+    :param columns: list - list of strings
+        names of the code columns
+    :param n_rows: int
+        number of rows (patients) of the code block
+    :param value_indptr: numpy.ndarray
+        start of the distribution of each column in values and value_counts, with one extra element at the end
+    :param values: numpy.ndarray
+        sorted distinct non-zero values of each column
+    :param value_counts: numpy.ndarray
+        number of occurrences of each of values
+    """
+
+    def __init__(self, columns: list, n_rows: int, value_indptr: np.ndarray, values: np.ndarray,
+                 value_counts: np.ndarray):
+        self.columns = list(columns)
+        self.n_rows = int(n_rows)
+        self.value_indptr = np.asarray(value_indptr, dtype=np.int64)
+        self.values = np.asarray(values)
+        self.value_counts = np.asarray(value_counts, dtype=np.int64)
+
+        cumulative_counts = np.concatenate([[0], np.cumsum(self.value_counts)])
+        # prevalence count - number of non-zero entries of each column
+        self.prevalence_count = cumulative_counts[self.value_indptr[1:]] - cumulative_counts[self.value_indptr[:-1]]
+        # number of non-zero entries of all previous columns, and running total of value_counts
+        self._count_before = cumulative_counts[self.value_indptr[:-1]]
+        self._cumulative_counts = cumulative_counts[1:]
+        self._position = None
+
+    @property
+    def valid(self):
+        """
+        :return valid: numpy.ndarray
+            True for columns which have at least one zero value and one non-zero value
+        """
+        return (self.prevalence_count > 0) & (self.prevalence_count < self.n_rows)
+
+    @property
+    def min_nonzero(self):
+        """
+        :return min_nonzero: numpy.ndarray
+            minimum of the non-zero values of each column, nan for a column without non-zero values
+        """
+        min_nonzero = np.full(len(self.columns), np.nan)
+        has_values = self.prevalence_count > 0
+        min_nonzero[has_values] = self.values[self.value_indptr[:-1][has_values]]
+        return min_nonzero
+
+    def get_positions(self, columns: list):
+        """
+        :param columns: list - list of strings
+            names of code columns
+        :return positions: numpy.ndarray
+            positions of the columns in self.columns
+        """
+        if self._position is None:
+            self._position = pd.Series(np.arange(len(self.columns)), index=self.columns)
+        return self._position[list(columns)].to_numpy()
+
+    def value_at_rank(self, positions: np.ndarray, ranks: np.ndarray):
+        """
+        gives the value at the given 0-based rank of the sorted non-zero values of each column
+
+        :param positions: numpy.ndarray
+            positions of the columns
+        :param ranks: numpy.ndarray
+            ranks, smaller than the prevalence count of the corresponding column
+        :return values: numpy.ndarray
+            value at the rank for each column
+        """
+        global_rank = self._count_before[positions] + ranks
+        return self.values[np.searchsorted(self._cumulative_counts, global_rank, side='right')]
+
+    def recurrence_thresholds(self, columns: list = None):
+        """
+        calculates the median, the third quartile and the minimum of the non-zero values of the columns. the values
+        are identical to np.median, np.percentile(..., 75) and min of the non-zero values of each column.
+
+        :param columns: list - list of strings
+            names of code columns, all columns if None. Default value: None
+        :return median: numpy.ndarray
+            median of the non-zero values of each column, nan for a column without non-zero values
+        :return p_75: numpy.ndarray
+            75th percentile of the non-zero values of each column, nan for a column without non-zero values
+        :return min_value: numpy.ndarray
+            minimum of the non-zero values of each column, nan for a column without non-zero values
+        """
+        positions = np.arange(len(self.columns)) if columns is None else self.get_positions(columns)
+
+        median = np.full(positions.shape[0], np.nan)
+        p_75 = np.full(positions.shape[0], np.nan)
+        min_value = np.full(positions.shape[0], np.nan)
+
+        count = self.prevalence_count[positions]
+        has_values = count > 0
+        positions = positions[has_values]
+        count = count[has_values]
+
+        min_value[has_values] = self.values[self.value_indptr[positions]]
+
+        median[has_values], p_75[has_values] = median_p75_at_ranks(
+            value_at_rank=lambda ranks: self.value_at_rank(positions, ranks), count=count)
+
+        return median, p_75, min_value
+
+    def to_frame(self):
+        """
+        :return column_statistics_df: pandas.DataFrame
+            DataFrame indexed by the column names with columns 'prevalence_count', 'valid', 'min_nonzero', 'median'
+            and '75p'
+        """
+        median, p_75, min_value = self.recurrence_thresholds()
+        return pd.DataFrame({'prevalence_count': self.prevalence_count, 'valid': self.valid, 'min_nonzero': min_value,
+                             'median': median, '75p': p_75}, index=self.columns)
+
+
+def compute_column_statistics(code_block: np.ndarray, columns: list = None):
+    """
+    calculates the ColumnStatistics of a block of code counts in one sweep. positive integer counts are counted in
+    linear time with histogram_value_counts, other values are sorted within each column
+
+    :param code_block: numpy.ndarray
+        2-d array of code counts with one row per patient and one column per code
+    :param columns: list - list of strings
+        names of the columns of code_block. Default value: None - positions as names
+    :return column_statistics: ColumnStatistics
+        statistics of the columns of code_block
+    """
+
+    code_block_t = np.asarray(code_block).T
+    if columns is None:
+        columns = list(range(code_block_t.shape[0]))
+
+    # non-zero values of each column, grouped by column
+    non_zero = code_block_t != 0
+    non_zero_count = non_zero.sum(axis=1)
+    non_zero_values = code_block_t[non_zero]
+    group = np.repeat(np.arange(code_block_t.shape[0], dtype=np.int64), non_zero_count)
+
+    if np.issubdtype(non_zero_values.dtype, np.integer) and \
+            (non_zero_values.shape[0] == 0 or non_zero_values.min() > 0):
+        value_group, values, value_counts = histogram_value_counts(values=non_zero_values, group=group,
+                                                                   n_groups=code_block_t.shape[0])
+    else:
+        value_group, values, value_counts = sorted_value_counts(values=non_zero_values, group=group,
+                                                                group_sizes=non_zero_count)
+
+    value_indptr = np.concatenate([[0], np.cumsum(np.bincount(value_group, minlength=code_block_t.shape[0]))])
+
+    return ColumnStatistics(columns=columns, n_rows=code_block_t.shape[1], value_indptr=value_indptr, values=values,
+                            value_counts=value_counts)
+
+
+def get_column_statistics(input_df: pd.DataFrame, code_columns: list, batch_size: int = 256, n_jobs: int = 1):
+    """
+    calculates the ColumnStatistics of the code columns of input_df in one sweep, batch by batch of columns
+
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', outcome, treatment, codes (like ICD, OPS) with corresponding
+        dimension name as prefix and other optional columns of predefined and demographic columns
+    :param code_columns: list - list of strings
+        names of the code columns
+    :param batch_size: int
+        number of code columns which are processed together. Default value: 256
+    :param n_jobs: int
+        number of threads which process batches in parallel, -1 uses all cores. Default value: 1
+    :return column_statistics: ColumnStatistics
+        statistics of the code columns
+    """
+
+    code_columns = list(code_columns)
+    column_batches = [code_columns[start:start + batch_size] for start in range(0, len(code_columns), batch_size)]
+    batches = parallel_map(lambda batch: compute_column_statistics(input_df[batch].to_numpy(), columns=batch),
+                           column_batches, n_jobs=n_jobs)
+
+    return concat_column_statistics(batches, n_rows=input_df.shape[0])
+
+
+def concat_column_statistics(column_statistics_list: list, n_rows: int):
+    """
+    concatenates the ColumnStatistics of different columns of the same rows
+
+    :param column_statistics_list: list - list of ColumnStatistics
+        statistics of disjoint sets of columns
+    :param n_rows: int
+        number of rows (patients)
+    :return column_statistics: ColumnStatistics
+        statistics of all columns
+    """
+
+    if len(column_statistics_list) == 0:
+        return ColumnStatistics(columns=[], n_rows=n_rows, value_indptr=np.zeros(1, dtype=np.int64),
+                                values=np.array([]), value_counts=np.array([], dtype=np.int64))
+
+    columns = [col for stats in column_statistics_list for col in stats.columns]
+    offsets = np.cumsum([0] + [stats.values.shape[0] for stats in column_statistics_list[:-1]])
+    value_indptr = np.concatenate([[0]] + [stats.value_indptr[1:] + offset
+                                           for stats, offset in zip(column_statistics_list, offsets)])
+    values = np.concatenate([stats.values for stats in column_statistics_list])
+    value_counts = np.concatenate([stats.value_counts for stats in column_statistics_list])
+
+    return ColumnStatistics(columns=columns, n_rows=n_rows, value_indptr=value_indptr, values=values,
+                            value_counts=value_counts)
+
+
+def merge_column_statistics(column_statistics_list: list):
+    """
+    merges the ColumnStatistics of the same columns calculated on disjoint sets of rows (for example chunks or
+    partitions of patients). the merge is associative and gives the same statistics as calculated on all rows.
+
+    :param column_statistics_list: list - list of ColumnStatistics
+        statistics of the same columns, in the same order
+    :return column_statistics: ColumnStatistics
+        statistics of the columns over all rows
+    """
+
+    columns = column_statistics_list[0].columns
+    for stats in column_statistics_list[1:]:
+        if stats.columns != columns:
+            raise InputShapeMismatchError(message="Column statistics of different columns can't be merged")
+
+    n_columns = len(columns)
+    group = np.concatenate([np.repeat(np.arange(n_columns, dtype=np.int64), np.diff(stats.value_indptr))
+                            for stats in column_statistics_list])
+    values = np.concatenate([stats.values for stats in column_statistics_list])
+    value_counts = np.concatenate([stats.value_counts for stats in column_statistics_list])
+
+    # sorting by column and value, equal values of a column are summed up
+    order = np.lexsort((values, group))
+    group, values, value_counts = group[order], values[order], value_counts[order]
+    run_start = np.ones(values.shape[0], dtype=bool)
+    run_start[1:] = (values[1:] != values[:-1]) | (group[1:] != group[:-1])
+    run_start_index = np.flatnonzero(run_start)
+
+    value_indptr = np.concatenate([[0], np.cumsum(np.bincount(group[run_start_index], minlength=n_columns))])
+    merged_value_counts = np.add.reduceat(value_counts, run_start_index) if run_start_index.shape[0] > 0 \
+        else value_counts
+
+    return ColumnStatistics(columns=columns, n_rows=sum(stats.n_rows for stats in column_statistics_list),
+                            value_indptr=value_indptr, values=values[run_start_index],
+                            value_counts=merged_value_counts)
+
+
+def reindex_column_statistics(column_statistics: ColumnStatistics, columns: list):
+    """
+    gives the ColumnStatistics of the given columns, in their order. columns which are not in column_statistics have
+    only zero values, for example the codes which don't occur in a partition of the patients.
+
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns
+    :param columns: list - list of strings
+        names of the columns
+    :return column_statistics: ColumnStatistics
+        statistics of columns over the same rows
+    """
+
+    columns = list(columns)
+    positions = pd.Index(column_statistics.columns).get_indexer(columns)
+    found = positions >= 0
+    lengths = np.zeros(len(columns), dtype=np.int64)
+    starts = np.zeros(len(columns), dtype=np.int64)
+    lengths[found] = np.diff(column_statistics.value_indptr)[positions[found]]
+    starts[found] = column_statistics.value_indptr[positions[found]]
+
+    # position of every value of the new columns in the values of column_statistics
+    value_indptr = np.concatenate([[0], np.cumsum(lengths)])
+    index = np.repeat(starts - value_indptr[:-1], lengths) + np.arange(value_indptr[-1])
+
+    return ColumnStatistics(columns=columns, n_rows=column_statistics.n_rows, value_indptr=value_indptr,
+                            values=column_statistics.values[index], value_counts=column_statistics.value_counts[index])
+
+
+def histogram_value_counts(values: np.ndarray, group: np.ndarray, n_groups: int, n_bins: int = HISTOGRAM_BINS):
+    """
+    counts the distinct values of each group in linear time - the positive integer values below n_bins are counted
+    with one bincount over the (group, value) bins, only the outliers with larger values are sorted
+
+    :param values: numpy.ndarray
+        1-d array of positive integer values
+    :param group: numpy.ndarray
+        group of each of values, in ascending order
+    :param n_groups: int
+        number of groups
+    :param n_bins: int
+        values below n_bins are counted in bins. Default value: HISTOGRAM_BINS
+    :return value_group: numpy.ndarray
+        group of each distinct value, in ascending order
+    :return distinct_values: numpy.ndarray
+        distinct values of each group, sorted within each group
+    :return value_counts: numpy.ndarray
+        number of occurrences of each of distinct_values
+    """
+
+    span = min(int(values.max()) + 1, n_bins) if values.shape[0] > 0 else 1
+    in_bins = values < span
+    bin_counts = np.bincount(group[in_bins] * span + values[in_bins].astype(np.int64), minlength=n_groups * span)
+    bins = np.flatnonzero(bin_counts)
+    value_group, distinct_values, value_counts = bins // span, (bins % span).astype(values.dtype), bin_counts[bins]
+
+    if not in_bins.all():
+        outliers = ~in_bins
+        outlier_group, outlier_values, outlier_counts = sorted_value_counts(
+            values=values[outliers], group=group[outliers],
+            group_sizes=np.bincount(group[outliers], minlength=n_groups))
+        # the outliers are larger than all binned values, a stable sort by group keeps the values sorted in each group
+        order = np.argsort(np.concatenate([value_group, outlier_group]), kind='stable')
+        value_group = np.concatenate([value_group, outlier_group])[order]
+        distinct_values = np.concatenate([distinct_values, outlier_values])[order]
+        value_counts = np.concatenate([value_counts, outlier_counts])[order]
+
+    return value_group, distinct_values, value_counts
+
+
+def sorted_value_counts(values: np.ndarray, group: np.ndarray, group_sizes: np.ndarray):
+    """
+    counts the distinct values of each group by sorting the values within each group
+
+    :param values: numpy.ndarray
+        1-d array of values, grouped into consecutive runs
+    :param group: numpy.ndarray
+        group of each of values, in ascending order
+    :param group_sizes: numpy.ndarray
+        number of values of each group, in the order of the groups
+    :return value_group: numpy.ndarray
+        group of each distinct value, in ascending order
+    :return distinct_values: numpy.ndarray
+        distinct values of each group, sorted within each group
+    :return value_counts: numpy.ndarray
+        number of occurrences of each of distinct_values
+    """
+
+    sorted_values = sort_within_groups(values=values, group_sizes=group_sizes)
+
+    # run length encoding of the sorted values - a new run starts when the group or the value changes
+    run_start = np.ones(sorted_values.shape[0], dtype=bool)
+    run_start[1:] = (sorted_values[1:] != sorted_values[:-1]) | (group[1:] != group[:-1])
+    run_start_index = np.flatnonzero(run_start)
+
+    return group[run_start_index], sorted_values[run_start_index], \
+        np.diff(np.append(run_start_index, sorted_values.shape[0]))
+
+
+def sort_within_groups(values: np.ndarray, group_sizes: np.ndarray):
+    """
+    sorts the values within each group, where the groups are consecutive runs of values
+
+    :param values: numpy.ndarray
+        1-d array of values, grouped into consecutive runs
+    :param group_sizes: numpy.ndarray
+        number of values of each group, in the order of the groups
+    :return sorted_values: numpy.ndarray
+        values sorted in ascending order within each group
+    """
+
+    group = np.repeat(np.arange(group_sizes.shape[0], dtype=np.int64), group_sizes)
+    if values.shape[0] == 0:
+        return values
+
+    if np.issubdtype(values.dtype, np.integer):
+        low = int(values.min())
+        span = int(values.max()) - low + 1
+        if span * group_sizes.shape[0] < 2 ** 62:
+            # a single sort of integer keys which are ordered by group first and value second
+            key = group * span + (values.astype(np.int64) - low)
+            key.sort()
+            return (key - group * span + low).astype(values.dtype)
+
+    return values[np.lexsort((values, group))]
+
+
+def median_p75_at_ranks(value_at_rank, count: np.ndarray):
+    """
+    calculates the median and the 75th percentile of sorted values which are accessed by rank, identical to np.median
+    and np.percentile(..., 75) of the values
+
+    :param value_at_rank: Callable
+        function which takes an array of 0-based ranks and returns the values at these ranks of the sorted values
+    :param count: numpy.ndarray
+        number of values, larger than 0
+    :return median: numpy.ndarray
+        median of the values
+    :return p_75: numpy.ndarray
+        75th percentile of the values
+    """
+    count = np.asarray(count, dtype=np.int64)
+
+    # median - mean of the two middle values (the same value for an odd count), as np.median
+    median = (value_at_rank((count - 1) // 2).astype(np.float64) + value_at_rank(count // 2)) / 2
+
+    # 75th percentile - linear interpolation between the closest ranks, as np.percentile
+    virtual_index = (count - 1) * 0.75
+    previous_index = np.floor(virtual_index).astype(np.int64)
+    next_index = np.minimum(previous_index + 1, count - 1)
+    gamma = virtual_index - previous_index
+    previous_value = value_at_rank(previous_index).astype(np.float64)
+    next_value = value_at_rank(next_index).astype(np.float64)
+    diff = next_value - previous_value
+    p_75 = np.where(gamma >= 0.5, next_value - diff * (1 - gamma), previous_value + diff * gamma)
+
+    return median, p_75
@@ -26,3 +26,18 @@ class InvalidThresholdValueError(HdpsError):
 class ConvertedOutcomeNotBinaryError(HdpsError):
     def __init__(self, message: str):
         super().__init__(message)
+
+
+class InputShapeMismatchError(HdpsError):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class ModelNotFittedError(HdpsError):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class CovariateNotNumericError(HdpsError):
+    def __init__(self, message: str):
+        super().__init__(message)
@@ -0,0 +1,126 @@
+import pandas as pd
+from typing import Union
+from hdps.chunked_steps import get_outcome_threshold_value
+from hdps.model import HDPSModel
+from hdps.partial_statistics import PartialStatistics, compute_partial_statistics, merge_partial_statistics, \
+    partial_input_data_validation, partial_step_identify_candidate_empirical_covariates, get_histogram_cell_counts, \
+    partial_step_prioritize_select_covariates
+
+
+class IncrementalHDPSModel(HDPSModel):
+    """
+    HDPSModel which is updated with batches of new patients, for example a new slice of the cohort every month. the
+    model keeps the PartialStatistics of all patients seen so far, with the cell histogram from which the cell counts
+    of any recurrence covariate are derived. partial_fit merges the statistics of a new batch and re-derives the top n
+    candidates, the recurrence thresholds and the top k ranking, so an update scans only the new batch. the results
+    are identical to HDPSModel fitted on all patients seen so far, except that duplicate PIDs are only detected within
+    a batch.
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold, outcome_cont and n_jobs see hdps_implementation
+
+    fitted attributes, in addition to the attributes of HDPSModel:
+    partial_statistics: PartialStatistics
+        merged statistics of all patients seen so far, with the cell histogram
+    """
+
+    def __init__(self, n: int, k: int, outcome: str, treatment: str, dimension_prefixes: list, m: int = 1,
+                 threshold: Union[str, float] = '75p', outcome_cont: bool = False, n_jobs: int = 1):
+        super().__init__(n=n, k=k, outcome=outcome, treatment=treatment, dimension_prefixes=dimension_prefixes, m=m,
+                         threshold=threshold, outcome_cont=outcome_cont, n_jobs=n_jobs)
+        self.partial_statistics = None
+
+    def partial_fit(self, batch_df: pd.DataFrame):
+        """
+        updates the model with a batch of new patients. if the update fails (for example on a validation error), the
+        model is unchanged.
+
+        :param batch_df: pandas.DataFrame
+            Data frame of the new patients, see hdps_implementation. code columns which are missing in a batch have
+            count 0 for its patients
+        :return model: IncrementalHDPSModel
+            the updated model
+        """
+        partial_statistics = compute_partial_statistics(
+            input_df=batch_df, treatment=self.treatment, outcome=self.outcome,
+            dimension_prefixes=self.dimension_prefixes, n_jobs=self.n_jobs, cell_histogram=True)
+        if self.partial_statistics is not None:
+            partial_statistics = merge_partial_statistics([self.partial_statistics, partial_statistics])
+
+        rank_df, recurrence_covariates = self._select_covariates(partial_statistics=partial_statistics)
+
+        self.partial_statistics = partial_statistics
+        self.rank_df, self.recurrence_covariates = rank_df, recurrence_covariates
+
+        return self
+
+    def _select_covariates(self, partial_statistics: PartialStatistics):
+        partial_input_data_validation(partial_statistics=partial_statistics, treatment=self.treatment,
+                                      outcome=self.outcome, outcome_cont=self.outcome_cont)
+
+        outcome_threshold_value = None
+        if self.outcome_cont:
+            outcome_threshold_value = get_outcome_threshold_value(
+                outcome_value_counts=partial_statistics.outcome_value_counts, threshold=self.threshold)
+
+        recurrence_covariates = partial_step_identify_candidate_empirical_covariates(
+            partial_statistics=partial_statistics, dimension_prefixes=self.dimension_prefixes, n=self.n, m=self.m)
+
+        partial_cell_counts = get_histogram_cell_counts(partial_statistics=partial_statistics,
+                                                        recurrence_covariates=recurrence_covariates,
+                                                        outcome_threshold_value=outcome_threshold_value)
+
+        rank_df, sel_recurrence_covariates = partial_step_prioritize_select_covariates(
+            partial_cell_counts=partial_cell_counts, recurrence_covariates=recurrence_covariates, k=self.k)
+
+        return rank_df, sel_recurrence_covariates[['Covariates Name', 'code', 'recurrence', 'threshold']]
+
+    def fit(self, input_df: pd.DataFrame):
+        """
+        fits the model on input_df, the statistics of previous batches are discarded
+
+        :param input_df: pandas.DataFrame
+            Data frame of the derivation cohort, see hdps_implementation
+        :return model: IncrementalHDPSModel
+            the fitted model
+        """
+        self.partial_statistics = None
+        return self.partial_fit(input_df)
+
+    def fit_transform(self, input_df: pd.DataFrame):
+        """
+        fits the model on input_df, the statistics of previous batches are discarded
+
+        :param input_df: pandas.DataFrame
+            Data frame of the derivation cohort, see hdps_implementation
+        :return output_df: pandas.DataFrame
+            DataFrame with columns 'PID', outcome, treatment, Demographic and Predefined covariates and columns with
+            HDPS covariates, see hdps_implementation
+        """
+        return self.fit(input_df).transform(input_df)
+
+    def to_arrays(self):
+        """
+        :return arrays: dict
+            arrays of the npz file of save, the arrays of HDPSModel.to_arrays and the arrays of the statistics with the
+            prefix 'statistics_'
+        """
+        arrays = super().to_arrays()
+        if self.partial_statistics is not None:
+            arrays.update({'statistics_' + key: value for key, value in self.partial_statistics.to_arrays().items()})
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """
+        :param arrays: dict
+            arrays from to_arrays
+        :return model: IncrementalHDPSModel
+            the model with the saved state and statistics
+        """
+        model = super().from_arrays(arrays)
+        if 'statistics_columns' in arrays:
+            model.partial_statistics = PartialStatistics.from_arrays(
+                {key[len('statistics_'):]: value for key, value in arrays.items() if key.startswith('statistics_')})
+
+        return model
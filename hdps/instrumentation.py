@@ -0,0 +1,87 @@
+import time
+import tracemalloc
+import pandas as pd
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
+
+class RunReport:
+    """
+    per-step report of an HDPS run. hdps_implementation records one entry per step with the step name, the sizes of
+    the inputs and outputs of the step ('input_rows', 'input_columns', 'candidates', 'covariates',
+    'selected_covariates', 'output_rows', 'output_columns' - as far as they apply to the step), the wall time and the
+    cpu time of the process in seconds and, with trace_memory, the peak memory allocated during the step in bytes.
+
+    by default only the times and sizes are recorded, which has negligible overhead. the peak memory is measured with
+    tracemalloc, which counts the numpy and pandas buffers but slows down every python allocation of the measured run,
+    so the times of a run with trace_memory are not representative. if tracemalloc is already tracing, its peak is
+    reset at the start of every step.
+
+    :param trace_memory: bool
+        True to measure the peak memory of every step. Default value: False
+    :param callback: Callable
+        function which is called with the record (dict) of every step when the step is finished, for example for
+        logging. Default value: None
+    """
+
+    def __init__(self, trace_memory: bool = False, callback: Callable = None):
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.records = []
+
+    @contextmanager
+    def step(self, name: str, **sizes):
+        """
+        measures the step which runs in the with block. sizes which are only known at the end of the step are added to
+        the yielded record.
+
+        :param name: str
+            name of the step
+        :param sizes:
+            sizes of the inputs of the step
+        :return record: dict
+            record of the step
+        """
+        record = {'step': name, **sizes}
+        start_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        start_wall_time, start_cpu_time = time.perf_counter(), time.process_time()
+
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - start_wall_time
+            record['cpu_time'] = time.process_time() - start_cpu_time
+            if self.trace_memory:
+                record['peak_memory'] = tracemalloc.get_traced_memory()[1] - start_memory
+                if start_tracing:
+                    tracemalloc.stop()
+
+            self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def to_frame(self):
+        """
+        :return report_df: pandas.DataFrame
+            one row per step in the order of the steps, sizes which don't apply to a step are nan
+        """
+        return pd.DataFrame(self.records)
+
+
+def report_step(report: RunReport, name: str, **sizes):
+    """
+    :param report: RunReport
+        report of the run, None if the run is not instrumented
+    :param name: str
+        name of the step
+    :param sizes:
+        sizes of the inputs of the step
+    :return context: contextmanager
+        report.step(name, **sizes), or a context which yields a dict without any measurement if report is None
+    """
+    return report.step(name, **sizes) if report is not None else nullcontext({})
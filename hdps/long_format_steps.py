@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+from hdps.algorithm_steps import select_dimension_codes, select_top_k_from_cell_counts, validate_binary_columns, \
+    log_invalid_code_columns, COVARIATE_DTYPE
+from hdps.exceptions import DuplicateIdError
+
+
+def get_long_code_names(long_df: pd.DataFrame):
+    """
+    gives the code names of a long table in the 'Dimension_Code' layout of the wide input_df
+
+    :param long_df: pandas.DataFrame
+        Data frame with columns 'PID', 'dimension', 'code' and 'count'
+    :return code_names: pandas.Series
+        'dimension' and 'code' joined by '_' for each row of long_df, example: 'ICD_01'
+    """
+
+    return long_df['dimension'].astype(str) + '_' + long_df['code'].astype(str)
+
+
+def long_input_data_validation(long_df: pd.DataFrame, patient_df: pd.DataFrame, treatment: str, outcome: str):
+    """
+    performs validation of the long table. Aggregates the counts per patient and code, removes zero counts, events of
+    patients not in patient_df and invalid codes.
+
+    :param long_df: pandas.DataFrame
+        Data frame with columns 'PID', 'dimension', 'code' and 'count' - one row per patient, code and count. a code
+        which doesn't have a row for a patient has count 0 for that patient
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns
+    :param treatment: str
+        name of the column of patient_df which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column of patient_df which have outcome values
+    :return long_df: pandas.DataFrame
+        aggregated Data frame with columns 'PID', 'dimension', 'code', 'count' and 'code_name' - one row per patient
+        and code with non-zero count, where invalid codes are removed
+    """
+
+    validate_binary_columns(input_df=patient_df, columns=[treatment, outcome])
+
+    long_df = long_df[long_df['PID'].isin(patient_df['PID'])]
+    long_df = long_df.groupby(['PID', 'dimension', 'code'], as_index=False, sort=False, observed=True)['count'].sum()
+    long_df = long_df[long_df['count'] != 0]
+    long_df = long_df.assign(code_name=get_long_code_names(long_df))
+
+    # codes without a row have zero count for all patients and are never seen. codes present for all patients have no
+    # zero entry
+    prev_count = long_df.groupby('code_name', sort=False)['PID'].size()
+    invalid_code_columns = list(prev_count.index[prev_count >= patient_df.shape[0]])
+    log_invalid_code_columns(invalid_code_columns)
+
+    if len(invalid_code_columns) > 0:
+        long_df = long_df[~long_df['code_name'].isin(invalid_code_columns)]
+
+    return long_df.reset_index(drop=True)
+
+
+def long_step_identify_candidate_empirical_covariates(long_df: pd.DataFrame, patient_df: pd.DataFrame,
+                                                      dimension_prefixes: list, n: int, m: int = 1):
+    """
+    performs selection of top n prevalent codes for each dimension from the long table via group-by aggregation
+
+    :param long_df: pandas.DataFrame
+        aggregated Data frame from long_input_data_validation with columns 'PID', 'dimension', 'code', 'count' and
+        'code_name'
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions. a code belongs to a dimension if its 'dimension' value equals the name
+    :param n: int
+        number of prevanlent codes to be retained in each dimension. top n of prevalent codes are selected in each
+        dimension and rest are ignored
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped in each dimension. Default value
+         for m is 1. note: m =100 as per [1] and m =1 as per [2].
+    :return selected_columns: list - list of strings
+        list of selected code names ('Dimension_Code'). for each dimension top n prevalent codes are selected.
+    """
+
+    # check for duplicates
+    if np.unique(patient_df['PID']).shape[0] != patient_df['PID'].shape[0]:
+        raise DuplicateIdError('Duplicates in PID column')
+
+    # calculating total study population count
+    total_sp_count = patient_df.shape[0]
+
+    # calculating prevalence count - after aggregation there is one row per patient and code with non-zero count
+    prevalence = long_df.groupby(['dimension', 'code_name'], sort=False, observed=True).size()
+
+    selected_columns = []
+    for dim_name in dimension_prefixes:
+
+        if dim_name not in prevalence.index.get_level_values('dimension'):
+            continue
+        dim_prevalence = prevalence.xs(dim_name, level='dimension')
+
+        selected_columns.extend(select_dimension_codes(dim_name=dim_name, dim_cols=list(dim_prevalence.index),
+                                                       prev_count=dim_prevalence.to_numpy(),
+                                                       total_sp_count=total_sp_count, n=n, m=m))
+
+    return selected_columns
+
+
+def long_step_assess_recurrence(long_df: pd.DataFrame, selected_columns: list):
+    """
+    creates the _onetime, _median and _75p covariates of the selected codes in long format
+
+    :param long_df: pandas.DataFrame
+        aggregated Data frame from long_input_data_validation with columns 'PID', 'dimension', 'code', 'count' and
+        'code_name'
+    :param selected_columns: list - list of strings
+        list of selected code names. for each dimension top n prevalent codes are selected.
+    :return dim_covariates: pandas.DataFrame
+        Data frame with columns 'PID' and 'Covariates Name' - one row for each patient with covariate value 1
+    :return covariate_names: list - list of strings
+        names of all covariates, with suffixes _onetime, _median, _75p. the columns with _ontime, _median, _75p are
+        similar to _once, _sporadic, _frequent respectively in paper [1]
+    """
+
+    sel_df = long_df.loc[long_df['code_name'].isin(selected_columns), ['PID', 'code_name', 'count']]
+
+    # median and third quartile are calculated excluding 0s (rows with zero count are not in long_df),
+    # see step_assess_recurrence
+    grouped = sel_df.groupby('code_name', sort=False)['count']
+    thresholds = pd.DataFrame({'median': grouped.median(), 'p_75': grouped.quantile(0.75), 'min_value': grouped.min()})
+    thresholds = thresholds.reindex(selected_columns)
+    has_median = thresholds['median'] > thresholds['min_value']
+    has_75p = (thresholds['p_75'] > thresholds['min_value']) & (thresholds['median'] != thresholds['p_75'])
+
+    sel_df = sel_df.join(thresholds, on='code_name')
+
+    cov_dfs = [sel_df.loc[sel_df['count'] > 0, ['PID', 'code_name']].assign(suffix='_onetime')]
+    is_median = sel_df['code_name'].map(has_median) & (sel_df['count'] >= sel_df['median'])
+    cov_dfs.append(sel_df.loc[is_median, ['PID', 'code_name']].assign(suffix='_median'))
+    is_75p = sel_df['code_name'].map(has_75p) & (sel_df['count'] >= sel_df['p_75'])
+    cov_dfs.append(sel_df.loc[is_75p, ['PID', 'code_name']].assign(suffix='_75p'))
+
+    dim_covariates = pd.concat(cov_dfs, ignore_index=True)
+    dim_covariates['Covariates Name'] = dim_covariates['code_name'] + dim_covariates['suffix']
+    dim_covariates = dim_covariates[['PID', 'Covariates Name']]
+
+    covariate_names = []
+    for cov in selected_columns:
+        covariate_names.append(cov + '_onetime')
+        if has_median[cov]:
+            covariate_names.append(cov + '_median')
+        if has_75p[cov]:
+            covariate_names.append(cov + '_75p')
+
+    return dim_covariates, covariate_names
+
+
+def long_step_prioritize_select_covariates(dim_covariates: pd.DataFrame, covariate_names: list,
+                                           patient_df: pd.DataFrame, treatment: str, outcome: str, k: int,
+                                           not_code_columns: list):
+    """
+    calculates BiasMult of all covariates via group-by aggregation and selects the top k covariates. only the k
+    selected covariates are materialized as columns in output_df.
+
+    :param dim_covariates: pandas.DataFrame
+        Data frame with columns 'PID' and 'Covariates Name' - one row for each patient with covariate value 1
+    :param covariate_names: list - list of strings
+        names of all covariates
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :param not_code_columns: list - list of strings
+        list of names of columns of patient_df to be kept in output_df
+    :return output_df: pandas.DataFrame
+        DataFrame with not_code_columns of patient_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    treatment_values = np.asarray(patient_df[treatment], dtype=np.int64)
+    outcome_values = np.asarray(patient_df[outcome], dtype=np.int64)
+
+    # cell counts of the contingency tables of every covariate with treatment and outcome
+    cov_treat_outcome = dim_covariates.merge(patient_df[['PID', treatment, outcome]], on='PID', how='inner')
+    cell_counts = cov_treat_outcome.groupby('Covariates Name', sort=False).agg(
+        cov_count=('PID', 'size'), cov_treated_count=(treatment, 'sum'), cov_outcome_count=(outcome, 'sum'))
+    cell_counts = cell_counts.reindex(covariate_names, fill_value=0)
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+        k=k, covariate_names=covariate_names, cov_count=cell_counts['cov_count'],
+        cov_treated_count=cell_counts['cov_treated_count'], cov_outcome_count=cell_counts['cov_outcome_count'],
+        treated_count=treatment_values.sum(), outcome_count=outcome_values.sum(), total_count=patient_df.shape[0])
+
+    # materializing only the k selected columns
+    sel_rows = dim_covariates[dim_covariates['Covariates Name'].isin(sel_covariate_names)]
+    row_position = pd.Series(np.arange(patient_df.shape[0]), index=patient_df['PID'])
+    col_position = pd.Series(np.arange(len(sel_covariate_names)), index=sel_covariate_names)
+    sel_values = np.zeros((patient_df.shape[0], len(sel_covariate_names)), dtype=COVARIATE_DTYPE)
+    sel_values[row_position[sel_rows['PID']].to_numpy(), col_position[sel_rows['Covariates Name']].to_numpy()] = 1
+    dim_covariates_sel = pd.DataFrame(sel_values, columns=sel_covariate_names, index=patient_df.index)
+
+    # output df
+    output_df = pd.concat([patient_df[not_code_columns], dim_covariates_sel], axis=1)
+
+    return output_df, rank_df
@@ -0,0 +1,260 @@
+import os
+import numpy as np
+import pandas as pd
+from hdps.algorithm_steps import get_non_code_cols, validate_binary_columns, get_recurrence_covariates, \
+    fill_recurrence_indicators, count_covariate_cells, select_top_k_from_cell_counts, select_recurrence_covariates, \
+    log_invalid_code_columns, step_identify_candidate_empirical_covariates_from_statistics, COVARIATE_DTYPE
+from hdps.column_statistics import ColumnStatistics, compute_column_statistics, concat_column_statistics
+from hdps.exceptions import DuplicateIdError, InputShapeMismatchError
+
+CODES_FILE = 'codes.npy'
+CODE_NAMES_FILE = 'code_names.npy'
+PID_FILE = 'pid.npy'
+COLUMN_STATISTICS_FILE = 'column_statistics.npz'
+
+
+class CodeMemmap:
+    """
+    code counts of a cohort stored on disk as a memory-mapped array with sidecar files, opened with open_code_memmap.
+    the array is stored column-major (Fortran order), so every code column is contiguous on disk and only the pages of
+    the columns which are used are read. several processes opening the same directory share one page-cached copy.
+
+    :param codes: numpy.memmap
+        read-only 2-d array of code counts with one row per patient and one column per code
+    :param code_names: list - list of strings
+        names of the code columns
+    :param pid: numpy.ndarray
+        PIDs of the rows of codes
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns, calculated once when the cohort is saved
+    """
+
+    def __init__(self, codes: np.ndarray, code_names: list, pid: np.ndarray, column_statistics: ColumnStatistics):
+        self.codes = codes
+        self.code_names = list(code_names)
+        self.pid = pid
+        self.column_statistics = column_statistics
+
+
+def get_count_dtype(code_df: pd.DataFrame):
+    """
+    gives the smallest dtype which holds all code counts - uint8 or uint16 for typical counts
+
+    :param code_df: pandas.DataFrame
+        Data frame with the code columns
+    :return dtype: numpy.dtype
+        smallest unsigned integer dtype for non-negative integer counts, else the common dtype of the columns
+    """
+
+    dtype = np.result_type(*code_df.dtypes) if code_df.shape[1] > 0 else np.dtype(np.uint8)
+    if code_df.shape[1] > 0 and np.issubdtype(dtype, np.integer) and code_df.min().min() >= 0:
+        dtype = np.min_scalar_type(int(code_df.max().max()))
+
+    return dtype
+
+
+def save_code_memmap(input_df: pd.DataFrame, dimension_prefixes: list, path: str, batch_size: int = 256):
+    """
+    saves the code columns of input_df as a memory-mapped array with compact counts, together with the code names,
+    the PIDs and the column statistics, into the directory path
+
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', codes (like ICD, OPS) with corresponding dimension name as prefix
+        and other optional columns, see hdps_implementation
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param path: str
+        directory of the memory-mapped array and the sidecar files, created if it doesn't exist
+    :param batch_size: int
+        number of code columns which are written together. Default value: 256
+    :return code_memmap: CodeMemmap
+        the saved code counts, opened read-only
+    """
+
+    not_code_columns = get_non_code_cols(col_names=list(input_df.columns), dimension_prefixes=dimension_prefixes)
+    code_columns = [col for col in input_df.columns if col not in set(not_code_columns)]
+    dtype = get_count_dtype(input_df[code_columns])
+
+    os.makedirs(path, exist_ok=True)
+    codes = np.lib.format.open_memmap(os.path.join(path, CODES_FILE), mode='w+', dtype=dtype,
+                                      shape=(input_df.shape[0], len(code_columns)), fortran_order=True)
+    batches = []
+    for start in range(0, len(code_columns), batch_size):
+        codes[:, start:start + batch_size] = input_df[code_columns[start:start + batch_size]].to_numpy()
+        batches.append(compute_column_statistics(codes[:, start:start + batch_size],
+                                                 columns=code_columns[start:start + batch_size]))
+    codes.flush()
+    del codes
+
+    column_statistics = concat_column_statistics(batches, n_rows=input_df.shape[0])
+    np.savez(os.path.join(path, COLUMN_STATISTICS_FILE), n_rows=column_statistics.n_rows,
+             value_indptr=column_statistics.value_indptr, values=column_statistics.values,
+             value_counts=column_statistics.value_counts)
+    np.save(os.path.join(path, CODE_NAMES_FILE), np.array(code_columns, dtype=str))
+    pid = input_df['PID'].to_numpy()
+    np.save(os.path.join(path, PID_FILE), pid.astype(str) if pid.dtype == object else pid)
+
+    return open_code_memmap(path)
+
+
+def open_code_memmap(path: str):
+    """
+    opens the code counts saved with save_code_memmap read-only, without loading the array into memory
+
+    :param path: str
+        directory of the memory-mapped array and the sidecar files
+    :return code_memmap: CodeMemmap
+        the code counts
+    """
+
+    codes = np.load(os.path.join(path, CODES_FILE), mmap_mode='r')
+    code_names = list(np.load(os.path.join(path, CODE_NAMES_FILE)))
+    pid = np.load(os.path.join(path, PID_FILE))
+    with np.load(os.path.join(path, COLUMN_STATISTICS_FILE)) as statistics:
+        column_statistics = ColumnStatistics(columns=code_names, n_rows=int(statistics['n_rows']),
+                                             value_indptr=statistics['value_indptr'], values=statistics['values'],
+                                             value_counts=statistics['value_counts'])
+
+    return CodeMemmap(codes=codes, code_names=code_names, pid=pid, column_statistics=column_statistics)
+
+
+def memmap_input_data_validation(patient_df: pd.DataFrame, code_memmap: CodeMemmap, treatment: str, outcome: str):
+    """
+    performs validation of patient_df and of its alignment with the memory-mapped code counts and reports the invalid
+    code columns, which are ignored by the next steps. the code counts are not read.
+
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of code_memmap
+    :param code_memmap: CodeMemmap
+        memory-mapped code counts
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    """
+
+    validate_binary_columns(input_df=patient_df, columns=[treatment, outcome])
+
+    if patient_df.shape[0] != code_memmap.codes.shape[0] or \
+            not np.array_equal(patient_df['PID'].to_numpy().astype(str), code_memmap.pid.astype(str)):
+        message = "PID column of patient_df is not aligned with the PIDs of the memory-mapped code counts"
+        raise InputShapeMismatchError(message=message)
+
+    valid = code_memmap.column_statistics.valid
+    invalid_code_columns = [col for col, is_valid in zip(code_memmap.code_names, valid) if not is_valid]
+    log_invalid_code_columns(invalid_code_columns)
+
+
+def memmap_step_identify_candidate_empirical_covariates(code_memmap: CodeMemmap, dimension_prefixes: list, n: int,
+                                                        m: int = 1):
+    """
+    performs selection of top n prevalent code column for each dimension from the saved column statistics
+
+    :param code_memmap: CodeMemmap
+        memory-mapped code counts
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param n: int
+        number of prevanlent codes to be retained in each dimension. top n of prevalent codes are selected in each
+        dimension and rest are ignored
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped in each dimension. Default value
+         for m is 1. note: m =100 as per [1] and m =1 as per [2].
+    :return selected_columns: list - list of strings
+        list of selected code column names. for each dimension top n prevalent codes are selected.
+    """
+
+    # check for duplicates
+    if np.unique(code_memmap.pid).shape[0] != code_memmap.pid.shape[0]:
+        raise DuplicateIdError('Duplicates in PID column')
+
+    return step_identify_candidate_empirical_covariates_from_statistics(
+        column_statistics=code_memmap.column_statistics, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+
+def memmap_step_assess_recurrence(code_memmap: CodeMemmap, selected_columns: list):
+    """
+    gives the _onetime, _median and _75p covariates of the selected codes with their thresholds from the saved column
+    statistics. the covariates are not materialized, see memmap_step_prioritize_select_covariates
+
+    :param code_memmap: CodeMemmap
+        memory-mapped code counts
+    :param selected_columns: list - list of strings
+        list of selected code column names
+    :return recurrence_covariates: pandas.DataFrame
+        DataFrame from get_recurrence_covariates where 'code_position' is the column position in code_memmap.codes
+    """
+
+    median, p_75, min_value = code_memmap.column_statistics.recurrence_thresholds(selected_columns)
+    recurrence_covariates = get_recurrence_covariates(selected_columns=selected_columns, median=median, p_75=p_75,
+                                                      min_value=min_value)
+    recurrence_covariates['code_position'] = code_memmap.column_statistics.get_positions(
+        recurrence_covariates['code']).astype(np.int64)
+
+    return recurrence_covariates
+
+
+def memmap_step_prioritize_select_covariates(recurrence_covariates: pd.DataFrame, code_memmap: CodeMemmap,
+                                             patient_df: pd.DataFrame, treatment: str, outcome: str, k: int,
+                                             not_code_columns: list, batch_size: int = 256):
+    """
+    calculates BiasMult of all covariates batch by batch of covariates and selects the top k covariates. every code
+    column is read as a contiguous view of the memory-mapped array, only the k selected covariates are materialized as
+    columns in output_df.
+
+    :param recurrence_covariates: pandas.DataFrame
+        DataFrame from memmap_step_assess_recurrence
+    :param code_memmap: CodeMemmap
+        memory-mapped code counts
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of code_memmap
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :param not_code_columns: list - list of strings
+        list of names of columns of patient_df to be kept in output_df
+    :param batch_size: int
+        number of covariates which are created together. Default value: 256
+    :return output_df: pandas.DataFrame
+        DataFrame with not_code_columns of patient_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'rank'
+    """
+
+    treatment_values = np.asarray(patient_df[treatment], dtype=np.int64)
+    outcome_values = np.asarray(patient_df[outcome], dtype=np.int64)
+
+    n_covariates = recurrence_covariates.shape[0]
+    cell_counts = np.zeros((3, n_covariates), dtype=np.int64)
+    covariate_block = np.empty((patient_df.shape[0], min(batch_size, n_covariates)), dtype=COVARIATE_DTYPE,
+                               order='F')
+    for start in range(0, n_covariates, batch_size):
+        batch = recurrence_covariates.iloc[start:start + batch_size]
+        fill_recurrence_indicators(code_block=code_memmap.codes, recurrence_covariates=batch,
+                                   out=covariate_block[:, :batch.shape[0]])
+        cell_counts[:, start:start + batch.shape[0]] = count_covariate_cells(
+            covariate_block=covariate_block[:, :batch.shape[0]], treatment_values=treatment_values,
+            outcome_values=outcome_values)
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+        k=k, covariate_names=list(recurrence_covariates['Covariates Name']), cov_count=cell_counts[0],
+        cov_treated_count=cell_counts[1], cov_outcome_count=cell_counts[2], treated_count=treatment_values.sum(),
+        outcome_count=outcome_values.sum(), total_count=patient_df.shape[0])
+
+    # materializing only the k selected columns
+    sel_recurrence_covariates = select_recurrence_covariates(recurrence_covariates=recurrence_covariates,
+                                                             covariate_names=sel_covariate_names)
+    sel_values = np.empty((patient_df.shape[0], len(sel_covariate_names)), dtype=COVARIATE_DTYPE, order='F')
+    fill_recurrence_indicators(code_block=code_memmap.codes, recurrence_covariates=sel_recurrence_covariates,
+                               out=sel_values)
+    dim_covariates_sel = pd.DataFrame(sel_values, columns=sel_covariate_names, index=patient_df.index, copy=False)
+
+    # output df
+    output_df = pd.concat([patient_df[not_code_columns], dim_covariates_sel], axis=1)
+
+    return output_df, rank_df
@@ -0,0 +1,166 @@
+import json
+import numpy as np
+import pandas as pd
+from typing import Union
+from hdps.algorithm_steps import get_non_code_cols, create_recurrence_covariates
+from hdps.exceptions import ModelNotFittedError, InvalidThresholdValueError
+
+
+class HDPSModel:
+    """
+    HDPS covariate selection which is fitted once on a derivation cohort and applied to other cohorts. fit runs the
+    HDPS algorithm (see hdps_implementation) and keeps the selected covariates with the recurrence thresholds of their
+    codes, transform only creates the k selected covariate columns for new patients with these thresholds.
+
+    for n, k, outcome, treatment, dimension_prefixes, m, threshold, outcome_cont and n_jobs see hdps_implementation
+
+    fitted attributes:
+    rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank' of the selected covariates
+    recurrence_covariates: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'code', 'recurrence' ('onetime', 'median' or '75p') and 'threshold'
+        of the selected covariates in rank order. covariate is 1 if code count > 0 for 'onetime' and if code count >=
+        threshold for 'median' and '75p'
+    """
+
+    def __init__(self, n: int, k: int, outcome: str, treatment: str, dimension_prefixes: list, m: int = 1,
+                 threshold: Union[str, float] = '75p', outcome_cont: bool = False, n_jobs: int = 1):
+        if isinstance(threshold, (list, tuple)):
+            # a model keeps the covariates of one binary outcome, see hdps_thresholds_implementation for a list
+            raise InvalidThresholdValueError(message="A list of thresholds is not supported by HDPSModel, fit one "
+                                                     "model per threshold")
+        self.n = n
+        self.k = k
+        self.outcome = outcome
+        self.treatment = treatment
+        self.dimension_prefixes = list(dimension_prefixes)
+        self.m = m
+        self.threshold = threshold
+        self.outcome_cont = outcome_cont
+        self.n_jobs = n_jobs
+        self.rank_df = None
+        self.recurrence_covariates = None
+
+    def fit_transform(self, input_df: pd.DataFrame):
+        """
+        fits the model on input_df
+
+        :param input_df: pandas.DataFrame
+            Data frame of the derivation cohort, see hdps_implementation
+        :return output_df: pandas.DataFrame
+            DataFrame with columns 'PID', outcome, treatment, Demographic and Predefined covariates and columns with
+            HDPS covariates, see hdps_implementation
+        """
+        from hdps import hdps_fit_implementation
+
+        # shallow copy - hdps_fit_implementation replaces the outcome column of a continuous outcome
+        output_df, rank_df, sel_recurrence_covariates = hdps_fit_implementation(
+            input_df=input_df.copy(deep=False), n=self.n, k=self.k, outcome=self.outcome, treatment=self.treatment,
+            dimension_prefixes=self.dimension_prefixes, m=self.m, threshold=self.threshold,
+            outcome_cont=self.outcome_cont, n_jobs=self.n_jobs)
+
+        self.rank_df = rank_df
+        self.recurrence_covariates = sel_recurrence_covariates[['Covariates Name', 'code', 'recurrence', 'threshold']]
+
+        return output_df
+
+    def fit(self, input_df: pd.DataFrame):
+        """
+        fits the model on input_df
+
+        :param input_df: pandas.DataFrame
+            Data frame of the derivation cohort, see hdps_implementation
+        :return model: HDPSModel
+            the fitted model
+        """
+        self.fit_transform(input_df)
+        return self
+
+    def transform(self, input_df: pd.DataFrame):
+        """
+        creates the selected HDPS covariates for the patients of input_df with the thresholds of the fitted model.
+        codes which are not columns of input_df have count 0 for all patients.
+
+        :param input_df: pandas.DataFrame
+            Data frame with the code columns of the selected covariates and other optional columns
+        :return output_df: pandas.DataFrame
+            DataFrame with the columns of input_df without dimension names as prefixes and columns with HDPS covariates
+        """
+        if self.recurrence_covariates is None:
+            raise ModelNotFittedError(message="HDPSModel is not fitted, call fit first")
+
+        not_code_columns = get_non_code_cols(col_names=list(input_df.columns),
+                                             dimension_prefixes=self.dimension_prefixes)
+        codes = list(dict.fromkeys(self.recurrence_covariates['code']))
+        code_df = input_df.reindex(columns=codes, fill_value=0)
+
+        dim_covariates_sel = create_recurrence_covariates(input_df=code_df,
+                                                          recurrence_covariates=self.recurrence_covariates)
+
+        return pd.concat([input_df[not_code_columns], dim_covariates_sel], axis=1)
+
+    def get_state(self):
+        """
+        :return state: dict
+            the parameters and the fitted state of the model, json serializable except for numpy scalars
+        """
+        return {'params': {'n': self.n, 'k': self.k, 'outcome': self.outcome, 'treatment': self.treatment,
+                           'dimension_prefixes': self.dimension_prefixes, 'm': self.m, 'threshold': self.threshold,
+                           'outcome_cont': self.outcome_cont, 'n_jobs': self.n_jobs},
+                'rank_df': None if self.rank_df is None else self.rank_df.to_dict(orient='list'),
+                'recurrence_covariates': None if self.recurrence_covariates is None
+                else self.recurrence_covariates.to_dict(orient='list')}
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """
+        :param state: dict
+            state from get_state
+        :return model: HDPSModel
+            the model with the given state
+        """
+        model = cls(**state['params'])
+        if state['rank_df'] is not None:
+            model.rank_df = pd.DataFrame(state['rank_df'])
+            model.recurrence_covariates = pd.DataFrame(state['recurrence_covariates']).astype({'threshold': np.float64})
+
+        return model
+
+    def save(self, path: str):
+        """
+        saves the parameters and the fitted state of the model as a compressed npz file
+
+        :param path: str
+            path of the npz file
+        """
+        np.savez_compressed(path, **self.to_arrays())
+
+    def to_arrays(self):
+        """
+        :return arrays: dict
+            arrays of the npz file of save, the state of get_state as a json string under the key 'model'
+        """
+        return {'model': json.dumps(self.get_state(), default=lambda value: value.item())}
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        loads a model saved with save
+
+        :param path: str
+            path of the npz file
+        :return model: HDPSModel
+            the loaded model
+        """
+        with np.load(path) as saved:
+            return cls.from_arrays({key: saved[key] for key in saved.files})
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """
+        :param arrays: dict
+            arrays from to_arrays
+        :return model: HDPSModel
+            the model with the saved state
+        """
+        return cls.from_state(json.loads(str(arrays['model'])))
@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+
+def get_n_workers(n_jobs: int = 1):
+    """
+    gives the number of workers for n_jobs
+
+    :param n_jobs: int
+        number of parallel workers. -1 uses all cores, -2 all cores but one and so on. Default value: 1
+    :return n_workers: int
+        number of workers, at least 1
+    """
+
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def parallel_map(function: Callable, tasks: list, n_jobs: int = 1):
+    """
+    applies function to every task in a pool of threads, which share the memory of the arrays and data frames of the
+    tasks. the NumPy kernels of the tasks release the GIL, so the tasks run on several cores. the results are returned
+    in the order of the tasks, so that the merge of the results is deterministic.
+
+    :param function: Callable
+        function with one argument
+    :param tasks: list
+        arguments of function
+    :param n_jobs: int
+        number of parallel workers. -1 uses all cores. Default value: 1 - the tasks run sequentially without a pool
+    :return results: list
+        function(task) for every task, in the order of tasks
+    """
+
+    n_workers = min(get_n_workers(n_jobs), len(tasks))
+    if n_workers <= 1:
+        return [function(task) for task in tasks]
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(function, tasks))
+
+
+def process_map(function: Callable, tasks: list, n_jobs: int = 1):
+    """
+    applies function to every task in a pool of processes. function has to be defined at module level, the tasks are
+    pickled - large arrays are shared with the workers via multiprocessing.shared_memory instead. the results are
+    returned in the order of the tasks.
+
+    :param function: Callable
+        function with one argument, defined at module level
+    :param tasks: list
+        arguments of function
+    :param n_jobs: int
+        number of worker processes. -1 uses all cores. Default value: 1 - the tasks run sequentially without a pool
+    :return results: list
+        function(task) for every task, in the order of tasks
+    """
+
+    n_workers = min(get_n_workers(n_jobs), len(tasks))
+    if n_workers <= 1:
+        return [function(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(function, tasks))
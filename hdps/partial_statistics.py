@@ -0,0 +1,569 @@
+import numpy as np
+import pandas as pd
+from functools import reduce
+from hdps.algorithm_steps import get_recurrence_covariates, create_recurrence_covariates, count_covariate_cells, \
+    select_top_k_from_cell_counts, select_recurrence_covariates, log_invalid_code_columns, \
+    step_identify_candidate_empirical_covariates_from_statistics
+from hdps.column_index import ColumnIndex
+from hdps.column_statistics import ColumnStatistics, get_column_statistics, merge_column_statistics, \
+    reindex_column_statistics
+from hdps.exceptions import DuplicateIdError, ColumnNotBinaryError, InputShapeMismatchError
+
+CELL_HISTOGRAM_COLUMNS = ['code', 'value', 'treatment', 'outcome']
+
+
+class PartialStatistics:
+    """
+    sufficient statistics of one partition of the patients (for example the patients of one insurer on one node) for
+    the selection of the candidate codes and their recurrence thresholds - the distribution of the non-zero counts of
+    every code column and the distributions of the treatment and outcome values. the statistics of disjoint partitions
+    are merged with merge_partial_statistics, no patient rows are needed. optionally the statistics include the cell
+    histogram, from which the cell counts of any recurrence covariate are derived without the patient rows (see
+    get_histogram_cell_counts).
+
+    :param column_statistics: ColumnStatistics
+        statistics of the code columns of the partition
+    :param not_code_columns: list - list of strings
+        list of names of columns without dimension names as prefixes
+    :param treatment_value_counts: pandas.Series
+        number of patients for each distinct treatment value
+    :param outcome_value_counts: pandas.Series
+        number of patients for each distinct outcome value
+    :param cell_histogram: pandas.DataFrame
+        DataFrame with columns 'code', 'value', 'treatment', 'outcome' and 'count' - number of patients for each
+        non-zero code count of each code and each treatment and outcome value, see compute_cell_histogram. it has one
+        entry per distinct code count, treatment and outcome value of every code, which is small for a binary outcome
+        and grows with the number of distinct values of a continuous outcome. Default value: None - not calculated
+    """
+
+    def __init__(self, column_statistics: ColumnStatistics, not_code_columns: list, treatment_value_counts: pd.Series,
+                 outcome_value_counts: pd.Series, cell_histogram: pd.DataFrame = None):
+        self.column_statistics = column_statistics
+        self.not_code_columns = list(not_code_columns)
+        self.treatment_value_counts = treatment_value_counts.astype(np.int64)
+        self.outcome_value_counts = outcome_value_counts.astype(np.int64)
+        self.cell_histogram = cell_histogram
+
+    @property
+    def n_rows(self):
+        """
+        :return n_rows: int
+            number of patients of the partition
+        """
+        return self.column_statistics.n_rows
+
+    def to_arrays(self):
+        """
+        :return arrays: dict
+            the statistics as numpy arrays, for example for np.savez
+        """
+        stats = self.column_statistics
+        arrays = {'columns': np.array(stats.columns, dtype=str), 'n_rows': stats.n_rows,
+                  'value_indptr': stats.value_indptr, 'values': stats.values, 'value_counts': stats.value_counts,
+                  'not_code_columns': np.array(self.not_code_columns, dtype=str),
+                  'treatment_values': self.treatment_value_counts.index.to_numpy(),
+                  'treatment_counts': self.treatment_value_counts.to_numpy(),
+                  'outcome_values': self.outcome_value_counts.index.to_numpy(),
+                  'outcome_counts': self.outcome_value_counts.to_numpy()}
+        if self.cell_histogram is not None:
+            arrays.update({'histogram_' + col: self.cell_histogram[col].to_numpy(dtype=str if col == 'code' else None)
+                           for col in self.cell_histogram.columns})
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        :param arrays: dict or numpy.lib.npyio.NpzFile
+            arrays from to_arrays
+        :return partial_statistics: PartialStatistics
+            the statistics
+        """
+        column_statistics = ColumnStatistics(columns=list(arrays['columns']), n_rows=int(arrays['n_rows']),
+                                             value_indptr=arrays['value_indptr'], values=arrays['values'],
+                                             value_counts=arrays['value_counts'])
+        cell_histogram = None
+        if 'histogram_code' in arrays:
+            cell_histogram = pd.DataFrame({col: arrays['histogram_' + col]
+                                           for col in CELL_HISTOGRAM_COLUMNS + ['count']})
+            cell_histogram['code'] = cell_histogram['code'].astype(str)
+
+        return cls(column_statistics=column_statistics, not_code_columns=list(arrays['not_code_columns']),
+                   treatment_value_counts=pd.Series(arrays['treatment_counts'], index=arrays['treatment_values']),
+                   outcome_value_counts=pd.Series(arrays['outcome_counts'], index=arrays['outcome_values']),
+                   cell_histogram=cell_histogram)
+
+    def save(self, path: str):
+        """
+        saves the statistics as a compressed npz file
+
+        :param path: str
+            path of the npz file
+        """
+        np.savez_compressed(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        :param path: str
+            path of a npz file saved with save
+        :return partial_statistics: PartialStatistics
+            the loaded statistics
+        """
+        with np.load(path) as saved:
+            return cls.from_arrays(saved)
+
+
+class PartialCellCounts:
+    """
+    cell counts of the contingency tables of the candidate covariates with treatment and outcome in one partition of
+    the patients. the cell counts of disjoint partitions are merged with merge_partial_cell_counts.
+
+    :param covariate_names: list - list of strings
+        names of the covariates, in the order of the recurrence covariates
+    :param cov_count: numpy.ndarray
+        number of patients with covariate = 1, for each covariate
+    :param cov_treated_count: numpy.ndarray
+        number of patients with covariate = 1 and treatment = 1, for each covariate
+    :param cov_outcome_count: numpy.ndarray
+        number of patients with covariate = 1 and outcome = 1, for each covariate
+    :param treated_count: int
+        number of patients with treatment = 1
+    :param outcome_count: int
+        number of patients with outcome = 1
+    :param total_count: int
+        number of patients
+    """
+
+    def __init__(self, covariate_names: list, cov_count: np.ndarray, cov_treated_count: np.ndarray,
+                 cov_outcome_count: np.ndarray, treated_count: int, outcome_count: int, total_count: int):
+        self.covariate_names = list(covariate_names)
+        self.cov_count = np.asarray(cov_count, dtype=np.int64)
+        self.cov_treated_count = np.asarray(cov_treated_count, dtype=np.int64)
+        self.cov_outcome_count = np.asarray(cov_outcome_count, dtype=np.int64)
+        self.treated_count = int(treated_count)
+        self.outcome_count = int(outcome_count)
+        self.total_count = int(total_count)
+
+    def to_dict(self):
+        """
+        :return cell_counts: dict
+            the cell counts as keyword arguments of select_top_k_from_cell_counts
+        """
+        return {'covariate_names': self.covariate_names, 'cov_count': self.cov_count,
+                'cov_treated_count': self.cov_treated_count, 'cov_outcome_count': self.cov_outcome_count,
+                'treated_count': self.treated_count, 'outcome_count': self.outcome_count,
+                'total_count': self.total_count}
+
+    def save(self, path: str):
+        """
+        saves the cell counts as a compressed npz file
+
+        :param path: str
+            path of the npz file
+        """
+        cell_counts = self.to_dict()
+        cell_counts['covariate_names'] = np.array(self.covariate_names, dtype=str)
+        np.savez_compressed(path, **cell_counts)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        :param path: str
+            path of a npz file saved with save
+        :return partial_cell_counts: PartialCellCounts
+            the loaded cell counts
+        """
+        with np.load(path) as saved:
+            return cls(covariate_names=list(saved['covariate_names']), cov_count=saved['cov_count'],
+                       cov_treated_count=saved['cov_treated_count'], cov_outcome_count=saved['cov_outcome_count'],
+                       treated_count=int(saved['treated_count']), outcome_count=int(saved['outcome_count']),
+                       total_count=int(saved['total_count']))
+
+
+def compute_partial_statistics(input_df: pd.DataFrame, treatment: str, outcome: str, dimension_prefixes: list,
+                               n_jobs: int = 1, cell_histogram: bool = False):
+    """
+    first round on a node - calculates the PartialStatistics of the partition of the patients of the node
+
+    :param input_df: pandas.DataFrame
+        Data frame of the partition with the columns of input_df of hdps_implementation
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param n_jobs: int
+        number of threads which scan blocks of code columns, -1 uses all cores. Default value: 1
+    :param cell_histogram: bool
+        True to include the cell histogram, see PartialStatistics. Default value: False
+    :return partial_statistics: PartialStatistics
+        statistics of the partition
+    """
+
+    # duplicates can only be checked within a partition, the PIDs are not shared
+    if input_df['PID'].duplicated().any():
+        raise DuplicateIdError('Duplicates in PID column')
+
+    column_index = ColumnIndex(col_names=input_df.columns, dimension_prefixes=dimension_prefixes)
+    column_statistics = get_column_statistics(input_df=input_df, code_columns=column_index.code_columns,
+                                              n_jobs=n_jobs)
+
+    return PartialStatistics(column_statistics=column_statistics, not_code_columns=column_index.not_code_columns,
+                             treatment_value_counts=input_df[treatment].value_counts(),
+                             outcome_value_counts=input_df[outcome].value_counts(),
+                             cell_histogram=compute_cell_histogram(input_df=input_df,
+                                                                   code_columns=column_index.code_columns,
+                                                                   treatment=treatment, outcome=outcome)
+                             if cell_histogram else None)
+
+
+def merge_partial_statistics(partial_statistics_list: list):
+    """
+    merges the PartialStatistics of disjoint partitions of the patients. the partitions may have different code
+    columns, a code column which is missing in a partition has count 0 for its patients. the merge is associative.
+
+    :param partial_statistics_list: list - list of PartialStatistics
+        statistics of the partitions
+    :return partial_statistics: PartialStatistics
+        statistics of all patients, with the columns of all partitions in the order of their first occurrence. the
+        cell histogram is merged if all partitions have one
+    """
+
+    columns = list(dict.fromkeys(col for stats in partial_statistics_list for col in stats.column_statistics.columns))
+    column_statistics = merge_column_statistics([reindex_column_statistics(stats.column_statistics, columns)
+                                                 for stats in partial_statistics_list])
+
+    def add_value_counts(value_counts_list):
+        return reduce(lambda left, right: left.add(right, fill_value=0), value_counts_list)
+
+    return PartialStatistics(
+        column_statistics=column_statistics,
+        not_code_columns=list(dict.fromkeys(col for stats in partial_statistics_list
+                                            for col in stats.not_code_columns)),
+        treatment_value_counts=add_value_counts([stats.treatment_value_counts for stats in partial_statistics_list]),
+        outcome_value_counts=add_value_counts([stats.outcome_value_counts for stats in partial_statistics_list]),
+        cell_histogram=merge_cell_histograms([stats.cell_histogram for stats in partial_statistics_list])
+        if all(stats.cell_histogram is not None for stats in partial_statistics_list) else None)
+
+
+def compute_cell_histogram(input_df: pd.DataFrame, code_columns: list, treatment: str, outcome: str):
+    """
+    counts the patients for each non-zero code count of each code and each treatment and outcome value
+
+    :param input_df: pandas.DataFrame
+        Data frame with the code columns, treatment and outcome
+    :param code_columns: list - list of strings
+        names of the code columns
+    :param treatment: str
+        name of the column which have treatment(exposure) values
+    :param outcome: str
+        name of the column which have outcome values
+    :return cell_histogram: pandas.DataFrame
+        DataFrame with columns 'code', 'value', 'treatment', 'outcome' and 'count'
+    """
+
+    code_block = input_df[list(code_columns)].to_numpy()
+    rows, positions = np.nonzero(code_block)
+
+    cell_df = pd.DataFrame({'code': positions, 'value': code_block[rows, positions],
+                            'treatment': input_df[treatment].to_numpy()[rows],
+                            'outcome': input_df[outcome].to_numpy()[rows]})
+    cell_histogram = cell_df.groupby(CELL_HISTOGRAM_COLUMNS).size().rename('count').reset_index()
+    cell_histogram['code'] = np.array(code_columns, dtype=object)[cell_histogram['code'].to_numpy()]
+
+    return cell_histogram
+
+
+def merge_cell_histograms(cell_histograms: list):
+    """
+    merges the cell histograms of disjoint sets of patients. the merge is associative.
+
+    :param cell_histograms: list - list of pandas.DataFrame
+        cell histograms from compute_cell_histogram
+    :return cell_histogram: pandas.DataFrame
+        cell histogram of all patients
+    """
+    return pd.concat(cell_histograms, ignore_index=True).groupby(CELL_HISTOGRAM_COLUMNS)['count'].sum().reset_index()
+
+
+def get_histogram_cell_counts(partial_statistics: PartialStatistics, recurrence_covariates: pd.DataFrame,
+                              outcome_threshold_value: float = None):
+    """
+    derives the cell counts of the contingency tables of the recurrence covariates with treatment and outcome from the
+    cell histogram, identical to the counts of the recurrence covariates created from the code columns
+
+    :param partial_statistics: PartialStatistics
+        statistics with the cell histogram, see compute_partial_statistics
+    :param recurrence_covariates: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'code', 'recurrence' and 'threshold', see get_recurrence_covariates
+    :param outcome_threshold_value: float
+        cut-off threshold for a continuous outcome, None for a binary outcome. Default value: None
+    :return partial_cell_counts: PartialCellCounts
+        cell counts of the recurrence covariates
+    """
+
+    cells = partial_statistics.cell_histogram.merge(
+        recurrence_covariates[['Covariates Name', 'code', 'recurrence', 'threshold']], on='code')
+    is_set = np.where(cells['recurrence'] == 'onetime', cells['value'] > 0, cells['value'] >= cells['threshold'])
+    cells = cells[is_set]
+
+    def has_outcome(outcome_values):
+        return outcome_values != 0 if outcome_threshold_value is None else outcome_values > outcome_threshold_value
+
+    count = cells['count'].to_numpy()
+    counts = pd.DataFrame({'cov_count': count, 'cov_treated_count': count * (cells['treatment'].to_numpy() != 0),
+                           'cov_outcome_count': count * has_outcome(cells['outcome'].to_numpy())},
+                          index=cells['Covariates Name'])
+    counts = counts.groupby(level=0).sum().reindex(recurrence_covariates['Covariates Name'], fill_value=0)
+
+    treatment_value_counts = partial_statistics.treatment_value_counts
+    outcome_value_counts = partial_statistics.outcome_value_counts
+
+    return PartialCellCounts(
+        covariate_names=list(recurrence_covariates['Covariates Name']), cov_count=counts['cov_count'].to_numpy(),
+        cov_treated_count=counts['cov_treated_count'].to_numpy(),
+        cov_outcome_count=counts['cov_outcome_count'].to_numpy(),
+        treated_count=treatment_value_counts[treatment_value_counts.index != 0].sum(),
+        outcome_count=outcome_value_counts[has_outcome(outcome_value_counts.index.to_numpy())].sum(),
+        total_count=partial_statistics.n_rows)
+
+
+def partial_input_data_validation(partial_statistics: PartialStatistics, treatment: str, outcome: str,
+                                  outcome_cont: bool = False):
+    """
+    performs validation of the merged statistics of all partitions and reports the invalid code columns, which are
+    ignored by the next steps
+
+    :param partial_statistics: PartialStatistics
+        merged statistics of all partitions
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param outcome_cont: bool
+        True if outcome is continous and False if outcome is binary. Default value: False
+    """
+
+    binary_values = [(treatment, partial_statistics.treatment_value_counts)]
+    if not outcome_cont:
+        binary_values.append((outcome, partial_statistics.outcome_value_counts))
+    for column, value_counts in binary_values:
+        values = set(value_counts.index)
+        if values != {0, 1}:
+            message = f"Treatment column and outcome column must be binary and contain both 0 and 1. Column {column} " \
+                      f"contains {sorted(values)}"
+            raise ColumnNotBinaryError(message=message)
+
+    column_statistics = partial_statistics.column_statistics
+    invalid_code_columns = [col for col, valid in zip(column_statistics.columns, column_statistics.valid) if not valid]
+    log_invalid_code_columns(invalid_code_columns)
+
+
+def partial_step_identify_candidate_empirical_covariates(partial_statistics: PartialStatistics,
+                                                         dimension_prefixes: list, n: int, m: int = 1):
+    """
+    performs selection of the top n prevalent codes in each dimension and gives their recurrence covariates with the
+    thresholds of all patients, which are sent to the nodes for the second round
+
+    :param partial_statistics: PartialStatistics
+        merged statistics of all partitions
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param n: int
+        number of prevanlent codes to be retained in each dimension
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped. Default value for m is 1.
+    :return recurrence_covariates: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'code', 'code_position', 'recurrence' and 'threshold' of the
+        recurrence covariates of the selected codes, see get_recurrence_covariates
+    """
+
+    column_statistics = partial_statistics.column_statistics
+    selected_columns = step_identify_candidate_empirical_covariates_from_statistics(
+        column_statistics=column_statistics, dimension_prefixes=dimension_prefixes, n=n, m=m)
+
+    median, p_75, min_value = column_statistics.recurrence_thresholds(selected_columns)
+
+    return get_recurrence_covariates(selected_columns=selected_columns, median=median, p_75=p_75,
+                                     min_value=min_value)
+
+
+def get_partial_code_df(input_df: pd.DataFrame, codes: list):
+    """
+    :param input_df: pandas.DataFrame
+        Data frame of a partition
+    :param codes: list - list of strings
+        names of code columns
+    :return code_df: pandas.DataFrame
+        the code columns of input_df, codes which are not columns of input_df have count 0
+    """
+    return input_df.reindex(columns=codes, fill_value=0)
+
+
+def compute_partial_cell_counts(input_df: pd.DataFrame, recurrence_covariates: pd.DataFrame, treatment: str,
+                                outcome: str, outcome_threshold_value: float = None):
+    """
+    second round on a node - creates the candidate covariates of the partition and counts the cells of their
+    contingency tables with treatment and outcome
+
+    :param input_df: pandas.DataFrame
+        Data frame of the partition with the columns of input_df of hdps_implementation
+    :param recurrence_covariates: pandas.DataFrame
+        recurrence covariates from partial_step_identify_candidate_empirical_covariates
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param outcome_threshold_value: float
+        cut-off threshold for a continuous outcome, None for a binary outcome. Default value: None
+    :return partial_cell_counts: PartialCellCounts
+        cell counts of the partition
+    """
+
+    code_df = get_partial_code_df(input_df=input_df, codes=list(dict.fromkeys(recurrence_covariates['code'])))
+    dim_covariates = create_recurrence_covariates(input_df=code_df, recurrence_covariates=recurrence_covariates)
+
+    treatment_values = input_df[treatment].to_numpy(dtype=np.int64)
+    outcome_values = input_df[outcome].to_numpy()
+    if outcome_threshold_value is not None:
+        outcome_values = np.where(outcome_values > outcome_threshold_value, 1, 0)
+    outcome_values = outcome_values.astype(np.int64)
+
+    cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(
+        covariate_block=dim_covariates.to_numpy(), treatment_values=treatment_values, outcome_values=outcome_values)
+
+    return PartialCellCounts(covariate_names=list(recurrence_covariates['Covariates Name']), cov_count=cov_count,
+                             cov_treated_count=cov_treated_count, cov_outcome_count=cov_outcome_count,
+                             treated_count=treatment_values.sum(), outcome_count=outcome_values.sum(),
+                             total_count=input_df.shape[0])
+
+
+def merge_partial_cell_counts(partial_cell_counts_list: list):
+    """
+    merges the PartialCellCounts of the same covariates of disjoint partitions. the merge is associative.
+
+    :param partial_cell_counts_list: list - list of PartialCellCounts
+        cell counts of the partitions
+    :return partial_cell_counts: PartialCellCounts
+        cell counts of all patients
+    """
+
+    covariate_names = partial_cell_counts_list[0].covariate_names
+    for cell_counts in partial_cell_counts_list[1:]:
+        if cell_counts.covariate_names != covariate_names:
+            raise InputShapeMismatchError(message="Cell counts of different covariates can't be merged")
+
+    counts = {key: sum(getattr(cell_counts, key) for cell_counts in partial_cell_counts_list)
+              for key in ['cov_count', 'cov_treated_count', 'cov_outcome_count', 'treated_count', 'outcome_count',
+                          'total_count']}
+
+    return PartialCellCounts(covariate_names=covariate_names, **counts)
+
+
+def partial_step_prioritize_select_covariates(partial_cell_counts: PartialCellCounts,
+                                              recurrence_covariates: pd.DataFrame, k: int):
+    """
+    calculates BiasMult of the candidate covariates from the merged cell counts and selects the top k covariates
+
+    :param partial_cell_counts: PartialCellCounts
+        merged cell counts of all partitions
+    :param recurrence_covariates: pandas.DataFrame
+        recurrence covariates from partial_step_identify_candidate_empirical_covariates
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    :return sel_recurrence_covariates: pandas.DataFrame
+        rows of recurrence_covariates of the k selected covariates in rank order, which are sent to the nodes to create
+        the covariates of their patients
+    """
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(k=k, **partial_cell_counts.to_dict())
+
+    sel_recurrence_covariates = select_recurrence_covariates(recurrence_covariates=recurrence_covariates,
+                                                             covariate_names=sel_covariate_names)
+
+    return rank_df, sel_recurrence_covariates
+
+
+def create_partial_output(input_df: pd.DataFrame, sel_recurrence_covariates: pd.DataFrame, not_code_columns: list):
+    """
+    last round on a node - creates the selected covariates of the patients of the partition
+
+    :param input_df: pandas.DataFrame
+        Data frame of the partition
+    :param sel_recurrence_covariates: pandas.DataFrame
+        recurrence covariates of the selected covariates from partial_step_prioritize_select_covariates
+    :param not_code_columns: list - list of strings
+        list of names of columns of input_df which are kept in output_df
+    :return output_df: pandas.DataFrame
+        DataFrame with not_code_columns of input_df and columns with HDPS covariates
+    """
+
+    code_df = get_partial_code_df(input_df=input_df, codes=list(dict.fromkeys(sel_recurrence_covariates['code'])))
+    dim_covariates_sel = create_recurrence_covariates(input_df=code_df,
+                                                      recurrence_covariates=sel_recurrence_covariates)
+
+    return pd.concat([input_df[not_code_columns], dim_covariates_sel], axis=1)
+
+
+def read_partition(partition):
+    """
+    :param partition: pandas.DataFrame or str
+        Data frame of a partition or path of a csv or parquet file of a partition on a shared filesystem
+    :return input_df: pandas.DataFrame
+        Data frame of the partition
+    """
+    if isinstance(partition, pd.DataFrame):
+        return partition
+    if str(partition).endswith('.parquet'):
+        return pd.read_parquet(partition)
+    return pd.read_csv(partition)
+
+
+def partial_statistics_worker(task: tuple):
+    """
+    first round of hdps_partitioned_implementation in a worker process
+
+    :param task: tuple
+        (partition, treatment, outcome, dimension_prefixes), see read_partition and compute_partial_statistics
+    :return partial_statistics: PartialStatistics
+        statistics of the partition
+    """
+    partition, treatment, outcome, dimension_prefixes = task
+    return compute_partial_statistics(input_df=read_partition(partition), treatment=treatment, outcome=outcome,
+                                      dimension_prefixes=dimension_prefixes)
+
+
+def partial_cell_counts_worker(task: tuple):
+    """
+    second round of hdps_partitioned_implementation in a worker process
+
+    :param task: tuple
+        (partition, recurrence_covariates, treatment, outcome, outcome_threshold_value), see read_partition and
+        compute_partial_cell_counts
+    :return partial_cell_counts: PartialCellCounts
+        cell counts of the partition
+    """
+    partition, recurrence_covariates, treatment, outcome, outcome_threshold_value = task
+    return compute_partial_cell_counts(input_df=read_partition(partition), recurrence_covariates=recurrence_covariates,
+                                       treatment=treatment, outcome=outcome,
+                                       outcome_threshold_value=outcome_threshold_value)
+
+
+def partial_output_worker(task: tuple):
+    """
+    last round of hdps_partitioned_implementation in a worker process
+
+    :param task: tuple
+        (partition, sel_recurrence_covariates, dimension_prefixes), see read_partition and create_partial_output
+    :return output_df: pandas.DataFrame
+        output_df of the partition
+    """
+    partition, sel_recurrence_covariates, dimension_prefixes = task
+    input_df = read_partition(partition)
+    not_code_columns = ColumnIndex(col_names=input_df.columns, dimension_prefixes=dimension_prefixes).not_code_columns
+    return create_partial_output(input_df=input_df, sel_recurrence_covariates=sel_recurrence_covariates,
+                                 not_code_columns=not_code_columns)
@@ -0,0 +1,303 @@
+import logging
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import minimize
+from scipy.special import expit
+from scipy.stats import rankdata
+from hdps.exceptions import ModelNotFittedError, CovariateNotNumericError
+
+
+class PropensityScoreModel:
+    """
+    propensity score estimation with an L2-regularized logistic regression of treatment on the columns of output_df of
+    hdps_implementation. the 0/1 HDPS covariates and any other column with only 0 and 1 values (bool columns, and
+    integer or float columns checked by value, for example predefined flags) are used as a sparse indicator matrix
+    which is built column by column from their non-zero entries, without a dense copy of the covariates. other numeric
+    columns (for example demographics) are standardized. the regression is fitted with L-BFGS, with
+    warm_start a new fit starts from the coefficients of the previous fit.
+
+    the minimized loss is the sum of the log-loss of the patients plus l2_penalty / 2 * (sum of the squared
+    coefficients of the indicators and of the standardized numeric columns), divided by the number of patients. the
+    intercept isn't penalized. l2_penalty corresponds to 1 / C of the logistic regression of scikit-learn.
+
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values, it is not used as a covariate. Default value: None
+    :param covariates: list - list of strings
+        names of the covariate columns, which must be numeric or bool. Default value: None - all numeric and bool
+        columns except 'PID', treatment and outcome, other columns (for example string demographics) are skipped
+    :param l2_penalty: float
+        strength of the L2 penalty. Default value: 1.0
+    :param max_iter: int
+        maximum number of L-BFGS iterations. Default value: 500
+    :param tol: float
+        the fit stops when the largest absolute value of the gradient of the loss is below tol. Default value: 1e-6
+    :param warm_start: bool
+        True to start a fit from the coefficients of the previous fit, covariates which weren't in the previous fit
+        start from 0. Default value: False
+
+    fitted attributes:
+    coef: pandas.Series
+        coefficient of each covariate on the scale of the covariate
+    intercept: float
+        intercept on the scale of the covariates
+    diagnostics: dict
+        'converged', 'n_iter', 'message' of the optimizer, 'log_likelihood' of the fitted model, 'gradient_max' -
+        largest absolute value of the gradient of the loss, 'c_statistic' - area under the ROC curve of the
+        propensity scores, 'n_patients', 'n_covariates' and 'n_nonzero' - number of non-zero entries of the indicators
+    """
+
+    def __init__(self, treatment: str, outcome: str = None, covariates: list = None, l2_penalty: float = 1.0,
+                 max_iter: int = 500, tol: float = 1e-6, warm_start: bool = False):
+        self.treatment = treatment
+        self.outcome = outcome
+        self.covariates = None if covariates is None else list(covariates)
+        self.l2_penalty = l2_penalty
+        self.max_iter = max_iter
+        self.tol = tol
+        self.warm_start = warm_start
+        self.coef = None
+        self.intercept = None
+        self.diagnostics = None
+
+    def get_covariates(self, output_df: pd.DataFrame):
+        """
+        :param output_df: pandas.DataFrame
+            Data frame with the covariate columns
+        :return covariates: list - list of strings
+            names of the covariate columns
+        """
+        if self.covariates is not None:
+            not_numeric = [col for col in self.covariates if not pd.api.types.is_numeric_dtype(output_df[col])]
+            if len(not_numeric) > 0:
+                message = f"Covariates of the propensity score model must be numeric or bool. Columns {not_numeric} " \
+                          f"are not numeric, encode them (for example as 0/1 columns) first"
+                raise CovariateNotNumericError(message=message)
+            return self.covariates
+
+        candidates = [col for col in output_df.columns if col not in {'PID', self.treatment, self.outcome}]
+        skipped = [col for col in candidates if not pd.api.types.is_numeric_dtype(output_df[col])]
+        if len(skipped) > 0:
+            logging.warning("Columns which are not numeric are not used as covariates: " + str(skipped))
+        return [col for col in candidates if col not in set(skipped)]
+
+    def fit(self, output_df: pd.DataFrame):
+        """
+        fits the logistic regression of treatment on the covariates
+
+        :param output_df: pandas.DataFrame
+            Data frame with the treatment column and the covariate columns, for example output_df of
+            hdps_implementation
+        :return model: PropensityScoreModel
+            the fitted model
+        """
+        covariates = self.get_covariates(output_df)
+        indicators, numeric = split_covariates(output_df=output_df, covariates=covariates)
+        indicator_matrix = get_indicator_matrix(output_df=output_df, columns=indicators)
+
+        numeric_block = output_df[numeric].to_numpy(dtype=np.float64)
+        numeric_mean = numeric_block.mean(axis=0)
+        numeric_scale = numeric_block.std(axis=0)
+        numeric_scale[numeric_scale == 0] = 1.0
+        numeric_block = (numeric_block - numeric_mean) / numeric_scale
+
+        # initial coefficients on the scale of the fit, the intercept is the last element
+        x0 = np.zeros(len(indicators) + len(numeric) + 1)
+        if self.warm_start and self.coef is not None:
+            x0[:-1] = self.coef.reindex(indicators + numeric, fill_value=0.0).to_numpy()
+            x0[len(indicators):-1] *= numeric_scale
+            x0[-1] = self.intercept + self.coef.reindex(numeric, fill_value=0.0).to_numpy() @ numeric_mean
+
+        treatment_values = output_df[self.treatment].to_numpy(dtype=np.float64)
+        result = fit_logistic_regression(indicator_matrix=indicator_matrix, numeric_block=numeric_block,
+                                         treatment_values=treatment_values, l2_penalty=self.l2_penalty,
+                                         max_iter=self.max_iter, tol=self.tol, x0=x0)
+
+        # coefficients on the scale of the covariates
+        coef = result.x[:-1].copy()
+        coef[len(indicators):] /= numeric_scale
+        self.coef = pd.Series(coef, index=indicators + numeric).reindex(covariates)
+        self.intercept = float(result.x[-1] - coef[len(indicators):] @ numeric_mean)
+
+        linear_predictor = linear_predict(indicator_matrix=indicator_matrix, numeric_block=numeric_block, x=result.x)
+        self.diagnostics = {'converged': bool(result.success), 'n_iter': int(result.nit),
+                            'message': str(result.message),
+                            'log_likelihood': -float(log_loss(linear_predictor, treatment_values).sum()),
+                            'gradient_max': float(np.abs(result.jac).max()),
+                            'c_statistic': c_statistic(scores=linear_predictor, labels=treatment_values),
+                            'n_patients': output_df.shape[0], 'n_covariates': len(covariates),
+                            'n_nonzero': int(indicator_matrix.nnz)}
+        if not result.success:
+            logging.warning('Propensity score model did not converge: ' + str(result.message))
+
+        return self
+
+    def predict(self, output_df: pd.DataFrame):
+        """
+        :param output_df: pandas.DataFrame
+            Data frame with the covariate columns of the fitted model
+        :return propensity_scores: pandas.Series
+            propensity score (probability of treatment) of every patient, aligned with output_df
+        """
+        if self.coef is None:
+            raise ModelNotFittedError(message="PropensityScoreModel is not fitted, call fit first")
+
+        indicators, numeric = split_covariates(output_df=output_df, covariates=list(self.coef.index))
+        linear_predictor = get_indicator_matrix(output_df=output_df, columns=indicators) @ \
+            self.coef[indicators].to_numpy() + output_df[numeric].to_numpy(dtype=np.float64) @ \
+            self.coef[numeric].to_numpy() + self.intercept
+
+        return pd.Series(expit(linear_predictor), index=output_df.index, name='propensity_score')
+
+    def fit_predict(self, output_df: pd.DataFrame):
+        """
+        :param output_df: pandas.DataFrame
+            Data frame with the treatment column and the covariate columns, see fit
+        :return propensity_scores: pandas.Series
+            propensity score of every patient of output_df, see predict
+        """
+        return self.fit(output_df).predict(output_df)
+
+
+def split_covariates(output_df: pd.DataFrame, covariates: list):
+    """
+    :param output_df: pandas.DataFrame
+        Data frame with the covariate columns
+    :param covariates: list - list of strings
+        names of the covariate columns
+    :return indicators: list - list of strings
+        covariates with only 0 and 1 values, which are used as a sparse matrix
+    :return numeric: list - list of strings
+        other covariates, which are standardized
+    """
+    is_indicator = [is_indicator_column(output_df[col]) for col in covariates]
+    return [col for col, indicator in zip(covariates, is_indicator) if indicator], \
+        [col for col, indicator in zip(covariates, is_indicator) if not indicator]
+
+
+def is_indicator_column(column: pd.Series):
+    """
+    :param column: pandas.Series
+        numeric or bool column
+    :return is_indicator: bool
+        True for a bool column and for a column which has only 0 and 1 values
+    """
+    if pd.api.types.is_bool_dtype(column):
+        return True
+    values = column.to_numpy()
+    return bool(((values == 0) | (values == 1)).all())
+
+
+def get_indicator_matrix(output_df: pd.DataFrame, columns: list):
+    """
+    builds a sparse matrix from the non-zero entries of the columns, column by column
+
+    :param output_df: pandas.DataFrame
+        Data frame with the columns
+    :param columns: list - list of strings
+        names of the columns
+    :return indicator_matrix: scipy.sparse.csc_matrix
+        matrix with one row per row of output_df and one column per column
+    """
+    row_indices, values = [], []
+    for col in columns:
+        column_values = output_df[col].to_numpy()
+        non_zero = np.flatnonzero(column_values)
+        row_indices.append(non_zero)
+        values.append(column_values[non_zero].astype(np.float64))
+
+    indptr = np.concatenate([[0], np.cumsum([indices.shape[0] for indices in row_indices])]).astype(np.int64)
+    return sp.csc_matrix((np.concatenate(values) if values else np.zeros(0),
+                          np.concatenate(row_indices) if row_indices else np.zeros(0, dtype=np.int64), indptr),
+                         shape=(output_df.shape[0], len(columns)))
+
+
+def linear_predict(indicator_matrix: sp.spmatrix, numeric_block: np.ndarray, x: np.ndarray):
+    """
+    :param indicator_matrix: scipy.sparse.spmatrix
+        sparse covariates, one row per patient
+    :param numeric_block: numpy.ndarray
+        2-d array of dense covariates, one row per patient
+    :param x: numpy.ndarray
+        coefficients of the columns of indicator_matrix and numeric_block followed by the intercept
+    :return linear_predictor: numpy.ndarray
+        linear predictor of every patient
+    """
+    n_indicators = indicator_matrix.shape[1]
+    return indicator_matrix @ x[:n_indicators] + numeric_block @ x[n_indicators:-1] + x[-1]
+
+
+def log_loss(linear_predictor: np.ndarray, labels: np.ndarray):
+    """
+    :param linear_predictor: numpy.ndarray
+        linear predictor of every patient
+    :param labels: numpy.ndarray
+        binary labels
+    :return log_loss: numpy.ndarray
+        negative log-likelihood of every patient, computed without overflow
+    """
+    return np.logaddexp(0, linear_predictor) - labels * linear_predictor
+
+
+def fit_logistic_regression(indicator_matrix: sp.spmatrix, numeric_block: np.ndarray, treatment_values: np.ndarray,
+                            l2_penalty: float = 1.0, max_iter: int = 500, tol: float = 1e-6, x0: np.ndarray = None):
+    """
+    fits an L2-regularized logistic regression with L-BFGS. every evaluation of the loss and its gradient is one
+    product with the sparse indicators and one with the dense block, and one with each of their transposes.
+
+    :param indicator_matrix: scipy.sparse.spmatrix
+        sparse covariates, one row per patient
+    :param numeric_block: numpy.ndarray
+        2-d array of dense covariates, one row per patient
+    :param treatment_values: numpy.ndarray
+        binary treatment values
+    :param l2_penalty: float
+        strength of the L2 penalty of the coefficients, the intercept isn't penalized. Default value: 1.0
+    :param max_iter: int
+        maximum number of iterations. Default value: 500
+    :param tol: float
+        tolerance of the largest absolute value of the gradient of the mean loss. Default value: 1e-6
+    :param x0: numpy.ndarray
+        initial coefficients of the columns of indicator_matrix and numeric_block followed by the intercept. Default
+        value: None - zeros
+    :return result: scipy.optimize.OptimizeResult
+        result of scipy.optimize.minimize, result.x has the coefficients and the intercept
+    """
+    n_patients = indicator_matrix.shape[0]
+    n_indicators = indicator_matrix.shape[1]
+    indicator_matrix_t = indicator_matrix.T.tocsr()
+    penalty_weight = np.ones(n_indicators + numeric_block.shape[1] + 1)
+    penalty_weight[-1] = 0.0
+
+    def loss_and_gradient(x):
+        linear_predictor = linear_predict(indicator_matrix=indicator_matrix, numeric_block=numeric_block, x=x)
+        residual = expit(linear_predictor) - treatment_values
+        gradient = np.concatenate([indicator_matrix_t @ residual, numeric_block.T @ residual, [residual.sum()]])
+        loss = log_loss(linear_predictor, treatment_values).sum() + l2_penalty / 2 * (penalty_weight * x ** 2).sum()
+        return loss / n_patients, (gradient + l2_penalty * penalty_weight * x) / n_patients
+
+    if x0 is None:
+        x0 = np.zeros(penalty_weight.shape[0])
+
+    return minimize(loss_and_gradient, x0, jac=True, method='L-BFGS-B',
+                    options={'maxiter': max_iter, 'gtol': tol, 'ftol': 0.0})
+
+
+def c_statistic(scores: np.ndarray, labels: np.ndarray):
+    """
+    :param scores: numpy.ndarray
+        scores of every patient, for example propensity scores or their linear predictor
+    :param labels: numpy.ndarray
+        binary labels
+    :return c_statistic: float
+        area under the ROC curve, ties count half
+    """
+    is_positive = labels != 0
+    n_positive = int(is_positive.sum())
+    n_negative = labels.shape[0] - n_positive
+    if n_positive == 0 or n_negative == 0:
+        return np.nan
+    ranks = rankdata(scores)
+    return float((ranks[is_positive].sum() - n_positive * (n_positive + 1) / 2) / (n_positive * n_negative))
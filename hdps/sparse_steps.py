@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from hdps.algorithm_steps import select_dimension_codes, select_top_k_from_cell_counts, validate_binary_columns, \
+    log_invalid_code_columns, COVARIATE_DTYPE
+from hdps.column_index import ColumnIndex
+from hdps.exceptions import DuplicateIdError, InputShapeMismatchError
+
+
+def check_sparse_input(patient_df: pd.DataFrame, code_matrix: sp.spmatrix, code_names: list):
+    """
+    checks that the sparse code matrix is aligned with patient_df and code_names and converts it to CSC format
+
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of code_matrix
+    :param code_matrix: scipy.sparse matrix
+        sparse matrix of code counts with one row per patient and one column per code
+    :param code_names: list - list of strings
+        list of names of the codes (columns of code_matrix) with corresponding dimension name as prefix - examples:
+        'DimensionName1_ICDcodeName1', 'DimensionName2_OPScodeName1'
+    :return code_matrix: scipy.sparse.csc_matrix
+        code_matrix in CSC format
+    """
+
+    if code_matrix.shape[0] != patient_df.shape[0]:
+        message = f"code_matrix has {code_matrix.shape[0]} rows but patient_df has {patient_df.shape[0]} rows"
+        raise InputShapeMismatchError(message=message)
+
+    if code_matrix.shape[1] != len(code_names):
+        message = f"code_matrix has {code_matrix.shape[1]} columns but {len(code_names)} code names are given"
+        raise InputShapeMismatchError(message=message)
+
+    return sp.csc_matrix(code_matrix)
+
+
+def get_sparse_prevalence_count(code_matrix: sp.csc_matrix):
+    """
+    calculates the prevalence count (number of non-zero entries) of every column of a CSC matrix without densifying
+
+    :param code_matrix: scipy.sparse.csc_matrix
+        sparse matrix of code counts with one row per patient and one column per code
+    :return prev_count: numpy.ndarray
+        number of non-zero entries of each column (explicitly stored zeros are not counted)
+    """
+
+    non_zero = (code_matrix.data != 0).astype(np.int64)
+    # cumulative sum over the stored entries, differences at the column boundaries give the per column counts
+    cumulative = np.concatenate([[0], np.cumsum(non_zero)])
+    prev_count = cumulative[code_matrix.indptr[1:]] - cumulative[code_matrix.indptr[:-1]]
+
+    return prev_count
+
+
+def sparse_input_data_validation(patient_df: pd.DataFrame, code_matrix: sp.spmatrix, code_names: list,
+                                 treatment: str, outcome: str):
+    """
+    performs validation of the sparse input. Removes invalid code columns.
+
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of code_matrix
+    :param code_matrix: scipy.sparse matrix
+        sparse matrix of code counts with one row per patient and one column per code
+    :param code_names: list - list of strings
+        list of names of the codes (columns of code_matrix) with corresponding dimension name as prefix
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :return code_matrix: scipy.sparse.csc_matrix
+        updated code_matrix where invalid code columns are removed
+    :return code_names: list - list of strings
+        updated code_names where invalid code columns are removed
+    """
+
+    code_matrix = check_sparse_input(patient_df=patient_df, code_matrix=code_matrix, code_names=code_names)
+
+    validate_binary_columns(input_df=patient_df, columns=[treatment, outcome])
+
+    # check for zero entry presence and at least one non-zero entry presence
+    prev_count = get_sparse_prevalence_count(code_matrix)
+    valid = (prev_count > 0) & (prev_count < code_matrix.shape[0])
+
+    code_names = list(code_names)
+    if not valid.all():
+        log_invalid_code_columns([name for name, is_valid in zip(code_names, valid) if not is_valid])
+
+        code_matrix = code_matrix[:, np.flatnonzero(valid)]
+        code_names = [name for name, is_valid in zip(code_names, valid) if is_valid]
+
+    return code_matrix, code_names
+
+
+def sparse_step_identify_candidate_empirical_covariates(code_matrix: sp.spmatrix, code_names: list, pid: np.ndarray,
+                                                        dimension_prefixes: list, n: int, m: int = 1):
+    """
+    performs selection of top n prevalent code column for each dimension on a sparse code matrix
+
+    :param code_matrix: scipy.sparse matrix
+        sparse matrix of code counts with one row per patient and one column per code
+    :param code_names: list - list of strings
+        list of names of the codes (columns of code_matrix) with corresponding dimension name as prefix
+    :param pid: numpy.ndarray
+        patient ids, aligned with the rows of code_matrix
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param n: int
+        number of prevanlent codes to be retained in each dimension. top n of prevalent codes are selected in each
+        dimension and rest are ignored
+    :param m: int
+        if code occur for >= m patients, that particular code is selected else dropped in each dimension. Default value
+         for m is 1. note: m =100 as per [1] and m =1 as per [2].
+    :return selected_columns: list - list of strings
+        list of selected code names. for each dimension top n prevalent codes are selected.
+    """
+
+    # check for duplicates
+    if np.unique(pid).shape[0] != np.asarray(pid).shape[0]:
+        raise DuplicateIdError('Duplicates in PID column')
+
+    # calculating total study population count
+    total_sp_count = code_matrix.shape[0]
+
+    prev_count = get_sparse_prevalence_count(sp.csc_matrix(code_matrix))
+    column_index = ColumnIndex(col_names=code_names, dimension_prefixes=dimension_prefixes)
+
+    selected_columns = []
+    for dim_name in dimension_prefixes:
+
+        # getting column positions for the particular dimension
+        dim_positions = column_index.dimension_positions(dim_name)
+        dim_cols = column_index.dimension_columns(dim_name)
+
+        selected_columns.extend(select_dimension_codes(dim_name=dim_name, dim_cols=dim_cols,
+                                                       prev_count=prev_count[dim_positions],
+                                                       total_sp_count=total_sp_count, n=n, m=m))
+
+    return selected_columns
+
+
+def sparse_step_assess_recurrence(code_matrix: sp.spmatrix, code_names: list, selected_columns: list):
+    """
+    creates the _onetime, _median and _75p covariates of the selected codes as a sparse indicator matrix
+
+    :param code_matrix: scipy.sparse matrix
+        sparse matrix of code counts with one row per patient and one column per code
+    :param code_names: list - list of strings
+        list of names of the codes (columns of code_matrix) with corresponding dimension name as prefix
+    :param selected_columns: list - list of strings
+        list of selected code names. for each dimension top n prevalent codes are selected.
+    :return dim_covariates: scipy.sparse.csc_matrix
+        sparse 0/1 matrix with one row per patient and one column per covariate
+    :return covariate_names: list - list of strings
+        names of the columns of dim_covariates, with suffixes _onetime, _median, _75p. the columns with _ontime,
+        _median, _75p are similar to _once, _sporadic, _frequent respectively in paper [1]
+    """
+
+    code_matrix = sp.csc_matrix(code_matrix)
+    position = {name: i for i, name in enumerate(code_names)}
+
+    covariate_names = []
+    covariate_rows = []
+    for cov in selected_columns:
+        j = position[cov]
+        values = code_matrix.data[code_matrix.indptr[j]:code_matrix.indptr[j + 1]]
+        rows = code_matrix.indices[code_matrix.indptr[j]:code_matrix.indptr[j + 1]]
+        non_zero_values = values[values != 0]
+
+        # median and third quartile are calculated excluding 0s, see step_assess_recurrence
+        median = np.median(non_zero_values)
+        p_75 = np.percentile(non_zero_values, 75)
+        min_value = non_zero_values.min()
+
+        covariate_names.append(cov + '_onetime')
+        covariate_rows.append(rows[values > 0])
+        if median > min_value:
+            covariate_names.append(cov + '_median')
+            covariate_rows.append(rows[values >= median])
+        if (p_75 > min_value) and (median != p_75):
+            covariate_names.append(cov + '_75p')
+            covariate_rows.append(rows[values >= p_75])
+
+    indptr = np.concatenate([[0], np.cumsum([len(rows) for rows in covariate_rows])]).astype(np.int64)
+    indices = np.concatenate(covariate_rows) if covariate_rows else np.array([], dtype=np.int64)
+    dim_covariates = sp.csc_matrix((np.ones(indices.shape[0], dtype=COVARIATE_DTYPE), indices, indptr),
+                                   shape=(code_matrix.shape[0], len(covariate_names)))
+    dim_covariates.sort_indices()
+
+    return dim_covariates, covariate_names
+
+
+def sparse_step_prioritize_select_covariates(dim_covariates: sp.spmatrix, covariate_names: list,
+                                             patient_df: pd.DataFrame, treatment: str, outcome: str, k: int,
+                                             not_code_columns: list):
+    """
+    calculates BiasMult of all covariates from sparse matrix products and selects the top k covariates. only the k
+    selected covariates are densified in output_df.
+
+    :param dim_covariates: scipy.sparse matrix
+        sparse 0/1 matrix with one row per patient and one column per covariate
+    :param covariate_names: list - list of strings
+        names of the columns of dim_covariates
+    :param patient_df: pandas.DataFrame
+        Data frame with one row per patient and mandatory columns - 'PID', outcome, treatment and other optional
+        columns of predefined and demographic columns. rows are aligned with the rows of dim_covariates
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param outcome: str
+        name of the column which have outcome values
+    :param k: int
+        number of final HDPS_covariates required. top k covariates are finally selected (considering all dimensions)
+    :param not_code_columns: list - list of strings
+        list of names of columns of patient_df to be kept in output_df
+    :return output_df: pandas.DataFrame
+        DataFrame with not_code_columns of patient_df and columns with HDPS covariates
+    :return rank_df: pandas.DataFrame
+        DataFrame with columns 'Covariates Name', 'abs_log_BiasMult' and 'Rank'
+    """
+
+    dim_covariates = sp.csc_matrix(dim_covariates)
+    treatment_values = np.asarray(patient_df[treatment], dtype=np.int64)
+    outcome_values = np.asarray(patient_df[outcome], dtype=np.int64)
+
+    # cell counts of the contingency tables of every covariate with treatment and outcome
+    cov_count = np.asarray(dim_covariates.sum(axis=0)).ravel()
+    cov_treated_count = dim_covariates.T.dot(treatment_values)
+    cov_outcome_count = dim_covariates.T.dot(outcome_values)
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+        k=k, covariate_names=covariate_names, cov_count=cov_count, cov_treated_count=cov_treated_count,
+        cov_outcome_count=cov_outcome_count, treated_count=treatment_values.sum(), outcome_count=outcome_values.sum(),
+        total_count=dim_covariates.shape[0])
+
+    # densifying only the k selected columns
+    position = {name: i for i, name in enumerate(covariate_names)}
+    sel_positions = [position[name] for name in sel_covariate_names]
+    dim_covariates_sel = pd.DataFrame(dim_covariates[:, sel_positions].toarray(), columns=sel_covariate_names,
+                                      index=patient_df.index)
+
+    # output df
+    output_df = pd.concat([patient_df[not_code_columns], dim_covariates_sel], axis=1)
+
+    return output_df, rank_df
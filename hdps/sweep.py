@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import logging
+from hdps.algorithm_steps import step_identify_candidate_empirical_covariates, get_recurrence_covariates, \
+    create_recurrence_covariates, count_covariate_cells, compute_bias_mult, select_top_k_covariates, \
+    validate_binary_columns, process_outcome, log_invalid_code_columns
+from hdps.column_index import ColumnIndex
+from hdps.column_statistics import get_column_statistics
+
+
+def hdps_sweep(input_df: pd.DataFrame, n_values: list, k_values: list, outcome: str, treatment: str,
+               dimension_prefixes: list, m_values: list = (1,), thresholds: list = ('75p',),
+               outcome_cont: bool = False):
+    """
+    performs HDPS implementation for every combination of n, k, m and threshold in one call. the column statistics
+    (prevalence and recurrence thresholds) are calculated once, the recurrence covariates once for the union of the
+    codes selected with the largest n, and the cell counts for BiasMult once for all outcome binarizations. every
+    combination is then a selection of its covariates and of their top k. the rank_df of every combination is
+    identical to the rank_df of hdps_implementation with the same parameters.
+
+    :param input_df: pandas.DataFrame
+        Data frame with mandatory columns - 'PID', outcome, treatment, codes (like ICD, OPS) with corresponding
+        dimension name as prefix and other optional columns of predefined and demographic columns, see
+        hdps_implementation. input_df is not changed
+    :param n_values: list - list of int
+        values of n, see hdps_implementation
+    :param k_values: list - list of int
+        values of k, see hdps_implementation
+    :param outcome: str
+        name of the column which have outcome values
+    :param treatment: str
+        name of the column which have treatment(exposure) values. This column has to be a binary column
+    :param dimension_prefixes: list - list of strings
+        list of name of the dimensions.
+    :param m_values: list - list of int
+        values of m, see hdps_implementation. Default value: (1,)
+    :param thresholds: list
+        values of threshold for a continuous outcome, see hdps_implementation. Default value: ('75p',)
+    :param outcome_cont: bool
+        True if outcome is continous and False if outcome is binary. Default value: False
+    :return rank_dfs: dict
+        rank_df (see hdps_implementation) for each (n, k, m, threshold) tuple. threshold is None if outcome_cont is
+        False
+    """
+
+    column_index = ColumnIndex(col_names=input_df.columns, dimension_prefixes=dimension_prefixes)
+    not_code_columns = column_index.not_code_columns
+    code_columns = column_index.code_columns
+    thresholds = list(thresholds) if outcome_cont else [None]
+
+    # binary outcome of every threshold, one row per threshold
+    if outcome_cont:
+        outcome_values = process_outcome(input_df=input_df, outcome=outcome, threshold=thresholds)
+    else:
+        outcome_values = input_df[outcome].to_numpy(dtype=np.int64)[np.newaxis]
+    validate_binary_columns(input_df=input_df, columns=[treatment])
+    for values in outcome_values:
+        validate_binary_columns(input_df=pd.DataFrame({outcome: values}), columns=[outcome])
+
+    # prevalence, validity and recurrence thresholds of all code columns in one sweep
+    column_statistics = get_column_statistics(input_df=input_df, code_columns=code_columns)
+    valid = column_statistics.valid
+    log_invalid_code_columns([col for col, is_valid in zip(code_columns, valid) if not is_valid])
+    if not valid.all():
+        column_index = column_index.restrict(
+            col_names=not_code_columns + [col for col, is_valid in zip(code_columns, valid) if is_valid])
+
+    # selected codes of every (n, m), the selection of a smaller n is a part of the selection of the largest n
+    selected = {(n, m): step_identify_candidate_empirical_covariates(
+        input_df=input_df, dimension_prefixes=dimension_prefixes, n=n, m=m, column_statistics=column_statistics,
+        column_index=column_index) for n in n_values for m in m_values}
+    union_columns = list(dict.fromkeys(col for selected_columns in selected.values() for col in selected_columns))
+
+    # recurrence covariates of all selected codes, created once
+    median, p_75, min_value = column_statistics.recurrence_thresholds(union_columns)
+    recurrence_covariates = get_recurrence_covariates(selected_columns=union_columns, median=median, p_75=p_75,
+                                                      min_value=min_value)
+    dim_covariates = create_recurrence_covariates(input_df=input_df, recurrence_covariates=recurrence_covariates)
+    logging.info('Number of recurrence covariates of the sweep: ' + str(recurrence_covariates.shape[0]))
+
+    # cell counts of all covariates, the outcome counts for all binarizations at once
+    covariate_block = dim_covariates.to_numpy()
+    treatment_values = input_df[treatment].to_numpy(dtype=np.int64)
+    cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(covariate_block=covariate_block,
+                                                                            treatment_values=treatment_values,
+                                                                            outcome_values=outcome_values)
+
+    cov_bias_mult_dfs = [compute_bias_mult(covariate_names=list(recurrence_covariates['Covariates Name']),
+                                           cov_count=cov_count, cov_treated_count=cov_treated_count,
+                                           cov_outcome_count=cov_outcome_count[i],
+                                           treated_count=treatment_values.sum(), outcome_count=outcome_values[i].sum(),
+                                           total_count=input_df.shape[0])
+                         for i in range(len(thresholds))]
+
+    # positions of the covariates of each code, in the order of get_recurrence_covariates
+    code_rows = recurrence_covariates.groupby('code', sort=False).indices
+
+    rank_dfs = {}
+    for (n, m), selected_columns in selected.items():
+        rows = np.concatenate([code_rows[col] for col in selected_columns]) if len(selected_columns) > 0 \
+            else np.zeros(0, dtype=np.int64)
+        for threshold, cov_bias_mult_df in zip(thresholds, cov_bias_mult_dfs):
+            selected_cov_bias_mult_df = cov_bias_mult_df.iloc[rows].reset_index(drop=True)
+            for k in k_values:
+                _, rank_df = select_top_k_covariates(cov_bias_mult_df=selected_cov_bias_mult_df, k=k)
+                rank_dfs[(n, k, m, threshold)] = rank_df
+
+    return rank_dfs
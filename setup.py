@@ -6,4 +6,5 @@ setup(name='hdps',
       author='Vivek Ramalingam Kailasam ',
       author_email='Vivek.Kailasam@ingef.de',
       packages=['hdps'],
-      zip_safe=False, install_requires=['pandas', 'numpy', 'epydemiology'])
+      zip_safe=False, install_requires=['pandas', 'numpy', 'scipy', 'epydemiology'],
+      extras_require={'arrow': ['pyarrow'], 'polars': ['pyarrow', 'polars']})
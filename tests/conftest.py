@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def make_input_df():
+    """
+    factory of synthetic cohorts in the wide format of hdps_implementation - columns 'PID', 'treatment', 'outcome' and
+    n_codes Poisson code count columns per dimension
+
+    :param n_patients: int
+        number of patients. Default value: 500
+    :param n_codes: int
+        number of code columns per dimension. Default value: 20
+    :param dimension_prefixes: tuple - tuple of strings
+        names of the dimensions, the first code column is dimension_prefixes[0] + '_0'. Default value: ('ICD', 'ATC')
+    :param varied_prevalence: bool
+        True for a random prevalence between 0 and 0.6 per code, False for prevalence 0.4 of every code.
+        Default value: False
+    :param string_pids: bool
+        True for PIDs 'id_0', 'id_1', ..., False for integer PIDs. Default value: False
+    :param outcome_cont: bool
+        True for a continuous outcome, False for a binary outcome. both depend on the first code column.
+        Default value: True
+    :param seed: int
+        seed of the cohort. Default value: 0
+    """
+
+    def make(n_patients: int = 500, n_codes: int = 20, dimension_prefixes: tuple = ('ICD', 'ATC'),
+             varied_prevalence: bool = False, string_pids: bool = False, outcome_cont: bool = True, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        n_columns = n_codes * len(dimension_prefixes)
+        counts = rng.poisson(1.5, (n_patients, n_columns))
+        is_coded = rng.random((n_patients, n_columns)) < (rng.random(n_columns) * 0.6 if varied_prevalence else 0.4)
+        input_df = pd.DataFrame(counts * is_coded,
+                                columns=[f"{prefix}_{i}" for prefix in dimension_prefixes for i in range(n_codes)])
+
+        first_code = input_df.iloc[:, 0]
+        input_df.insert(0, "PID", [f"id_{i}" for i in range(n_patients)] if string_pids else np.arange(n_patients))
+        input_df.insert(1, "treatment", (rng.random(n_patients) < 0.4).astype(int))
+        if outcome_cont:
+            input_df.insert(2, "outcome", np.round(rng.gamma(2, 1, n_patients) + first_code, 1))
+        else:
+            input_df.insert(2, "outcome", (rng.random(n_patients) < 0.3 + 0.05 * first_code.clip(0, 4)).astype(int))
+        return input_df
+
+    return make
@@ -1,3 +1,4 @@
+import pytest
 from hdps.algorithm_steps import *
 
 id_column = "PID"
@@ -61,3 +62,149 @@ def test_step_prioritize_select_covariates():
     assert rank_df.loc[1]["Covariates Name"] == "ICD_2_onetime"
     assert rank_df.loc[1]["Rank"] == 2
 
+
+def test_score_covariates():
+    df = input_df[[id_column, "treatment", "outcome", *selected_columns]]
+    dim_cov = step_assess_recurrence(df, selected_columns)
+    cov_bias_mult_df = score_covariates(dim_cov, df, "treatment", "outcome").set_index("Covariates Name")
+
+    for covariate in dim_cov.columns:
+        cont_tab = pd.crosstab(dim_cov[covariate], df["treatment"])
+        p_c0 = cont_tab.loc[1, 0] / cont_tab[0].sum()
+        p_c1 = cont_tab.loc[1, 1] / cont_tab[1].sum()
+        cont_tab_co = pd.crosstab(dim_cov[covariate], df["outcome"])
+        rrcd = (cont_tab_co.loc[1, 1] / cont_tab_co.loc[1, :].sum()) / \
+               (cont_tab_co.loc[0, 1] / cont_tab_co.loc[0, :].sum())
+        bias_mult = (p_c1 * (rrcd - 1) + 1) / (p_c0 * (rrcd - 1) + 1)
+
+        assert np.isclose(cov_bias_mult_df.loc[covariate, "BiasMult"], bias_mult, equal_nan=True)
+
+
+def test_select_top_k_from_cell_counts():
+    df = input_df[[id_column, "treatment", "outcome", *selected_columns]]
+    dim_cov = step_assess_recurrence(df, selected_columns)
+    cov_count, cov_treated_count, cov_outcome_count = count_covariate_cells(
+        dim_cov.to_numpy(), df["treatment"].to_numpy(), df["outcome"].to_numpy())
+
+    sel_covariate_names, rank_df = select_top_k_from_cell_counts(
+        3, list(dim_cov.columns), cov_count, cov_treated_count, cov_outcome_count, df["treatment"].sum(),
+        df["outcome"].sum(), df.shape[0])
+    expected_names, expected_rank_df = select_top_k_covariates(score_covariates(dim_cov, df, "treatment", "outcome"), 3)
+
+    assert sel_covariate_names == expected_names and rank_df.equals(expected_rank_df)
+    recurrence_covariates = get_recurrence_covariates(selected_columns, *compute_recurrence_thresholds(
+        df[selected_columns].to_numpy()))
+    assert list(select_recurrence_covariates(recurrence_covariates, sel_covariate_names)["Covariates Name"]) == \
+        sel_covariate_names
+
+
+def test_compute_recurrence_thresholds():
+    code_block = input_df[["ICD_1", "ICD_2", "ICD_3", "ICD_4", "ICD_5", "ATC_3", "ATC_5"]].to_numpy()
+    median, p_75, min_value = compute_recurrence_thresholds(code_block)
+
+    for j in range(code_block.shape[1]):
+        non_zero_values = code_block[code_block[:, j] != 0, j]
+        if non_zero_values.shape[0] == 0:
+            assert np.isnan(median[j]) and np.isnan(p_75[j]) and np.isnan(min_value[j])
+            continue
+        assert median[j] == np.median(non_zero_values)
+        assert p_75[j] == np.percentile(non_zero_values, 75)
+        assert min_value[j] == non_zero_values.min()
+
+
+def test_assess_recurrence_batch_size():
+    df = input_df[[id_column, "treatment", "outcome", *selected_columns]]
+
+    assert step_assess_recurrence(df, selected_columns, batch_size=1).equals(
+        step_assess_recurrence(df, selected_columns))
+
+
+def test_assess_recurrence_no_selected_columns():
+    dim_covariates = step_assess_recurrence(input_df[[id_column, "treatment", "outcome"]], [])
+
+    assert dim_covariates.shape == (input_df.shape[0], 0)
+    assert dim_covariates.index.equals(input_df.index)
+
+
+def test_step_identify_candidate_empirical_covariates_n_jobs():
+    df = input_data_validation(
+        input_df=input_df, treatment="treatment", outcome="outcome", not_code_columns=non_code_cols)
+
+    assert get_prevalence_count(input_df, col_names[3:], batch_size=2, n_jobs=4).tolist() == \
+        np.count_nonzero(input_df[col_names[3:]], axis=0).tolist()
+    assert step_identify_candidate_empirical_covariates(df, dimension_prefixes, n=3, n_jobs=-1) == \
+        step_identify_candidate_empirical_covariates(df, dimension_prefixes, n=3)
+
+    dim_cols_list = [["ICD_1", "ICD_2", "ICD_3", "ICD_4", "ICD_5"], [], ["ATC_1", "ATC_2", "ATC_3"]]
+    dim_prev_counts = get_dimension_prevalence_counts(input_df, dim_cols_list, batch_size=2, n_jobs=3)
+    for dim_cols, prev_count in zip(dim_cols_list, dim_prev_counts):
+        assert prev_count.tolist() == np.count_nonzero(input_df[dim_cols], axis=0).tolist()
+    assert select_dimensions_codes(["ICD", "OPS", "ATC"], dim_cols_list, dim_prev_counts, input_df.shape[0], n=2,
+                                   n_jobs=3) == \
+        select_dimensions_codes(["ICD", "OPS", "ATC"], dim_cols_list, dim_prev_counts, input_df.shape[0], n=2)
+
+
+def test_step_prioritize_select_covariates_n_jobs():
+    rng = np.random.default_rng(0)
+    dim_cov = pd.DataFrame((rng.random((200, 60)) < 0.3).astype(np.int64), columns=[f"cov_{i}" for i in range(60)])
+    # identical covariates have equal abs_log_BiasMult, ties keep the order of the columns
+    dim_cov[["cov_40", "cov_50"]] = dim_cov[["cov_10", "cov_10"]].to_numpy()
+    df = pd.DataFrame({"PID": np.arange(200), "treatment": rng.integers(0, 2, 200), "outcome": rng.integers(0, 2, 200)})
+
+    output_df, rank_df = step_prioritize_select_covariates(dim_cov, df, "treatment", "outcome", 25, non_code_cols)
+    for n_jobs in [2, 3]:
+        parallel_output_df, parallel_rank_df = step_prioritize_select_covariates(dim_cov, df, "treatment", "outcome",
+                                                                                 25, non_code_cols, n_jobs=n_jobs)
+        assert parallel_rank_df.equals(rank_df)
+        assert parallel_output_df.equals(output_df)
+
+
+def test_input_data_validation_without_copy():
+    valid = get_valid_code_column_mask(input_df, col_names[3:], batch_size=4)
+    df = input_data_validation(input_df, "treatment", "outcome", non_code_cols, drop_invalid=False)
+
+    # ICD_4 has only zeros, ATC_2 and ATC_4 have no zeros
+    assert [col for col, is_valid in zip(col_names[3:], valid) if not is_valid] == ["ICD_4", "ATC_2", "ATC_4"]
+    assert df is input_df
+    assert list(input_data_validation(input_df, "treatment", "outcome", non_code_cols).columns) == \
+        non_code_cols + [col for col, is_valid in zip(col_names[3:], valid) if is_valid]
+
+
+def test_select_top_positions():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, 500).astype(np.float64)
+    values[rng.random(500) < 0.1] = np.nan
+    tie_values = rng.integers(0, 5, 500)
+
+    for n in [0, 1, 7, 100, 480, 500, 600]:
+        expected = pd.Series(values).sort_values(ascending=False, kind='stable').index[:n]
+        assert (select_top_positions(values, n) == expected).all()
+        expected = pd.DataFrame({"value": values, "tie": tie_values}).sort_values(
+            by=["value", "tie"], ascending=False, kind='stable', na_position='last').index[:n]
+        assert (select_top_positions(values, n, tie_values=tie_values) == expected).all()
+
+
+def test_select_dimension_codes_ties():
+    dim_cols = [f"ICD_{i}" for i in range(8)]
+    # symmetric counts with total 100: 10, 30, 30, 30, 10, 0, 30, 20, ICD_2, ICD_3 and ICD_6 have prevalence 70
+    prev_count = np.array([10, 30, 70, 70, 90, 0, 70, 20])
+
+    assert select_dimension_codes("ICD", dim_cols, prev_count, 100, n=4) == ["ICD_2", "ICD_3", "ICD_6", "ICD_1"]
+    assert select_dimension_codes("ICD", dim_cols, prev_count, 100, n=10, m=20) == \
+        ["ICD_2", "ICD_3", "ICD_6", "ICD_1", "ICD_7", "ICD_4"]
+
+
+def test_process_outcome_thresholds():
+    outcome_df = pd.DataFrame({"outcome": np.round(np.random.default_rng(3).gamma(2, 1, 101), 1)})
+    thresholds = ['75p', 'median', 2, 1.5]
+
+    converted_outcome = process_outcome(outcome_df, "outcome", thresholds)
+
+    assert converted_outcome.shape == (4, 101)
+    for row, threshold in zip(converted_outcome, thresholds):
+        assert np.array_equal(row, process_outcome(outcome_df, "outcome", threshold))
+
+    with pytest.raises(ConvertedOutcomeNotBinaryError):
+        process_outcome(outcome_df, "outcome", ['median', 100])
+    with pytest.raises(InvalidThresholdValueError):
+        process_outcome(outcome_df, "outcome", ['mean'])
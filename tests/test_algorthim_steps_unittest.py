@@ -382,7 +382,7 @@ class TestCalc(unittest.TestCase):
             "OPS_05_onetime": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0],
         }
 
-        expected_output_df7 = pd.DataFrame(data=expected_out_dict7)
+        expected_output_df7 = pd.DataFrame(data=expected_out_dict7, dtype=np.uint8)
         output_df7 = step_assess_recurrence(input_df=data_df7, selected_columns=selected_columns)
 
         assert expected_output_df7.equals(output_df7)
@@ -428,7 +428,7 @@ class TestCalc(unittest.TestCase):
             "OPS_05_median": [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
         }
 
-        expected_output_df8 = pd.DataFrame(data=expected_out_dict8)
+        expected_output_df8 = pd.DataFrame(data=expected_out_dict8, dtype=np.uint8)
         output_df8 = step_assess_recurrence(input_df=data_df8, selected_columns=selected_columns)
 
         assert expected_output_df8.equals(output_df8)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from hdps import hdps_implementation, hdps_arrow_implementation, RunReport
+from hdps.algorithm_steps import compute_recurrence_thresholds
+from hdps.arrow_steps import arrow_compute_recurrence_thresholds
+
+pa = pytest.importorskip("pyarrow")
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+@pytest.fixture
+def input_df(make_input_df):
+    input_df = make_input_df(n_patients=400, varied_prevalence=True)
+    # an invalid code column without non-zero values
+    input_df["ATC_19"] = 0
+    return input_df
+
+
+def test_arrow_compute_recurrence_thresholds(input_df):
+    code_columns = list(input_df.columns[3:])
+
+    thresholds = arrow_compute_recurrence_thresholds(pa.Table.from_pandas(input_df), code_columns, n_jobs=2)
+    for values, expected in zip(thresholds, compute_recurrence_thresholds(input_df[code_columns].to_numpy())):
+        assert np.array_equal(values, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize("outcome_cont", [False, True])
+def test_hdps_arrow_implementation(outcome_cont, input_df):
+    if not outcome_cont:
+        input_df["outcome"] = (input_df["outcome"] > 3).astype(int)
+
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 8, 20, "outcome", "treatment",
+                                                        dimension_prefixes, m=5, outcome_cont=outcome_cont)
+
+    output_df, rank_df = hdps_arrow_implementation(input_df, 8, 20, "outcome", "treatment", dimension_prefixes, m=5,
+                                                   outcome_cont=outcome_cont, n_jobs=2)
+    assert rank_df.equals(expected_rank_df)
+    assert output_df.equals(expected_df)
+
+    # an Arrow table is processed by the Arrow backend and the output is an Arrow table
+    table = pa.Table.from_pandas(input_df, preserve_index=False)
+    output_table, rank_df = hdps_implementation(table, 8, 20, "outcome", "treatment", dimension_prefixes, m=5,
+                                                outcome_cont=outcome_cont)
+    assert isinstance(output_table, pa.Table)
+    assert rank_df.equals(expected_rank_df)
+    assert output_table.to_pandas().equals(expected_df)
+
+
+def test_hdps_implementation_arrow_report_ignored(caplog, input_df):
+    table = pa.Table.from_pandas(input_df, preserve_index=False)
+    report = RunReport()
+
+    hdps_implementation(table, 8, 20, "outcome", "treatment", dimension_prefixes, outcome_cont=True, report=report)
+    assert "cache and report are not supported" in caplog.text
+    assert report.to_frame().shape[0] == 0
+
+
+def test_hdps_polars_implementation(input_df):
+    pl = pytest.importorskip("polars")
+
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 8, 20, "outcome", "treatment",
+                                                        dimension_prefixes, outcome_cont=True)
+    output_df, rank_df = hdps_implementation(pl.from_pandas(input_df), 8, 20, "outcome", "treatment",
+                                             dimension_prefixes, outcome_cont=True)
+    assert isinstance(output_df, pl.DataFrame)
+    assert rank_df.equals(expected_rank_df)
+    assert output_df.columns == list(expected_df.columns)
+    assert np.array_equal(output_df.to_numpy(), expected_df.to_numpy())
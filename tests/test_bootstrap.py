@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from hdps import bootstrap_covariate_ranks
+from hdps.algorithm_steps import step_assess_recurrence, score_covariates, select_top_k_covariates
+from hdps.bootstrap import bootstrap_ranks_block, rank_covariates
+
+
+@pytest.fixture
+def input_df(make_input_df):
+    return make_input_df(n_patients=300, n_codes=12, dimension_prefixes=("ICD",), varied_prevalence=True,
+                         outcome_cont=False)
+
+
+@pytest.fixture
+def dim_covariates(input_df):
+    return step_assess_recurrence(input_df, [f"ICD_{i}" for i in range(12)])
+
+
+def test_bootstrap_covariate_ranks(input_df, dim_covariates):
+
+    stability_df, rank_samples = bootstrap_covariate_ranks(dim_covariates, input_df, "treatment", "outcome", k=5,
+                                                           n_bootstrap=20, seed=1)
+    stability_df_parallel, rank_samples_parallel = bootstrap_covariate_ranks(
+        dim_covariates, input_df, "treatment", "outcome", k=5, n_bootstrap=20, seed=1, n_jobs=2)
+
+    assert rank_samples.shape == (20, dim_covariates.shape[1])
+    assert rank_samples.equals(rank_samples_parallel)
+    assert stability_df.equals(stability_df_parallel)
+    assert ((stability_df['selection_frequency'] >= 0) & (stability_df['selection_frequency'] <= 1)).all()
+
+    # rank on all patients as select_top_k_covariates
+    cov_bias_mult_df = score_covariates(dim_covariates, input_df, "treatment", "outcome")
+    _, rank_df = select_top_k_covariates(cov_bias_mult_df, k=dim_covariates.shape[1])
+    expected_rank = rank_df.set_index('Covariates Name')['Rank'].loc[stability_df['Covariates Name']].to_numpy()
+    assert (stability_df['Rank'].to_numpy() == expected_rank).all()
+
+
+def test_bootstrap_replicate_is_resample(input_df, dim_covariates):
+    seeds = np.random.SeedSequence(3).spawn(2)
+
+    ranks = bootstrap_ranks_block(dim_covariates.to_numpy(np.float64).T, input_df["treatment"].to_numpy(np.float64),
+                                  input_df["outcome"].to_numpy(np.float64), seeds)
+
+    for seed, replicate_ranks in zip(seeds, ranks):
+        n_patients = input_df.shape[0]
+        weights = np.random.default_rng(seed).multinomial(n_patients, np.full(n_patients, 1 / n_patients))
+        rows = np.repeat(np.arange(input_df.shape[0]), weights)
+        cov_bias_mult_df = score_covariates(dim_covariates.iloc[rows].reset_index(drop=True),
+                                            input_df.iloc[rows].reset_index(drop=True), "treatment", "outcome")
+        assert (replicate_ranks == rank_covariates(cov_bias_mult_df['abs_log_BiasMult'].to_numpy())).all()
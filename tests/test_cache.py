@@ -0,0 +1,70 @@
+import numpy as np
+from hdps import hdps_implementation
+from hdps.cache import StepCache, fingerprint_dataframe
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+def test_fingerprint_dataframe(make_input_df):
+    input_df = make_input_df(n_patients=300, n_codes=15, outcome_cont=False)
+    changed_df = input_df.copy()
+    changed_df.loc[5, "ICD_3"] += 1
+
+    assert fingerprint_dataframe(input_df) == fingerprint_dataframe(input_df.copy())
+    assert fingerprint_dataframe(input_df) != fingerprint_dataframe(changed_df)
+
+
+def test_hdps_implementation_cache(tmp_path, make_input_df):
+    input_df = make_input_df(n_patients=300, n_codes=15, outcome_cont=False)
+    cache = StepCache(path=str(tmp_path))
+
+    for n, k in [(5, 10), (5, 4), (3, 4), (5, 10)]:
+        output_df, rank_df = hdps_implementation(input_df.copy(), n, k, "outcome", "treatment", dimension_prefixes,
+                                                 cache=cache)
+        expected_df, expected_rank_df = hdps_implementation(input_df.copy(), n, k, "outcome", "treatment",
+                                                            dimension_prefixes)
+        assert output_df.equals(expected_df)
+        assert rank_df.equals(expected_rank_df)
+
+    # column statistics are computed once, cell counts once for n=5 and once for n=3
+    assert cache.misses == 3 and cache.hits == 5
+
+    disk_cache = StepCache(path=str(tmp_path))
+    hdps_implementation(input_df.copy(), 3, 4, "outcome", "treatment", dimension_prefixes, cache=disk_cache)
+    assert disk_cache.misses == 0
+
+
+def test_cache_eviction():
+    cache = StepCache(max_size=3000)
+    for i in range(5):
+        cache.set(str(i), np.zeros(100))
+
+    assert [cache.get(str(i)) is not None for i in range(5)] == [False, False, True, True, True]
+
+    cache.clear()
+    cache.set("5", np.zeros(300))
+    assert cache.get("5") is not None
+
+
+def test_cache_none_value():
+    cache = StepCache()
+    calls = []
+
+    for _ in range(2):
+        assert cache.get_or_compute("key", lambda: calls.append(1)) is None
+    assert len(calls) == 1 and cache.hits == 1
+    assert cache.get("missing", default=0) == 0
+
+
+def test_hdps_implementation_cache_fingerprint(make_input_df):
+    input_df = make_input_df(n_patients=300, n_codes=15, outcome_cont=False)
+    cache = StepCache()
+
+    hdps_implementation(input_df.copy(), 5, 10, "outcome", "treatment", dimension_prefixes, cache=cache,
+                        fingerprint="cohort-v1")
+    output_df, rank_df = hdps_implementation(input_df.copy(), 5, 4, "outcome", "treatment", dimension_prefixes,
+                                             cache=cache, fingerprint="cohort-v1")
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 5, 4, "outcome", "treatment",
+                                                        dimension_prefixes)
+
+    assert cache.hits == 2 and output_df.equals(expected_df) and rank_df.equals(expected_rank_df)
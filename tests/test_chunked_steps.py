@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from hdps import hdps_implementation, hdps_chunked_implementation
+from hdps.chunked_steps import read_csv_chunks, read_parquet_row_groups, write_output_chunks, \
+    get_outcome_threshold_value, append_pid_hashes, find_duplicate_hashes
+from hdps.exceptions import DuplicateIdError
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+@pytest.mark.parametrize("outcome_cont", [False, True])
+def test_hdps_chunked_implementation_csv(tmp_path, outcome_cont, make_input_df):
+    input_df = make_input_df(string_pids=True)
+    if not outcome_cont:
+        input_df["outcome"] = (input_df["outcome"] > 3).astype(int)
+    input_df.to_csv(tmp_path / "input.csv", index=False)
+
+    output_chunks, rank_df = hdps_chunked_implementation(read_csv_chunks(str(tmp_path / "input.csv"), chunksize=70),
+                                                         5, 10, "outcome", "treatment", dimension_prefixes,
+                                                         outcome_cont=outcome_cont)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 5, 10, "outcome", "treatment",
+                                                        dimension_prefixes, outcome_cont=outcome_cont)
+
+    assert rank_df.equals(expected_rank_df)
+    write_output_chunks(output_chunks, str(tmp_path / "output.csv"))
+    output_df = pd.read_csv(tmp_path / "output.csv")
+    assert np.array_equal(output_df.to_numpy(), expected_df.to_numpy())
+    assert list(output_df.columns) == list(expected_df.columns)
+
+
+def test_hdps_chunked_implementation_parquet(tmp_path, make_input_df):
+    pytest.importorskip("pyarrow")
+    input_df = make_input_df(string_pids=True)
+    input_df.to_parquet(tmp_path / "input.parquet", index=False, row_group_size=120)
+
+    output_chunks, rank_df = hdps_chunked_implementation(read_parquet_row_groups(str(tmp_path / "input.parquet")),
+                                                         5, 10, "outcome", "treatment", dimension_prefixes,
+                                                         outcome_cont=True)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 5, 10, "outcome", "treatment",
+                                                        dimension_prefixes, outcome_cont=True)
+
+    assert rank_df.equals(expected_rank_df)
+    write_output_chunks(output_chunks, str(tmp_path / "output.parquet"))
+    assert pd.read_parquet(tmp_path / "output.parquet").equals(expected_df)
+
+
+def test_get_outcome_threshold_value():
+    outcome = np.random.default_rng(1).poisson(4, 101).astype(float)
+    outcome_value_counts = pd.Series(outcome).value_counts()
+
+    assert get_outcome_threshold_value(outcome_value_counts, '75p') == np.percentile(outcome, 75)
+    assert get_outcome_threshold_value(outcome_value_counts[1:], 'median') == \
+        np.median(np.repeat(outcome_value_counts.index[1:], outcome_value_counts.to_numpy()[1:]))
+
+
+def test_chunked_duplicate_pid(tmp_path, make_input_df):
+    input_df = make_input_df(n_patients=100, string_pids=True)
+    input_df.loc[90, "PID"] = "id_3"
+    input_df.to_csv(tmp_path / "input.csv", index=False)
+
+    with pytest.raises(DuplicateIdError):
+        hdps_chunked_implementation(read_csv_chunks(str(tmp_path / "input.csv"), chunksize=30), 5, 10, "outcome",
+                                    "treatment", dimension_prefixes, outcome_cont=True)
+
+    output_chunks, rank_df = hdps_chunked_implementation(read_csv_chunks(str(tmp_path / "input.csv"), chunksize=30),
+                                                         5, 10, "outcome", "treatment", dimension_prefixes,
+                                                         outcome_cont=True, check_duplicates=False)
+    assert rank_df.shape[0] == 10
+
+
+def test_find_duplicate_hashes(tmp_path):
+    pids = np.array([f"id_{i}" for i in range(200)], dtype=object)
+    for chunk in [pids[:80], pids[80:], pids[150:160]]:
+        append_pid_hashes(chunk, str(tmp_path), n_buckets=5)
+
+    duplicate_hashes = find_duplicate_hashes(str(tmp_path), n_buckets=5)
+    assert np.array_equal(np.sort(duplicate_hashes), np.sort(pd.util.hash_array(pids[150:160])))
+
+
+def test_write_output_chunks_failure_closes_file(tmp_path, make_input_df):
+    pytest.importorskip("pyarrow")
+    input_df = make_input_df(n_patients=100)
+
+    def failing_chunks():
+        yield input_df.iloc[:50]
+        raise OSError("chunk source failed")
+
+    with pytest.raises(OSError):
+        write_output_chunks(failing_chunks(), str(tmp_path / "output.parquet"))
+    # the writer was closed, the row group written before the failure is readable
+    assert pd.read_parquet(tmp_path / "output.parquet").equals(input_df.iloc[:50])
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from hdps.algorithm_steps import get_non_code_cols, step_identify_candidate_empirical_covariates
+from hdps.column_index import ColumnIndex
+
+col_names = ["PID", "treatment", "outcome", "ICD_1", "ICD10_1", "ATC_1", "ICD_2", "ICD10_2", "age"]
+dimension_prefixes = ["ICD", "ATC", "ICD10"]
+
+
+def test_column_index():
+    column_index = ColumnIndex(col_names, dimension_prefixes)
+
+    assert column_index.not_code_columns == get_non_code_cols(col_names, dimension_prefixes)
+    assert column_index.code_columns == ["ICD_1", "ICD10_1", "ATC_1", "ICD_2", "ICD10_2"]
+    # overlapping prefixes - a column belongs to the dimension with the longest prefix only
+    assert column_index.dimension_columns("ICD") == ["ICD_1", "ICD_2"]
+    assert column_index.dimension_columns("ICD10") == ["ICD10_1", "ICD10_2"]
+    assert column_index.dimension_positions("ATC").tolist() == [5]
+
+
+def test_column_index_restrict():
+    column_index = ColumnIndex(col_names, dimension_prefixes)
+    restricted = column_index.restrict(["PID", "ICD10_2", "ATC_2", "ICD_1"])
+
+    assert restricted.dimension_columns("ICD") == ["ICD_1"]
+    assert restricted.dimension_columns("ICD10") == ["ICD10_2"]
+    assert restricted.dimension_columns("ATC") == ["ATC_2"]
+    assert restricted.not_code_columns == ["PID"]
+
+
+def test_identify_overlapping_prefixes():
+    rng = np.random.default_rng(0)
+    input_df = pd.DataFrame(rng.integers(0, 3, (20, len(col_names))), columns=col_names)
+    input_df["PID"] = np.arange(20)
+
+    selected_columns = step_identify_candidate_empirical_covariates(input_df, dimension_prefixes, n=5,
+                                                                    column_index=ColumnIndex(col_names,
+                                                                                             dimension_prefixes))
+
+    assert sorted(selected_columns) == ["ATC_1", "ICD10_1", "ICD10_2", "ICD_1", "ICD_2"]
+    assert selected_columns == step_identify_candidate_empirical_covariates(input_df, dimension_prefixes, n=5)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+from hdps.algorithm_steps import input_data_validation, step_identify_candidate_empirical_covariates, \
+    step_assess_recurrence
+from hdps.column_statistics import compute_column_statistics, get_column_statistics, histogram_value_counts, \
+    sorted_value_counts
+
+id_column = "PID"
+dimension_prefixes = ["ICD", "ATC", "OPS"]
+col_names = [id_column, "treatment", "outcome", "ICD_1", "ICD_2", "ICD_3", "ICD_4", "ICD_5",
+             "ATC_1", "ATC_2", "ATC_3", "ATC_4", "ATC_5"]
+input_df = pd.DataFrame([
+    ["id_1", 0, 0, 0, 1, 0, 0, 3, 1, 1, 1, 1, 0],
+    ["id_2", 0, 0, 0, 1, 1, 0, 1, 0, 1, 0, 1, 1],
+    ["id_3", 0, 1, 1, 0, 1, 0, 5, 1, 1, 3, 1, 2],
+    ["id_4", 0, 0, 1, 1, 1, 0, 2, 0, 1, 4, 1, 0],
+    ["id_5", 0, 1, 0, 1, 3, 0, 0, 1, 2, 4, 1, 2],
+    ["id_6", 1, 1, 1, 0, 5, 0, 2, 0, 2, 3, 1, 2],
+    ["id_7", 1, 0, 1, 0, 2, 0, 1, 0, 2, 1, 1, 1],
+    ["id_8", 1, 1, 4, 1, 4, 0, 1, 1, 1, 2, 1, 0],
+    ["id_9", 1, 1, 0, 1, 0, 0, 3, 1, 1, 2, 1, 1],
+    ["id_10", 1, 1, 1, 0, 0, 0, 2, 1, 1, 2, 1, 5]
+    ], columns=col_names)
+non_code_cols = [id_column, "treatment", "outcome"]
+code_columns = col_names[3:]
+
+
+def test_compute_column_statistics():
+    rng = np.random.default_rng(0)
+    code_block = rng.poisson(2, (200, 30)) * (rng.random((200, 30)) < 0.3)
+    code_block[:, 0] = 0
+    code_block[:, 1] = 1 + rng.poisson(1, 200)
+    column_statistics = compute_column_statistics(code_block)
+    median, p_75, min_value = column_statistics.recurrence_thresholds()
+
+    assert np.array_equal(column_statistics.prevalence_count, np.count_nonzero(code_block, axis=0))
+    assert not column_statistics.valid[0] and not column_statistics.valid[1] and column_statistics.valid[2:].all()
+    assert np.isnan(median[0]) and np.isnan(p_75[0]) and np.isnan(min_value[0])
+    for j in range(1, code_block.shape[1]):
+        non_zero_values = code_block[code_block[:, j] != 0, j]
+        assert median[j] == np.median(non_zero_values)
+        assert p_75[j] == np.percentile(non_zero_values, 75)
+        assert min_value[j] == non_zero_values.min()
+        assert np.array_equal(np.repeat(column_statistics.values[column_statistics.value_indptr[j]:
+                                                                 column_statistics.value_indptr[j + 1]],
+                                        column_statistics.value_counts[column_statistics.value_indptr[j]:
+                                                                       column_statistics.value_indptr[j + 1]]),
+                              np.sort(non_zero_values))
+
+
+def test_get_column_statistics_batches():
+    column_statistics = get_column_statistics(input_df, code_columns, batch_size=3)
+    expected = compute_column_statistics(input_df[code_columns].to_numpy(), code_columns)
+
+    assert column_statistics.columns == code_columns
+    assert column_statistics.to_frame().equals(expected.to_frame())
+
+
+def test_steps_with_column_statistics():
+    column_statistics = get_column_statistics(input_df, code_columns)
+
+    df = input_data_validation(input_df, "treatment", "outcome", non_code_cols, column_statistics=column_statistics)
+    assert df.equals(input_data_validation(input_df, "treatment", "outcome", non_code_cols))
+
+    sel_columns = step_identify_candidate_empirical_covariates(df, dimension_prefixes, n=3,
+                                                               column_statistics=column_statistics)
+    assert sel_columns == step_identify_candidate_empirical_covariates(df, dimension_prefixes, n=3)
+
+    dim_cov = step_assess_recurrence(df, sel_columns, column_statistics=column_statistics)
+    assert dim_cov.equals(step_assess_recurrence(df, sel_columns))
+
+
+def test_get_column_statistics_n_jobs():
+    column_statistics = get_column_statistics(input_df, code_columns, batch_size=2, n_jobs=3)
+
+    assert column_statistics.to_frame().equals(get_column_statistics(input_df, code_columns).to_frame())
+
+
+def test_histogram_value_counts():
+    rng = np.random.default_rng(2)
+    code_block = rng.poisson(3, (300, 12)) * (rng.random((300, 12)) < 0.5)
+    code_block[rng.random((300, 12)) < 0.02] = 1000
+    code_block[:, 3] = 0
+    code_block[:5, 4] = 70
+    non_zero = code_block.T != 0
+    values, group = code_block.T[non_zero], np.repeat(np.arange(12), non_zero.sum(axis=1))
+
+    expected = sorted_value_counts(values, group, non_zero.sum(axis=1))
+    for n_bins in [1, 4, 64, 2000]:
+        for result, expected_result in zip(histogram_value_counts(values, group, 12, n_bins=n_bins), expected):
+            assert np.array_equal(result, expected_result)
+
+    for dtype in [np.uint8, np.uint16, np.int32]:
+        column_statistics = compute_column_statistics(np.minimum(code_block, 250).astype(dtype))
+        expected = compute_column_statistics(np.minimum(code_block, 250).astype(np.float64))
+        assert column_statistics.values.dtype == dtype
+        assert column_statistics.to_frame().equals(expected.to_frame())
+        assert np.array_equal(column_statistics.value_counts, expected.value_counts)
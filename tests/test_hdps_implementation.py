@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
-from hdps import hdps_implementation
+import pytest
+from hdps import hdps_implementation, hdps_thresholds_implementation
+from hdps.exceptions import InvalidThresholdValueError
 
 id_column = "PID"
 n_selected_per_dimension = 3
@@ -28,4 +31,28 @@ def test_hdps_implementation():
     assert rank_df.loc[0]["Covariates Name"] == "ICD_3_75p"
     assert rank_df.loc[0]["Rank"] == 1
     assert rank_df.loc[1]["Covariates Name"] == "ICD_2_onetime"
-    assert rank_df.loc[1]["Rank"] == 2
\ No newline at end of file
+    assert rank_df.loc[1]["Rank"] == 2
+
+
+def test_hdps_implementation_thresholds():
+    rng = np.random.default_rng(4)
+    cont_df = pd.DataFrame(rng.poisson(1.5, (300, 20)) * (rng.random((300, 20)) < 0.4),
+                           columns=[f"ICD_{i}" for i in range(10)] + [f"ATC_{i}" for i in range(10)])
+    cont_df.insert(0, id_column, np.arange(300))
+    cont_df.insert(1, "treatment", (rng.random(300) < 0.4).astype(int))
+    cont_df.insert(2, "outcome", np.round(rng.gamma(2, 1, 300) + cont_df["ICD_0"], 1))
+    thresholds = ['75p', 'median', 3.0]
+
+    output_dfs, rank_dfs = hdps_thresholds_implementation(cont_df.copy(), 5, 8, "outcome", "treatment",
+                                                          dimension_prefixes, thresholds)
+
+    assert len(output_dfs) == len(rank_dfs) == 3
+    for output_df, rank_df, threshold in zip(output_dfs, rank_dfs, thresholds):
+        expected_df, expected_rank_df = hdps_implementation(cont_df.copy(), 5, 8, "outcome", "treatment",
+                                                            dimension_prefixes, threshold=threshold, outcome_cont=True)
+        assert rank_df.equals(expected_rank_df)
+        assert output_df.equals(expected_df)
+
+    with pytest.raises(InvalidThresholdValueError):
+        hdps_implementation(cont_df.copy(), 5, 8, "outcome", "treatment", dimension_prefixes, threshold=thresholds,
+                            outcome_cont=True)
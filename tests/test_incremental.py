@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from hdps import hdps_implementation, IncrementalHDPSModel
+from hdps.exceptions import ColumnNotBinaryError
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+@pytest.mark.parametrize("outcome_cont", [False, True])
+def test_partial_fit(outcome_cont, make_input_df):
+    input_df = make_input_df(n_patients=600, n_codes=15, varied_prevalence=True, string_pids=True)
+    if not outcome_cont:
+        input_df["outcome"] = (input_df["outcome"] > 3).astype(int)
+    model = IncrementalHDPSModel(5, 10, "outcome", "treatment", dimension_prefixes, outcome_cont=outcome_cont)
+
+    for start, stop in [(0, 150), (150, 400), (400, 600)]:
+        model.partial_fit(input_df.iloc[start:stop])
+        expected_df, expected_rank_df = hdps_implementation(input_df.iloc[:stop].copy(), 5, 10, "outcome",
+                                                            "treatment", dimension_prefixes, outcome_cont=outcome_cont)
+
+        assert model.rank_df.equals(expected_rank_df)
+        assert model.transform(input_df.iloc[:stop]).equals(expected_df)
+
+
+def test_new_codes_save_load(tmp_path, make_input_df):
+    input_df = make_input_df(n_patients=600, n_codes=15, varied_prevalence=True, string_pids=True)
+    first_batch = input_df.iloc[:300].drop(columns=["ICD_4"])
+    second_batch = input_df.iloc[300:].assign(ICD_15=lambda df: df["ICD_1"] + df["ICD_2"])
+
+    model = IncrementalHDPSModel(5, 10, "outcome", "treatment", dimension_prefixes, outcome_cont=True)
+    model.partial_fit(first_batch)
+    model.save(str(tmp_path / "model.npz"))
+    loaded = IncrementalHDPSModel.load(str(tmp_path / "model.npz"))
+    assert loaded.rank_df.equals(model.rank_df) and loaded.recurrence_covariates.equals(model.recurrence_covariates)
+    assert loaded.partial_statistics.cell_histogram.equals(model.partial_statistics.cell_histogram)
+
+    loaded.partial_fit(second_batch)
+    all_df = pd.concat([first_batch, second_batch], ignore_index=True).fillna(0)
+    all_df[["ICD_4", "ICD_15"]] = all_df[["ICD_4", "ICD_15"]].astype(int)
+    expected_rank_df = hdps_implementation(all_df, 5, 10, "outcome", "treatment", dimension_prefixes,
+                                           outcome_cont=True)[1]
+    assert loaded.rank_df.equals(expected_rank_df)
+    assert loaded.partial_statistics.n_rows == 600
+
+
+def test_partial_fit_failure_keeps_model(make_input_df):
+    input_df = make_input_df(n_patients=600, n_codes=15, varied_prevalence=True, string_pids=True)
+    model = IncrementalHDPSModel(5, 10, "outcome", "treatment", dimension_prefixes, outcome_cont=True)
+    model.partial_fit(input_df.iloc[:300])
+    rank_df = model.rank_df
+
+    with pytest.raises(ColumnNotBinaryError):
+        model.partial_fit(input_df.iloc[300:].assign(treatment=2))
+
+    assert model.rank_df is rank_df and model.partial_statistics.n_rows == 300
@@ -0,0 +1,45 @@
+import tracemalloc
+from hdps import hdps_implementation, RunReport, StepCache
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+def test_run_report(make_input_df):
+    input_df = make_input_df(n_patients=300, n_codes=15, varied_prevalence=True)
+    steps = []
+    report = RunReport(trace_memory=True, callback=lambda record: steps.append(record['step']))
+
+    output_df, rank_df = hdps_implementation(input_df.copy(), 5, 8, "outcome", "treatment", dimension_prefixes,
+                                             outcome_cont=True, report=report)
+    expected_output_df, expected_rank_df = hdps_implementation(input_df.copy(), 5, 8, "outcome", "treatment",
+                                                               dimension_prefixes, outcome_cont=True)
+
+    assert output_df.equals(expected_output_df) and rank_df.equals(expected_rank_df)
+    assert not tracemalloc.is_tracing()
+
+    report_df = report.to_frame().set_index('step')
+    assert steps == list(report_df.index) == ['process_outcome', 'get_column_statistics', 'input_data_validation',
+                                              'step_identify_candidate_empirical_covariates', 'step_assess_recurrence',
+                                              'step_prioritize_select_covariates']
+    assert (report_df['wall_time'] >= 0).all() and (report_df['cpu_time'] >= 0).all()
+    assert (report_df['peak_memory'] >= 0).all()
+    assert report_df.loc['get_column_statistics', 'input_columns'] == 30
+    assert report_df.loc['step_identify_candidate_empirical_covariates', 'candidates'] <= 10
+    assert report_df.loc['step_prioritize_select_covariates', 'covariates'] == \
+        report_df.loc['step_assess_recurrence', 'covariates']
+    assert report_df.loc['step_prioritize_select_covariates', 'selected_covariates'] == rank_df.shape[0]
+    assert report_df.loc['step_prioritize_select_covariates', 'output_columns'] == output_df.shape[1]
+
+
+def test_run_report_without_memory_with_cache(make_input_df):
+    input_df = make_input_df(n_patients=300, n_codes=15, varied_prevalence=True)
+    input_df["outcome"] = (input_df["outcome"] > 2).astype(int)
+    report = RunReport()
+
+    hdps_implementation(input_df, 5, 8, "outcome", "treatment", dimension_prefixes, cache=StepCache(), report=report)
+
+    report_df = report.to_frame()
+    assert 'peak_memory' not in report_df.columns
+    assert list(report_df['step']) == ['get_column_statistics', 'input_data_validation',
+                                       'step_identify_candidate_empirical_covariates',
+                                       'cached_step_prioritize_select_covariates']
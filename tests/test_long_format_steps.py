@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from hdps import hdps_implementation, hdps_long_implementation
+from hdps.algorithm_steps import step_assess_recurrence
+from hdps.long_format_steps import long_input_data_validation, long_step_identify_candidate_empirical_covariates, \
+    long_step_assess_recurrence
+
+id_column = "PID"
+dimension_prefixes = ["ICD", "ATC", "OPS"]
+col_names = [id_column, "treatment", "outcome", "ICD_1", "ICD_2", "ICD_3", "ICD_4", "ICD_5",
+             "ATC_1", "ATC_2", "ATC_3", "ATC_4", "ATC_5"]
+input_df = pd.DataFrame([
+    ["id_1", 0, 0, 0, 1, 0, 0, 3, 1, 1, 1, 1, 0],
+    ["id_2", 0, 0, 0, 1, 1, 0, 1, 0, 1, 0, 1, 1],
+    ["id_3", 0, 1, 1, 0, 1, 0, 5, 1, 1, 3, 1, 2],
+    ["id_4", 0, 0, 1, 1, 1, 0, 2, 0, 1, 4, 1, 0],
+    ["id_5", 0, 1, 0, 1, 3, 0, 0, 1, 2, 4, 1, 2],
+    ["id_6", 1, 1, 1, 0, 5, 0, 2, 0, 2, 3, 1, 2],
+    ["id_7", 1, 0, 1, 0, 2, 0, 1, 0, 2, 1, 1, 1],
+    ["id_8", 1, 1, 4, 1, 4, 0, 1, 1, 1, 2, 1, 0],
+    ["id_9", 1, 1, 0, 1, 0, 0, 3, 1, 1, 2, 1, 1],
+    ["id_10", 1, 1, 1, 0, 0, 0, 2, 1, 1, 2, 1, 5]
+    ], columns=col_names)
+patient_df = input_df[[id_column, "treatment", "outcome"]]
+
+long_df = input_df.melt(id_vars=[id_column], value_vars=col_names[3:], var_name="code_column", value_name="count")
+long_df[["dimension", "code"]] = long_df["code_column"].str.split("_", expand=True)
+long_df = long_df.loc[long_df["count"] != 0, [id_column, "dimension", "code", "count"]]
+# an event split over two rows, the counts of both rows are summed up
+long_df = pd.concat([long_df, pd.DataFrame([["id_6", "ICD", "3", 1]], columns=long_df.columns)], ignore_index=True)
+long_df.loc[(long_df[id_column] == "id_6") & (long_df["code"] == "3") & (long_df["count"] == 5), "count"] = 4
+
+
+def test_long_input_data_validation():
+    df = long_input_data_validation(long_df, patient_df, "treatment", "outcome")
+
+    # ICD_4 has no row, ATC_2 and ATC_4 have no zeros
+    assert set(df["code_name"]) == {"ICD_1", "ICD_2", "ICD_3", "ICD_5", "ATC_1", "ATC_3", "ATC_5"}
+    assert df.loc[(df[id_column] == "id_6") & (df["code_name"] == "ICD_3"), "count"].tolist() == [5]
+
+
+def test_long_steps():
+    df = long_input_data_validation(long_df, patient_df, "treatment", "outcome")
+    sel_columns = long_step_identify_candidate_empirical_covariates(df, patient_df, dimension_prefixes, n=3)
+
+    assert set(sel_columns) == {'ATC_1', 'ATC_3', 'ATC_5', 'ICD_2', 'ICD_3', 'ICD_1'}
+
+    dim_covariates, covariate_names = long_step_assess_recurrence(df, sel_columns)
+    dense_covariates = step_assess_recurrence(input_df, sel_columns)
+
+    assert covariate_names == list(dense_covariates.columns)
+    for name in covariate_names:
+        pids = set(dim_covariates.loc[dim_covariates["Covariates Name"] == name, id_column])
+        assert pids == set(input_df.loc[dense_covariates[name] == 1, id_column])
+
+
+def test_hdps_long_implementation():
+    df, rank_df = hdps_long_implementation(long_df, patient_df, 3, 2, "outcome", "treatment", dimension_prefixes)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 3, 2, "outcome", "treatment",
+                                                        dimension_prefixes)
+
+    assert rank_df.loc[0]["Covariates Name"] == "ICD_3_75p"
+    assert rank_df.loc[1]["Covariates Name"] == "ICD_2_onetime"
+    assert np.allclose(rank_df["abs_log_BiasMult"], expected_rank_df["abs_log_BiasMult"])
+    assert df.equals(expected_df)
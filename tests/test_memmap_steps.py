@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from hdps import hdps_implementation, hdps_memmap_implementation
+from hdps.memmap_steps import save_code_memmap, open_code_memmap
+from hdps.exceptions import InputShapeMismatchError
+
+id_column = "PID"
+dimension_prefixes = ["ICD", "ATC", "OPS"]
+col_names = [id_column, "treatment", "outcome", "ICD_1", "ICD_2", "ICD_3", "ICD_4", "ICD_5",
+             "ATC_1", "ATC_2", "ATC_3", "ATC_4", "ATC_5"]
+input_df = pd.DataFrame([
+    ["id_1", 0, 0, 0, 1, 0, 0, 3, 1, 1, 1, 1, 0],
+    ["id_2", 0, 0, 0, 1, 1, 0, 1, 0, 1, 0, 1, 1],
+    ["id_3", 0, 1, 1, 0, 1, 0, 5, 1, 1, 3, 1, 2],
+    ["id_4", 0, 0, 1, 1, 1, 0, 2, 0, 1, 4, 1, 0],
+    ["id_5", 0, 1, 0, 1, 3, 0, 0, 1, 2, 4, 1, 2],
+    ["id_6", 1, 1, 1, 0, 5, 0, 2, 0, 2, 3, 1, 2],
+    ["id_7", 1, 0, 1, 0, 2, 0, 1, 0, 2, 1, 1, 1],
+    ["id_8", 1, 1, 4, 1, 4, 0, 1, 1, 1, 2, 1, 0],
+    ["id_9", 1, 1, 0, 1, 0, 0, 3, 1, 1, 2, 1, 1],
+    ["id_10", 1, 1, 1, 0, 0, 0, 2, 1, 1, 2, 1, 5]
+    ], columns=col_names)
+patient_df = input_df[[id_column, "treatment", "outcome"]]
+
+
+def test_save_code_memmap(tmp_path):
+    save_code_memmap(input_df, dimension_prefixes, str(tmp_path), batch_size=4)
+    code_memmap = open_code_memmap(str(tmp_path))
+
+    assert isinstance(code_memmap.codes, np.memmap)
+    assert code_memmap.codes.dtype == np.uint8 and code_memmap.codes.flags.f_contiguous
+    assert code_memmap.code_names == col_names[3:]
+    assert np.array_equal(code_memmap.codes, input_df[col_names[3:]].to_numpy())
+    assert list(code_memmap.pid) == list(input_df[id_column])
+    assert np.array_equal(code_memmap.column_statistics.prevalence_count,
+                          np.count_nonzero(input_df[col_names[3:]], axis=0))
+
+
+def test_hdps_memmap_implementation(tmp_path):
+    code_memmap = save_code_memmap(input_df, dimension_prefixes, str(tmp_path))
+
+    df, rank_df = hdps_memmap_implementation(patient_df, code_memmap, 3, 4, "outcome", "treatment", dimension_prefixes)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 3, 4, "outcome", "treatment",
+                                                        dimension_prefixes)
+
+    assert rank_df.equals(expected_rank_df)
+    assert df.equals(expected_df)
+
+
+def test_memmap_pid_mismatch(tmp_path):
+    code_memmap = save_code_memmap(input_df, dimension_prefixes, str(tmp_path))
+
+    with pytest.raises(InputShapeMismatchError):
+        hdps_memmap_implementation(patient_df.iloc[::-1], code_memmap, 3, 4, "outcome", "treatment",
+                                   dimension_prefixes)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from hdps import hdps_implementation, HDPSModel, IncrementalHDPSModel
+from hdps.exceptions import ModelNotFittedError, InvalidThresholdValueError
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+def test_fit_transform(make_input_df):
+    input_df = make_input_df(n_patients=400, n_codes=15, string_pids=True)
+    model = HDPSModel(5, 10, "outcome", "treatment", dimension_prefixes, outcome_cont=True)
+
+    output_df = model.fit_transform(input_df)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 5, 10, "outcome", "treatment",
+                                                        dimension_prefixes, outcome_cont=True)
+
+    assert output_df.equals(expected_df)
+    assert model.rank_df.equals(expected_rank_df)
+    assert model.transform(input_df).equals(expected_df)
+    assert input_df["outcome"].equals(make_input_df(n_patients=400, n_codes=15, string_pids=True)["outcome"])
+
+
+def test_transform_new_cohort(tmp_path, make_input_df):
+    input_df = make_input_df(n_patients=400, n_codes=15, string_pids=True)
+    model = HDPSModel(5, 10, "outcome", "treatment", dimension_prefixes).fit(
+        input_df.assign(outcome=lambda df: (df["outcome"] > 3).astype(int)))
+    new_df = make_input_df(n_patients=50, n_codes=15, string_pids=True, seed=1).drop(columns=["outcome", "ATC_3"])
+
+    output_df = model.transform(new_df)
+    assert list(output_df.columns) == ["PID", "treatment"] + list(model.rank_df["Covariates Name"])
+    for _, row in model.recurrence_covariates.iterrows():
+        counts = new_df[row["code"]] if row["code"] in new_df.columns else pd.Series(0, index=new_df.index)
+        expected = counts > 0 if row["recurrence"] == "onetime" else counts >= row["threshold"]
+        assert output_df[row["Covariates Name"]].equals(expected.astype(np.uint8))
+
+    model.save(str(tmp_path / "model.npz"))
+    loaded_model = HDPSModel.load(str(tmp_path / "model.npz"))
+    assert loaded_model.rank_df.equals(model.rank_df)
+    assert loaded_model.recurrence_covariates.equals(model.recurrence_covariates)
+    assert loaded_model.transform(new_df).equals(output_df)
+
+
+def test_transform_not_fitted(make_input_df):
+    with pytest.raises(ModelNotFittedError):
+        HDPSModel(5, 10, "outcome", "treatment", dimension_prefixes).transform(make_input_df(n_patients=10))
+
+
+@pytest.mark.parametrize("model_class", [HDPSModel, IncrementalHDPSModel])
+def test_list_threshold(model_class):
+    with pytest.raises(InvalidThresholdValueError):
+        model_class(5, 10, "outcome", "treatment", dimension_prefixes, threshold=["75p", "median"], outcome_cont=True)
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+from hdps import hdps_implementation, hdps_partitioned_implementation
+from hdps.partial_statistics import PartialStatistics, PartialCellCounts, compute_partial_statistics, \
+    merge_partial_statistics, compute_partial_cell_counts, merge_partial_cell_counts, \
+    partial_step_identify_candidate_empirical_covariates
+from hdps.exceptions import ColumnNotBinaryError, InputShapeMismatchError
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+def split_patients(input_df, bounds):
+    return [input_df.iloc[start:stop].reset_index(drop=True) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+@pytest.mark.parametrize("outcome_cont", [False, True])
+def test_hdps_partitioned_implementation(outcome_cont, make_input_df):
+    input_df = make_input_df(string_pids=True)
+    if not outcome_cont:
+        input_df["outcome"] = (input_df["outcome"] > 3).astype(int)
+
+    output_dfs, rank_df = hdps_partitioned_implementation(split_patients(input_df, [0, 120, 330, 500]), 5, 10,
+                                                          "outcome", "treatment", dimension_prefixes,
+                                                          outcome_cont=outcome_cont)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 5, 10, "outcome", "treatment",
+                                                        dimension_prefixes, outcome_cont=outcome_cont)
+
+    assert rank_df.equals(expected_rank_df)
+    assert pd.concat(output_dfs, ignore_index=True).equals(expected_df)
+
+
+def test_hdps_partitioned_implementation_files(tmp_path, make_input_df):
+    input_df = make_input_df(string_pids=True)
+    partitions = split_patients(input_df, [0, 250, 500])
+    # the codes which don't occur in a partition are not exported by its node
+    partitions[1] = partitions[1].drop(columns=["ICD_3", "ATC_7"])
+    partitions[1]["ICD_20"] = (input_df["ICD_3"].iloc[250:].to_numpy() > 1).astype(int)
+    partitions[0].to_csv(tmp_path / "node_0.csv", index=False)
+    partitions[1].to_csv(tmp_path / "node_1.csv", index=False)
+
+    output_dfs, rank_df = hdps_partitioned_implementation([str(tmp_path / "node_0.csv"), str(tmp_path / "node_1.csv")],
+                                                          5, 10, "outcome", "treatment", dimension_prefixes,
+                                                          outcome_cont=True, n_jobs=2)
+
+    expected_input_df = pd.concat(partitions, ignore_index=True).fillna(0)
+    expected_input_df[["ICD_3", "ATC_7", "ICD_20"]] = expected_input_df[["ICD_3", "ATC_7", "ICD_20"]].astype(int)
+    expected_df, expected_rank_df = hdps_implementation(expected_input_df, 5, 10, "outcome", "treatment",
+                                                        dimension_prefixes, outcome_cont=True)
+
+    assert rank_df.equals(expected_rank_df)
+    assert np.array_equal(pd.concat(output_dfs, ignore_index=True).to_numpy(), expected_df.to_numpy())
+
+
+def test_merge_partial_statistics_associative(make_input_df):
+    input_df = make_input_df(string_pids=True)
+    input_df["outcome"] = (input_df["outcome"] > 3).astype(int)
+    a, b, c = [compute_partial_statistics(partition, "treatment", "outcome", dimension_prefixes)
+               for partition in split_patients(input_df, [0, 100, 300, 500])]
+    expected = compute_partial_statistics(input_df, "treatment", "outcome", dimension_prefixes)
+
+    for merged in [merge_partial_statistics([merge_partial_statistics([a, b]), c]),
+                   merge_partial_statistics([a, merge_partial_statistics([b, c])])]:
+        assert merged.column_statistics.to_frame().equals(expected.column_statistics.to_frame())
+        assert merged.treatment_value_counts.sort_index().equals(expected.treatment_value_counts.sort_index())
+        assert merged.outcome_value_counts.sort_index().equals(expected.outcome_value_counts.sort_index())
+        assert merged.n_rows == expected.n_rows == 500
+
+    recurrence_covariates = partial_step_identify_candidate_empirical_covariates(expected, dimension_prefixes, 5)
+    a, b, c = [compute_partial_cell_counts(partition, recurrence_covariates, "treatment", "outcome")
+               for partition in split_patients(input_df, [0, 100, 300, 500])]
+    left = merge_partial_cell_counts([merge_partial_cell_counts([a, b]), c])
+    right = merge_partial_cell_counts([a, merge_partial_cell_counts([b, c])])
+    assert np.array_equal(left.cov_count, right.cov_count) and left.total_count == right.total_count == 500
+    assert np.array_equal(left.cov_outcome_count, right.cov_outcome_count)
+
+    with pytest.raises(InputShapeMismatchError):
+        merge_partial_cell_counts([a, compute_partial_cell_counts(input_df, recurrence_covariates.iloc[:3],
+                                                                  "treatment", "outcome")])
+
+
+def test_save_load(tmp_path, make_input_df):
+    input_df = make_input_df(string_pids=True)
+    partial_statistics = compute_partial_statistics(input_df, "treatment", "outcome", dimension_prefixes)
+    partial_statistics.save(str(tmp_path / "statistics.npz"))
+    loaded = PartialStatistics.load(str(tmp_path / "statistics.npz"))
+
+    assert loaded.column_statistics.columns == partial_statistics.column_statistics.columns
+    assert loaded.column_statistics.to_frame().equals(partial_statistics.column_statistics.to_frame())
+    assert loaded.not_code_columns == ["PID", "treatment", "outcome"]
+    assert loaded.outcome_value_counts.equals(partial_statistics.outcome_value_counts)
+    assert loaded.treatment_value_counts.equals(partial_statistics.treatment_value_counts)
+
+    recurrence_covariates = partial_step_identify_candidate_empirical_covariates(partial_statistics,
+                                                                                 dimension_prefixes, 5)
+    cell_counts = compute_partial_cell_counts(input_df, recurrence_covariates, "treatment", "outcome",
+                                              outcome_threshold_value=3.0)
+    cell_counts.save(str(tmp_path / "cell_counts.npz"))
+    loaded = PartialCellCounts.load(str(tmp_path / "cell_counts.npz"))
+    for key, value in cell_counts.to_dict().items():
+        assert np.array_equal(loaded.to_dict()[key], value)
+
+
+def test_hdps_partitioned_implementation_not_binary(make_input_df):
+    input_df = make_input_df(string_pids=True)
+    input_df["treatment"] = 0
+
+    with pytest.raises(ColumnNotBinaryError):
+        hdps_partitioned_implementation(split_patients(input_df, [0, 250, 500]), 5, 10, "outcome", "treatment",
+                                        dimension_prefixes, outcome_cont=True)
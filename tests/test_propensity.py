@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from hdps import hdps_implementation, PropensityScoreModel
+from hdps.exceptions import ModelNotFittedError, CovariateNotNumericError
+from hdps.propensity import c_statistic
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+@pytest.fixture
+def input_df(make_input_df):
+    input_df = make_input_df(n_patients=800, n_codes=15, outcome_cont=False)
+    # the treatment depends on the first code and the cohort has a continuous covariate
+    rng = np.random.default_rng(1)
+    input_df["treatment"] = (rng.random(input_df.shape[0]) < 0.2 + 0.1 * (input_df["ICD_0"] > 0)).astype(int)
+    input_df.insert(3, "age", rng.normal(60, 10, input_df.shape[0]))
+    return input_df
+
+
+def newton_logistic_regression(design, labels, l2_penalty):
+    # reference solution with an unpenalized intercept in the last column of design
+    penalty = np.full(design.shape[1], l2_penalty)
+    penalty[-1] = 0.0
+    x = np.zeros(design.shape[1])
+    for _ in range(50):
+        p = 1 / (1 + np.exp(-design @ x))
+        gradient = design.T @ (p - labels) + penalty * x
+        hessian = (design * (p * (1 - p))[:, np.newaxis]).T @ design + np.diag(penalty)
+        x -= np.linalg.solve(hessian, gradient)
+    return x
+
+
+def test_propensity_score_model(input_df):
+    output_df, _ = hdps_implementation(input_df, 5, 10, "outcome", "treatment", dimension_prefixes)
+    model = PropensityScoreModel("treatment", "outcome", tol=1e-9)
+
+    scores = model.fit_predict(output_df)
+
+    covariates = ["age"] + [col for col in output_df.columns if col not in {"PID", "treatment", "outcome", "age"}]
+    assert list(model.coef.index) == covariates
+    assert model.diagnostics["converged"] and model.diagnostics["n_covariates"] == 11
+    assert model.diagnostics["n_nonzero"] == int((output_df[covariates[1:]] != 0).to_numpy().sum())
+
+    # the standardization of age doesn't change the solution, only the penalty of its coefficient
+    age = output_df["age"].to_numpy()
+    design = np.column_stack([(age - age.mean()) / age.std(), output_df[covariates[1:]].to_numpy(), np.ones(len(age))])
+    expected = newton_logistic_regression(design, output_df["treatment"].to_numpy(), 1.0)
+    expected_scores = 1 / (1 + np.exp(-design @ expected))
+
+    assert np.allclose(scores.to_numpy(), expected_scores, atol=1e-6)
+    assert np.isclose(model.coef["age"], expected[0] / age.std(), atol=1e-6)
+    assert scores.index.equals(output_df.index) and scores.name == "propensity_score"
+    assert model.diagnostics["c_statistic"] == c_statistic(scores.to_numpy(), output_df["treatment"].to_numpy())
+
+
+def test_warm_start_and_predict(input_df):
+    output_df, _ = hdps_implementation(input_df, 5, 10, "outcome", "treatment", dimension_prefixes)
+    cold = PropensityScoreModel("treatment", "outcome", l2_penalty=2.0).fit(output_df)
+    warm = PropensityScoreModel("treatment", "outcome", warm_start=True).fit(output_df)
+    warm.l2_penalty = 2.0
+    warm.fit(output_df)
+
+    assert warm.diagnostics["n_iter"] < cold.diagnostics["n_iter"]
+    assert np.allclose(warm.coef.to_numpy(), cold.coef.to_numpy(), atol=1e-4)
+
+    new_df = output_df.iloc[:50].drop(columns=["treatment"])
+    assert np.allclose(cold.predict(new_df).to_numpy(), cold.predict(output_df).to_numpy()[:50])
+
+    with pytest.raises(ModelNotFittedError):
+        PropensityScoreModel("treatment").predict(output_df)
+
+
+def test_c_statistic():
+    assert c_statistic(np.array([0.1, 0.4, 0.35, 0.8]), np.array([0, 0, 1, 1])) == 0.75
+    assert c_statistic(np.array([0.5, 0.5]), np.array([0, 1])) == 0.5
+    assert np.isnan(c_statistic(np.array([0.5, 0.5]), np.array([1, 1])))
+
+
+def test_covariate_types(input_df):
+    output_df, _ = hdps_implementation(input_df, 5, 10, "outcome", "treatment", dimension_prefixes)
+    output_df["sex"] = np.where(np.arange(output_df.shape[0]) % 2 == 0, "f", "m")
+    output_df["flag"] = (output_df["age"] > 60).astype(np.int64)
+
+    model = PropensityScoreModel("treatment", "outcome").fit(output_df)
+    assert "sex" not in model.coef.index and "flag" in model.coef.index
+    # the 0/1 integer column is a sparse indicator, not a standardized column
+    hdps_covariates = [col for col in output_df.columns if col not in {"PID", "treatment", "outcome", "age", "sex"}]
+    assert model.diagnostics["n_nonzero"] == int((output_df[hdps_covariates] != 0).to_numpy().sum())
+
+    with pytest.raises(CovariateNotNumericError):
+        PropensityScoreModel("treatment", covariates=["age", "sex"]).fit(output_df)
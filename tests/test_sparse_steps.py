@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from hdps import hdps_implementation, hdps_sparse_implementation
+from hdps.algorithm_steps import step_identify_candidate_empirical_covariates, step_assess_recurrence
+from hdps.sparse_steps import sparse_input_data_validation, sparse_step_identify_candidate_empirical_covariates, \
+    sparse_step_assess_recurrence
+
+id_column = "PID"
+dimension_prefixes = ["ICD", "ATC", "OPS"]
+col_names = [id_column, "treatment", "outcome", "ICD_1", "ICD_2", "ICD_3", "ICD_4", "ICD_5",
+             "ATC_1", "ATC_2", "ATC_3", "ATC_4", "ATC_5"]
+input_df = pd.DataFrame([
+    ["id_1", 0, 0, 0, 1, 0, 0, 3, 1, 1, 1, 1, 0],
+    ["id_2", 0, 0, 0, 1, 1, 0, 1, 0, 1, 0, 1, 1],
+    ["id_3", 0, 1, 1, 0, 1, 0, 5, 1, 1, 3, 1, 2],
+    ["id_4", 0, 0, 1, 1, 1, 0, 2, 0, 1, 4, 1, 0],
+    ["id_5", 0, 1, 0, 1, 3, 0, 0, 1, 2, 4, 1, 2],
+    ["id_6", 1, 1, 1, 0, 5, 0, 2, 0, 2, 3, 1, 2],
+    ["id_7", 1, 0, 1, 0, 2, 0, 1, 0, 2, 1, 1, 1],
+    ["id_8", 1, 1, 4, 1, 4, 0, 1, 1, 1, 2, 1, 0],
+    ["id_9", 1, 1, 0, 1, 0, 0, 3, 1, 1, 2, 1, 1],
+    ["id_10", 1, 1, 1, 0, 0, 0, 2, 1, 1, 2, 1, 5]
+    ], columns=col_names)
+patient_df = input_df[[id_column, "treatment", "outcome"]]
+code_names = col_names[3:]
+code_matrix = sp.csr_matrix(input_df[code_names].to_numpy())
+
+
+def test_sparse_input_data_validation():
+    matrix, names = sparse_input_data_validation(patient_df, code_matrix, code_names, "treatment", "outcome")
+
+    # ICD_4 has only zeros, ATC_2 and ATC_4 have no zeros
+    assert names == ["ICD_1", "ICD_2", "ICD_3", "ICD_5", "ATC_1", "ATC_3", "ATC_5"]
+    assert matrix.shape == (10, 7)
+
+
+def test_sparse_steps_match_dense_steps():
+    matrix, names = sparse_input_data_validation(patient_df, code_matrix, code_names, "treatment", "outcome")
+    sel_columns = sparse_step_identify_candidate_empirical_covariates(matrix, names, patient_df[id_column].to_numpy(),
+                                                                      dimension_prefixes, n=3)
+    dense_df = input_df.drop(columns=["ICD_4", "ATC_2", "ATC_4"])
+    assert sel_columns == step_identify_candidate_empirical_covariates(dense_df, dimension_prefixes, n=3)
+
+    dim_covariates, covariate_names = sparse_step_assess_recurrence(matrix, names, sel_columns)
+    dense_covariates = step_assess_recurrence(dense_df, sel_columns)
+    assert covariate_names == list(dense_covariates.columns)
+    assert np.array_equal(dim_covariates.toarray(), dense_covariates.to_numpy())
+
+
+def test_hdps_sparse_implementation():
+    # explicitly stored zeros must not count as code occurrences
+    matrix_with_zeros = sp.csr_matrix((np.append(code_matrix.data, 0), np.append(code_matrix.indices, 3),
+                                       np.append(code_matrix.indptr[:-1], code_matrix.nnz + 1)),
+                                      shape=code_matrix.shape)
+
+    df, rank_df = hdps_sparse_implementation(patient_df, matrix_with_zeros, code_names, 3, 2, "outcome", "treatment",
+                                             dimension_prefixes)
+    expected_df, expected_rank_df = hdps_implementation(input_df.copy(), 3, 2, "outcome", "treatment",
+                                                        dimension_prefixes)
+
+    assert rank_df.loc[0]["Covariates Name"] == "ICD_3_75p"
+    assert rank_df.loc[1]["Covariates Name"] == "ICD_2_onetime"
+    assert rank_df.equals(expected_rank_df)
+    assert df.equals(expected_df)
@@ -0,0 +1,22 @@
+import pytest
+from hdps import hdps_implementation, hdps_sweep
+
+dimension_prefixes = ["ICD", "ATC"]
+
+
+@pytest.mark.parametrize("outcome_cont", [False, True])
+def test_hdps_sweep(outcome_cont, make_input_df):
+    input_df = make_input_df(n_patients=400, varied_prevalence=True)
+    if not outcome_cont:
+        input_df["outcome"] = (input_df["outcome"] > 3).astype(int)
+    thresholds = ['75p', 'median', 2.5]
+
+    rank_dfs = hdps_sweep(input_df, [3, 8], [2, 10], "outcome", "treatment", dimension_prefixes, m_values=[1, 100],
+                          thresholds=thresholds, outcome_cont=outcome_cont)
+
+    assert len(rank_dfs) == 2 * 2 * 2 * (3 if outcome_cont else 1)
+    for (n, k, m, threshold), rank_df in rank_dfs.items():
+        _, expected_rank_df = hdps_implementation(input_df.copy(), n, k, "outcome", "treatment", dimension_prefixes,
+                                                  m=m, threshold=threshold if outcome_cont else '75p',
+                                                  outcome_cont=outcome_cont)
+        assert rank_df.equals(expected_rank_df)